@@ -1,119 +1,322 @@
 import os
 import uuid
 import json
+import asyncio
 from datetime import date
-from typing import List
+from typing import List, Optional
 
 import numpy as np
 import pandas as pd
-import yfinance as yf
-import gym
-from gym import spaces
-from fastapi import APIRouter, HTTPException
+import torch
+import gymnasium
+from gymnasium import spaces
+from fastapi import APIRouter, Header, HTTPException, Request
+from fastapi.responses import StreamingResponse
 
 from stable_baselines3 import PPO
-
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.vec_env import VecEnv
+
+from ..core import settings
+from ..execution import offload, until_disconnect
+from ..formats import RESPONSES, negotiate, respond
+from ..jobs import TERMINAL, training_jobs
+from ..inference import inference_scheduler
+from ..metrics import stage, timed
+from ..observations import ObsSpec, obs_spec, observations
+from ..registry import model_registry
+from ..returns import fetch_returns, fetch_window
 from ..schemas import (
     TrainRequest,
     TrainResponse,
+    TrainJobStatus,
+    TrainJobsResponse,
+    ModelInfo,
     PredictRequest,
     PredictResponse,
 )
 
 router = APIRouter(prefix="/agent", tags=["agent"])
 
-MODEL_DIR = "models"
-os.makedirs(MODEL_DIR, exist_ok=True)
+MODEL_DIR = model_registry.model_dir
 
 
-class TradingEnv(gym.Env):
-    """A simple env where each step you pick one asset; reward is its next-day return."""
-    metadata = {"render.modes": ["human"]}
+class TradingEnv(gymnasium.Env):
+    """
+    A simple env where each step you pick one asset; reward is its next-day
+    return. Observations follow ``spec`` (see ``app.observations``) and are
+    precomputed views, so a step only indexes.
+    """
+    metadata = {"render_modes": []}
 
-    def __init__(self, returns_df: pd.DataFrame):
+    def __init__(self, returns_df: pd.DataFrame, spec: ObsSpec = ObsSpec()):
         super().__init__()
         self.symbols = list(returns_df.columns)
         arr = returns_df.values.astype(np.float32)
         self.returns = arr
         self.num_steps, self.num_assets = arr.shape
+        self.obs = observations(arr, spec)
+        self._terminal = np.zeros(self.obs.shape[1], dtype=np.float32)
 
         self.action_space = spaces.Discrete(self.num_assets)
         self.observation_space = spaces.Box(
-            low=-np.inf, high=np.inf, shape=(self.num_assets,), dtype=np.float32
+            low=-np.inf, high=np.inf, shape=self._terminal.shape, dtype=np.float32
         )
         self.current_step = 0
 
-    def reset(self):
+    def reset(self, *, seed: Optional[int] = None, options: Optional[dict] = None):
+        super().reset(seed=seed)
         self.current_step = 0
-        return self.returns[0]
+        return self.obs[0], {}
 
     def step(self, action: int):
         reward = float(self.returns[self.current_step, action])
         self.current_step += 1
-        done = self.current_step >= self.num_steps - 1
-        obs = (
-            self.returns[self.current_step]
-            if not done
-            else np.zeros(self.num_assets, dtype=np.float32)
-        )
-        return obs, reward, done, {}
+        terminated = self.current_step >= self.num_steps - 1
+        obs = self.obs[self.current_step] if not terminated else self._terminal
+        return obs, reward, terminated, False, {}
 
-    def render(self, mode="human"):
-        pass
 
+class TradingVecEnv(VecEnv):
+    """
+    ``num_envs`` copies of TradingEnv stepped together over one shared
+    returns array. Every copy starts at its own random offset and restarts
+    at a fresh one when it reaches the end, so a step for all copies is a
+    couple of fancy-indexing operations instead of K Python env steps.
+    """
 
-def fetch_returns(symbols: List[str], start_date: date, end_date: date) -> pd.DataFrame:
-    data = yf.download(
-        symbols, start=start_date, end=end_date, auto_adjust=True, progress=False
-    )
-    if isinstance(data.columns, pd.MultiIndex):
-        fields = list(dict.fromkeys(data.columns.get_level_values(1)))
-        # pick Close or Adj Close if present
-        field = next((f for f in ("Close", "Adj Close") if f in fields), fields[0])
-        prices = data.xs(field, axis=1, level=1)
-    else:
-        prices = data.copy()
+    def __init__(
+        self, returns: np.ndarray, num_envs: int, seed: Optional[int] = None, spec: ObsSpec = ObsSpec()
+    ):
+        self.returns = np.ascontiguousarray(returns, dtype=np.float32)
+        self.num_steps, self.num_assets = self.returns.shape
+        self.obs = observations(self.returns, spec)
+        self.obs_dim = self.obs.shape[1]
+        super().__init__(
+            num_envs,
+            spaces.Box(low=-np.inf, high=np.inf, shape=(self.obs_dim,), dtype=np.float32),
+            spaces.Discrete(self.num_assets),
+        )
+        self._rng = np.random.default_rng(seed)
+        self._t = np.zeros(num_envs, dtype=np.int64)
+        self._actions = np.zeros(num_envs, dtype=np.int64)
+
+    def _random_starts(self, n: int) -> np.ndarray:
+        # leave room for at least one step before the episode ends
+        return self._rng.integers(0, max(self.num_steps - 1, 1), size=n)
 
-    if prices.empty:
-        raise HTTPException(500, "No price data returned by yfinance")
+    def reset(self):
+        self._t = self._random_starts(self.num_envs)
+        return self.obs[self._t]
+
+    def step_async(self, actions):
+        self._actions = np.asarray(actions, dtype=np.int64).reshape(self.num_envs)
+
+    def step_wait(self):
+        rewards = self.returns[self._t, self._actions]
+        self._t += 1
+        dones = self._t >= self.num_steps - 1
+        obs = self.obs[np.minimum(self._t, self.num_steps - 1)]
+        infos = [{} for _ in range(self.num_envs)]
+
+        done_idx = np.flatnonzero(dones)
+        if done_idx.size:
+            for i in done_idx:
+                # same terminal observation TradingEnv returns
+                infos[i]["terminal_observation"] = np.zeros(self.obs_dim, dtype=np.float32)
+            self._t[done_idx] = self._random_starts(done_idx.size)
+            obs[done_idx] = self.obs[self._t[done_idx]]
+        return obs, rewards, dones, infos
+
+    def seed(self, seed: Optional[int] = None):
+        self._rng = np.random.default_rng(seed)
+        return [seed] * self.num_envs
+
+    def close(self):
+        pass
 
-    prices = prices.ffill().dropna()
-    returns = prices.pct_change().dropna()
-    return returns
+    def get_attr(self, attr_name, indices=None):
+        return [getattr(self, attr_name)] * len(self._get_indices(indices))
+
+    def set_attr(self, attr_name, value, indices=None):
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        method = getattr(self, method_name)
+        return [method(*method_args, **method_kwargs) for _ in self._get_indices(indices)]
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False] * len(self._get_indices(indices))
+
+    def _get_indices(self, indices):
+        if indices is None:
+            return range(self.num_envs)
+        if isinstance(indices, int):
+            return [indices]
+        return indices
+
+
+def train_policy(
+    returns_arr: np.ndarray,
+    symbols: List[str],
+    timesteps: int,
+    num_envs: int = 1,
+    callback: Optional[BaseCallback] = None,
+    spec: ObsSpec = ObsSpec(),
+) -> PPO:
+    if num_envs > 1:
+        env = TradingVecEnv(returns_arr, num_envs, spec=spec)
+    else:
+        env = TradingEnv(pd.DataFrame(returns_arr, columns=symbols), spec)
+    model = PPO("MlpPolicy", env, verbose=0)
+    model.learn(total_timesteps=timesteps, callback=callback)
+    return model
 
 
 def _train_agent_internal(
-    symbols: List[str], start_date: date, end_date: date, timesteps: int
+    symbols: List[str],
+    start_date: date,
+    end_date: date,
+    timesteps: int,
+    model_id: Optional[str] = None,
+    callback: Optional[BaseCallback] = None,
+    num_envs: int = 1,
+    spec: ObsSpec = ObsSpec(),
 ) -> str:
-    returns_df = fetch_returns(symbols, start_date, end_date)
-    env = TradingEnv(returns_df)
-    model = PPO("MlpPolicy", env, verbose=0)
-    model.learn(total_timesteps=timesteps)
+    returns = fetch_returns(symbols, start_date, end_date)
+    model = train_policy(returns.values, symbols, timesteps, num_envs, callback, spec)
 
-    model_id = uuid.uuid4().hex
+    model_id = model_id or uuid.uuid4().hex
+    # predict and explain rebuild observations from the recorded spec
+    meta = {"symbols": symbols, **spec.meta()}
     model.save(os.path.join(MODEL_DIR, f"{model_id}.zip"))
     with open(os.path.join(MODEL_DIR, f"{model_id}.json"), "w") as f:
-        json.dump({"symbols": symbols}, f)
+        json.dump(meta, f)
+    model_registry.register(model_id, meta)
 
     return model_id
 
 
 @router.post("/train", response_model=TrainResponse)
 def train_agent(req: TrainRequest):
-    model_id = _train_agent_internal(
-        req.symbols, req.start_date, req.end_date, req.total_timesteps
+    """Queue a training job; the model id is reserved up front."""
+    job = training_jobs.submit(
+        req.symbols, req.start_date, req.end_date, req.total_timesteps,
+        num_envs=req.num_envs, spec=ObsSpec(req.window, tuple(req.features)),
     )
-    return TrainResponse(model_id=model_id)
+    return TrainResponse(model_id=job.model_id, job_id=job.job_id, status=job.status)
+
+
+@router.get("/jobs", response_model=TrainJobsResponse)
+def list_training_jobs():
+    return TrainJobsResponse(**training_jobs.stats())
+
+
+@router.get("/train/{job_id}", response_model=TrainJobStatus)
+def training_job_status(job_id: str):
+    return TrainJobStatus(**training_jobs.get(job_id).summary())
+
+
+@router.post("/train/{job_id}/cancel", response_model=TrainJobStatus)
+def cancel_training_job(job_id: str):
+    return TrainJobStatus(**training_jobs.cancel(job_id).summary())
+
 
+@router.get("/train/{job_id}/events")
+async def training_job_events(job_id: str, last_event_id: Optional[str] = Header(None)):
+    """
+    Server-Sent Events: one ``data:`` message per progress update, ending
+    with a message whose ``type`` is done, failed or cancelled. Reconnecting
+    clients resume after ``Last-Event-ID``.
+    """
+    job = training_jobs.get(job_id)
+    # ids are event indices; anything else replays from the start
+    start = int(last_event_id) + 1 if last_event_id and last_event_id.isdigit() else 0
+
+    async def stream():
+        i = start
+        idle = 0.0
+        while True:
+            events = job.events[i:]
+            for event in events:
+                yield f"id: {i}\ndata: {json.dumps(event)}\n\n"
+                i += 1
+                if event["type"] in TERMINAL:
+                    return
+            if events:
+                idle = 0.0
+            elif idle >= 15.0:
+                # keep proxies from closing an idle connection
+                yield ": keep-alive\n\n"
+                idle = 0.0
+            await asyncio.sleep(0.5)
+            idle += 0.5
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+
+@router.get("/models", response_model=List[ModelInfo])
+def list_models():
+    return [ModelInfo(**m) for m in model_registry.list_models()]
+
+
+def policy_logits(
+    model: PPO, obs: np.ndarray, batch_size: int = settings.ROLLOUT_BATCH_SIZE
+) -> np.ndarray:
+    """
+    Action logits for a (T, obs_dim) observation matrix, computed in
+    chunked no-grad forward passes instead of one ``predict`` per row.
+    """
+    policy = model.policy
+    policy.set_training_mode(False)
+    chunks = []
+    with torch.no_grad():
+        for lo in range(0, len(obs), batch_size):
+            # np.array copies the chunk, so read-only cached returns are fine
+            obs_t, _ = policy.obs_to_tensor(np.array(obs[lo:lo + batch_size]))
+            dist = policy.get_distribution(obs_t)
+            chunks.append(dist.distribution.logits.cpu().numpy())
+    if not chunks:
+        return np.empty((0, model.action_space.n), dtype=np.float32)
+    return np.concatenate(chunks)
+
+
+@timed("rollout")
+def rollout_indices(
+    model: PPO,
+    returns_arr: np.ndarray,
+    n_symbols: int,
+    spec: ObsSpec = ObsSpec(),
+    warmup: int = 0,
+) -> np.ndarray:
+    """
+    Deterministic action index for every day but the last, clamped into
+    [0, n_symbols). Observations don't depend on earlier actions, so the
+    whole window goes through the policy at once. The first ``warmup`` rows
+    are history for the observations only and get no action.
+    """
+    idx = policy_logits(model, observations(returns_arr, spec)[warmup:-1]).argmax(axis=1)
+    return np.clip(idx, 0, n_symbols - 1)
 
-def run_rollout(model: PPO, returns_arr: np.ndarray, symbols: List[str]) -> List[str]:
+
+def run_rollout(
+    model: PPO,
+    returns_arr: np.ndarray,
+    symbols: List[str],
+    batched: bool = True,
+    spec: ObsSpec = ObsSpec(),
+) -> List[str]:
     """
     Given a trained PPO model, a returns array shape (T, N_features),
     and the same list of symbols, produce the list of chosen symbols.
     Out-of-range indices are clamped.
     """
+    if batched:
+        return [symbols[i] for i in rollout_indices(model, returns_arr, len(symbols), spec)]
+
     actions: List[str] = []
-    obs = returns_arr[0]
+    all_obs = observations(returns_arr, spec)
+    obs = all_obs[0]
 
     for t in range(len(returns_arr) - 1):
         # reshape 1D obs -> batch (1, n_assets)
@@ -132,41 +335,92 @@ def run_rollout(model: PPO, returns_arr: np.ndarray, symbols: List[str]) -> List
         action_idx = max(0, min(action_idx, len(symbols) - 1))
 
         actions.append(symbols[action_idx])
-        obs = returns_arr[t + 1]
+        obs = all_obs[t + 1]
 
     return actions
 
 
-@router.post("/predict", response_model=PredictResponse)
-def predict_agent(req: PredictRequest):
-    # 1) metadata must exist
-    meta_file = os.path.join(MODEL_DIR, f"{req.model_id}.json")
-    if not os.path.exists(meta_file):
-        raise HTTPException(404, "Model metadata not found; please retrain")
+@router.post("/predict", response_model=PredictResponse, responses=RESPONSES)
+async def predict_agent(req: PredictRequest, request: Request):
+    fmt = negotiate(request)
+    if settings.INFER_BATCHING:
+        dates, returns_arr, actions = await _predict_batched(req, request)
+    else:
+        dates, returns_arr, actions = await offload("agent", _predict_agent, req, request=request)
+    symbols = req.symbols
+
+    def document():
+        return {
+            "dates": dates[1:],
+            "returns": {sym: returns_arr[:, j].tolist() for j, sym in enumerate(symbols)},
+            "actions": [symbols[i] for i in actions],
+        }
+
+    def columns():
+        return {"symbols": symbols, "dates": dates, "returns": returns_arr, "actions": actions}
+
+    def rows():
+        # one row per day; the first day has returns but no decision yet
+        for t, (day, values) in enumerate(zip(dates, returns_arr.tolist())):
+            yield {
+                "date": day,
+                "action": symbols[actions[t - 1]] if t else None,
+                "returns": dict(zip(symbols, values)),
+            }
 
-    # 2) load + validate symbols
-    with open(meta_file) as f:
-        meta = json.load(f)
+    return respond(fmt, document, columns, rows)
+
+
+def _predict_inputs(req: PredictRequest, load_model: bool = False):
+    """
+    (dates, (T, N) returns, observation spec, warm-up rows) for a validated
+    request; the first ``spec.warmup`` (or fewer) rows precede the window.
+    """
+    # 1) metadata must exist + validate symbols
+    meta = model_registry.meta(req.model_id)
     trained = meta.get("symbols", [])
     if trained != req.symbols:
         raise HTTPException(
             400,
             f"Model trained on {trained}, cannot predict on {req.symbols}.",
         )
+    spec = obs_spec(meta, req.window)
+
+    # 2) fetch returns + dates
+    returns, warmup = fetch_window(req.symbols, req.start_date, req.end_date, spec.warmup)
+    if load_model:
+        # here rather than on the inference thread, where a cold load
+        # would hold up every other model's batches
+        model_registry.load(req.model_id)
+    return returns.date_strings(), returns.values, spec, warmup
+
 
-    # 3) load model
-    model_path = os.path.join(MODEL_DIR, f"{req.model_id}.zip")
-    if not os.path.exists(model_path):
-        raise HTTPException(404, "Model binary not found")
-    model = PPO.load(model_path)
+async def _predict_batched(req: PredictRequest, request: Request):
+    """
+    Inputs are prepared on a thread under the light "predict" gate; the
+    forward pass joins the model's next micro-batch (see ``app.inference``).
+    """
+    dates, returns_arr, spec, warmup = await offload(
+        "predict", _predict_inputs, req, True, request=request, isolate=False
+    )
+    obs = observations(returns_arr, spec)[warmup:-1]
+    with stage("inference"):
+        # cancelling on disconnect takes the request out of its pending batch
+        logits = await until_disconnect(request, inference_scheduler.logits(req.model_id, obs))
+    actions = np.clip(logits.argmax(axis=1), 0, len(req.symbols) - 1)
+    return dates[warmup:], returns_arr[warmup:], actions
 
-    # 4) fetch returns + prepare dates
-    returns_df = fetch_returns(req.symbols, req.start_date, req.end_date)
-    returns_arr = returns_df.values.astype(np.float32)
-    dates = returns_df.index.strftime("%Y-%m-%d").tolist()[1:]
 
-    # 5) rollout
-    actions = run_rollout(model, returns_arr, req.symbols)
-    returns_dict = {sym: returns_df[sym].tolist() for sym in req.symbols}
+def _predict_agent(req: PredictRequest):
+    """
+    (dates, (T, N) returns, T-1 action indices) for the window; action ``t``
+    is chosen on day ``t`` and held on day ``t + 1``.
+    """
+    dates, returns_arr, spec, warmup = _predict_inputs(req)
+
+    # 3) load model (cached across requests)
+    model = model_registry.load(req.model_id)
 
-    return PredictResponse(dates=dates, returns=returns_dict, actions=actions)
\ No newline at end of file
+    # 4) rollout
+    actions = rollout_indices(model, returns_arr, len(req.symbols), spec, warmup)
+    return dates[warmup:], returns_arr[warmup:], actions
@@ -0,0 +1,89 @@
+from typing import Dict, List
+
+import numpy as np
+from fastapi import APIRouter, HTTPException, Request
+
+from ..backtest import backtest
+from ..execution import offload
+from ..observations import ObsSpec
+from ..registry import model_registry
+from ..returns import fetch_window
+from ..schemas import BacktestRequest, BacktestResponse, BacktestResult, BacktestScenario
+from .agent import rollout_indices
+
+router = APIRouter(prefix="/backtest", tags=["backtest"])
+
+
+def _scenarios(req: BacktestRequest) -> List[BacktestScenario]:
+    ids = ([req.model_id] if req.model_id else []) + req.model_ids
+    scenarios = [BacktestScenario(model_id=m) for m in ids] + req.scenarios
+    if not scenarios:
+        raise HTTPException(400, "Provide model_id, model_ids or scenarios.")
+    return scenarios
+
+
+@router.post("/run", response_model=BacktestResponse)
+async def run_backtest(req: BacktestRequest, request: Request):
+    return await offload("backtest", _run_backtest, req, request=request)
+
+
+def _run_backtest(req: BacktestRequest) -> BacktestResponse:
+    scenarios = _scenarios(req)
+    model_ids = list(dict.fromkeys(s.model_id for s in scenarios))
+    metas = {m: model_registry.meta(m) for m in model_ids}
+    trained = {m: meta.get("symbols", []) for m, meta in metas.items()}
+
+    symbols = req.symbols or list(dict.fromkeys(s for syms in trained.values() for s in syms))
+    col = {s: j for j, s in enumerate(symbols)}
+    for m, syms in trained.items():
+        missing = [s for s in syms if s not in col]
+        if missing:
+            raise HTTPException(400, f"Model {m} needs symbols {missing} not in the backtest.")
+
+    # one fetch, every model scored against it; windowed models read
+    # warm-up history from before the start
+    specs = {m: ObsSpec.from_meta(meta) for m, meta in metas.items()}
+    returns, warmup = fetch_window(
+        symbols, req.start_date, req.end_date, max(s.warmup for s in specs.values())
+    )
+    history = returns.values
+    arr = history[warmup:]
+
+    # each model sees only its own columns, in its training order;
+    # its actions are mapped back to columns of the shared matrix
+    actions: Dict[str, np.ndarray] = {}
+    for m in model_ids:
+        cols = np.array([col[s] for s in trained[m]], dtype=np.intp)
+        skip = max(warmup - specs[m].warmup, 0)
+        idx = rollout_indices(
+            model_registry.load(m), history[skip:, cols], len(cols), specs[m], warmup - skip
+        )
+        actions[m] = cols[idx]
+
+    stats = backtest(
+        arr,
+        np.stack([actions[s.model_id] for s in scenarios]),
+        cost_bps=np.array([req.cost_bps if s.cost_bps is None else s.cost_bps for s in scenarios]),
+        slippage_bps=np.array([req.slippage_bps if s.slippage_bps is None else s.slippage_bps for s in scenarios]),
+        initial_capital=req.initial_capital,
+    )
+
+    results = [
+        BacktestResult(
+            name=s.name or s.model_id,
+            model_id=s.model_id,
+            sharpe=stats["sharpe"][i],
+            sortino=stats["sortino"][i],
+            max_drawdown=stats["max_drawdown"][i],
+            turnover=stats["turnover"][i],
+            trades=int(stats["trades"][i]),
+            total_return=stats["total_return"][i],
+            equity=stats["equity"][i].tolist() if req.include_equity else None,
+        )
+        for i, s in enumerate(scenarios)
+    ]
+    return BacktestResponse(
+        dates=returns.date_strings()[warmup + 1:],
+        results=results,
+        sharpe=results[0].sharpe,
+    )
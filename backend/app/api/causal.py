@@ -1,9 +1,17 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from typing import List
+from typing import Dict, List, Optional
 from datetime import date
-import yfinance as yf
 import numpy as np
+from ..bootstrap import bootstrap_edges
+from ..cache import shared_cache
+from ..execution import offload
+from ..graphs import CausalGraph, graph_cache
+from ..metrics import stage, timed
+from ..returns import fetch_returns
+from ..pcmci import pcmci
+from ..rolling import rolling_skeletons
 from causallearn.search.ConstraintBased.PC import pc
 
 router = APIRouter(prefix="/causal", tags=["causal"])
@@ -13,40 +21,116 @@ class CausalDiscoverRequest(BaseModel):
     start_date: date
     end_date: date
     alpha: float = Field(0.05)
+    # 0 = contemporaneous PC; >0 = lagged PCMCI-style discovery up to this many days
+    lag: int = Field(0, ge=0)
+    # >0: weight each edge by how often it appears in this many row resamples
+    bootstrap: int = Field(0, ge=0, le=10_000)
+    # stop resampling once every frequency's 95% interval is narrower than this
+    bootstrap_tol: float = Field(0.1, gt=0)
 
 class Edge(BaseModel):
     source: str
     target: str
+    # set by lagged discovery: source leads target by `lag` days, with MCI
+    # partial correlation `weight`
+    lag: Optional[int] = None
+    weight: Optional[float] = None
 
 class CausalDiscoverResponse(BaseModel):
     edges: List[Edge]
+    # resamples actually run in bootstrap mode
+    resamples: Optional[int] = None
 
-@router.post("/discover", response_model=CausalDiscoverResponse)
-def discover(req: CausalDiscoverRequest):
-    try:
-        df = yf.download(
-            req.symbols,
-            start=str(req.start_date),
-            end=str(req.end_date),
-            auto_adjust=False,
-            progress=False,
-        )["Adj Close"]
-    except Exception as e:
-        raise HTTPException(400, f"Error fetching data: {e}")
+class CausalWhatIfRequest(BaseModel):
+    symbols: List[str]
+    start_date: date
+    end_date: date
+    alpha: float = Field(0.05)
+    # one shock vector ({symbol: delta}); `perturbations` answers a whole grid
+    perturb: Dict[str, float] = {}
+    perturbations: List[Dict[str, float]] = []
 
-    df = df.ffill().dropna()
-    if df.shape[0] < 2:
-        raise HTTPException(400, "Not enough data.")
+class CausalWhatIfResponse(BaseModel):
+    # DAG the SEM was fitted on, weight = structural coefficient
+    edges: List[Edge]
+    # total effect on every symbol, one entry per perturbation vector
+    effects: List[Dict[str, float]]
 
-    returns = df.pct_change().dropna().values
+class CausalRollingRequest(BaseModel):
+    symbols: List[str]
+    start_date: date
+    end_date: date
+    alpha: float = Field(0.05)
+    window: int = Field(250, ge=10)
+    step: int = Field(1, ge=1)
+    # largest conditioning set tried by the skeleton search
+    max_cond: int = Field(3, ge=0)
+
+class CausalWindow(BaseModel):
+    start_date: str
+    end_date: str
+    # undirected skeleton edges, weight = correlation over the window
+    edges: List[Edge]
+    added: List[Edge]
+    removed: List[Edge]
+    tests: int
+
+@timed("pc")
+def run_pc(returns: np.ndarray, alpha: float, labels: List[str]) -> np.ndarray:
+    """PC on a (T, N) returns matrix; returns causallearn's adjacency matrix."""
     try:
-        cg = pc(returns, alpha=req.alpha, labels=req.symbols)
+        cg = pc(returns, alpha=alpha, labels=labels, show_progress=False)
     except Exception as e:
         raise HTTPException(500, f"PC failed: {e}")
 
     if not hasattr(cg.G, "graph"):
         raise HTTPException(500, "Cannot extract adjacency matrix from causal graph.")
-    mat = cg.G.graph  
+    return cg.G.graph
+
+
+def cached_graph(symbols: List[str], start_date: date, end_date: date, alpha: float) -> CausalGraph:
+    """PC graph and fitted SEM for these returns, discovered at most once."""
+    returns = fetch_returns(symbols, start_date, end_date)
+    key = (tuple(symbols), start_date, end_date, alpha, returns.digest)
+    return graph_cache.get_or_compute(
+        key,
+        lambda: shared_cache.get_or_compute(
+            "graph", key,
+            lambda: CausalGraph(symbols, run_pc(returns.values, alpha, symbols), returns.values),
+        ),
+    )
+
+
+@router.post("/discover", response_model=CausalDiscoverResponse)
+async def discover(req: CausalDiscoverRequest, request: Request):
+    # bootstrap runs its own pool, so it only needs a thread here
+    return await offload("causal", _discover, req, request=request, isolate=not req.bootstrap)
+
+
+def _discover(req: CausalDiscoverRequest) -> CausalDiscoverResponse:
+    if req.bootstrap:
+        if req.lag > 0:
+            raise HTTPException(400, "bootstrap resamples rows and needs lag=0.")
+        returns = fetch_returns(req.symbols, req.start_date, req.end_date).values
+        freq, used = bootstrap_edges(returns, req.alpha, req.symbols, req.bootstrap, req.bootstrap_tol)
+        return CausalDiscoverResponse(
+            edges=[
+                Edge(source=req.symbols[i], target=req.symbols[j], weight=float(freq[i, j]))
+                for i, j in zip(*np.nonzero(freq))
+            ],
+            resamples=used,
+        )
+
+    if req.lag > 0:
+        returns = fetch_returns(req.symbols, req.start_date, req.end_date).values
+        with stage("pcmci"):
+            links = pcmci(returns, req.lag, req.alpha)
+        return CausalDiscoverResponse(edges=[
+            Edge(source=req.symbols[l.source], target=req.symbols[l.target], lag=l.lag, weight=l.weight)
+            for l in links
+        ])
+
+    mat = cached_graph(req.symbols, req.start_date, req.end_date, req.alpha).mat
     labels = req.symbols
     n = len(labels)
     edges = []
@@ -55,4 +139,79 @@ def discover(req: CausalDiscoverRequest):
             if mat[i][j] != 0:
                 edges.append(Edge(source=labels[i], target=labels[j]))
 
-    return CausalDiscoverResponse(edges=edges)
\ No newline at end of file
+    return CausalDiscoverResponse(edges=edges)
+
+
+@router.post("/whatif", response_model=CausalWhatIfResponse)
+async def whatif(req: CausalWhatIfRequest, request: Request):
+    return await offload("causal", _whatif, req, request=request)
+
+
+def _whatif(req: CausalWhatIfRequest) -> CausalWhatIfResponse:
+    """
+    Propagate perturbations through the linear SEM of the (cached) graph.
+    A perturbation shocks a symbol's own noise term, so it moves the
+    symbol and its descendants but not its ancestors.
+    """
+    vectors = ([req.perturb] if req.perturb else []) + req.perturbations
+    if not vectors:
+        raise HTTPException(400, "Provide perturb or perturbations.")
+    col = {s: j for j, s in enumerate(req.symbols)}
+    unknown = sorted({s for v in vectors for s in v if s not in col})
+    if unknown:
+        raise HTTPException(400, f"Unknown symbols in perturbation: {unknown}")
+
+    graph = cached_graph(req.symbols, req.start_date, req.end_date, req.alpha)
+    shocks = np.zeros((len(vectors), len(col)))
+    for row, v in enumerate(vectors):
+        for s, delta in v.items():
+            shocks[row, col[s]] = delta
+    with stage("propagate"):
+        effects = graph.sem.propagate(shocks)
+
+    sem, labels = graph.sem, req.symbols
+    edges = [
+        Edge(source=labels[i], target=labels[j], weight=float(sem.coef[i, j]))
+        for i, j in zip(*np.nonzero(sem.dag))
+    ]
+    return CausalWhatIfResponse(
+        edges=edges,
+        effects=[dict(zip(labels, row.tolist())) for row in effects],
+    )
+
+
+@router.post("/rolling")
+def rolling_discover(req: CausalRollingRequest):
+    """
+    Stream one NDJSON ``CausalWindow`` per window position, with the edges
+    added and removed since the previous window.
+    """
+    returns = fetch_returns(req.symbols, req.start_date, req.end_date)
+    if req.window > len(returns.values):
+        raise HTTPException(400, "Window is longer than the available data.")
+    dates = returns.date_strings()
+    labels = req.symbols
+
+    def stream():
+        previous = set()
+        for g in rolling_skeletons(returns.values, req.window, req.step, req.alpha, req.max_cond):
+            current = g.skeleton.edges()
+
+            def edges(pairs):
+                return [
+                    Edge(source=labels[i], target=labels[j], weight=float(g.corr[i, j]))
+                    for i, j in sorted(pairs)
+                ]
+
+            window = CausalWindow(
+                start_date=dates[g.lo],
+                end_date=dates[g.hi - 1],
+                edges=edges(current),
+                added=edges(current - previous),
+                removed=edges(previous - current),
+                tests=g.skeleton.tests,
+            )
+            previous = current
+            yield window.model_dump_json() + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
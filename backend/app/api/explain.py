@@ -1,130 +1,143 @@
-import os
-import json
-from typing import List, Union
+import hashlib
+from typing import Union
 
 import numpy as np
 import pandas as pd
-import yfinance as yf
-import shap
-import networkx as nx
-from fastapi import APIRouter, HTTPException
-from stable_baselines3 import PPO
+from fastapi import APIRouter, HTTPException, Request
 
 from ..schemas import (
     PredictRequest,
+    ExplainRequest,
     PerDecisionExplainResponse,
-    PerDecisionExplainItem,
     GlobalExplainResponse,
     CausalPathRequest,
     CausalPathResponse,
     CounterfactualRequest,
     CounterfactualResponse,
-    CausalEdge,
+    CounterfactualSweepRequest,
+    CounterfactualSweepResponse,
+    CounterfactualScenario,
+    MinimalFlip,
 )
-from .agent import fetch_returns, run_rollout
+from ..attribution import gradient_attributions, kernel_shap
+from ..cache import shared_cache
+from ..counterfactual import minimal_flips, sweep_actions
+from ..execution import offload
+from ..formats import RESPONSES, negotiate, respond
+from ..metrics import stage
+from ..observations import obs_spec, observations
+from ..paths import PathGraph, page
+from ..registry import model_registry
+from ..returns import fetch_window
+from .agent import rollout_indices
 
 router = APIRouter(prefix="/explain", tags=["explain"])
-MODEL_DIR = "models"
 
 
 def _load_model_and_returns(req: PredictRequest):
     # --- load metadata ---
-    meta_path = os.path.join(MODEL_DIR, f"{req.model_id}.json")
-    if not os.path.exists(meta_path):
-        raise HTTPException(404, "Model metadata not found; retrain first")
-    with open(meta_path) as f:
-        meta = json.load(f)
-
+    meta = model_registry.meta(req.model_id)
     if meta.get("symbols", []) != req.symbols:
         raise HTTPException(
             400,
             f"Model trained on {meta.get('symbols')}, not {req.symbols}"
         )
+    spec = obs_spec(meta, req.window)
 
-    # --- load model ---
-    model_path = os.path.join(MODEL_DIR, f"{req.model_id}.zip")
-    if not os.path.exists(model_path):
-        raise HTTPException(404, "Model file not found")
-    model = PPO.load(model_path)
+    # --- load model (cached across requests) ---
+    model = model_registry.load(req.model_id)
 
-    # --- fetch returns & prepare arrays/dates ---
-    returns_df = fetch_returns(req.symbols, req.start_date, req.end_date)
-    returns_arr = returns_df.values.astype(np.float32)
-    # we drop the first row of dates to align with the rollout length
-    dates = returns_df.index.strftime("%Y-%m-%d").tolist()[1:]
+    # --- fetch returns (with warm-up history for windowed models) & prepare arrays/dates ---
+    returns, warmup = fetch_window(req.symbols, req.start_date, req.end_date, spec.warmup)
+    # read-only float32 view shared with the returns cache
+    returns_arr = returns.values
+    # we drop the warm-up rows and the first day to align with the rollout length
+    dates = returns.date_strings()[warmup + 1:]
 
-    return model, returns_df, returns_arr, dates
+    return model, returns, returns_arr, dates, spec, warmup
 
 
-@router.post("/perdecision", response_model=PerDecisionExplainResponse)
-def explain_per_decision(req: PredictRequest):
+def _per_decision_attributions(req: ExplainRequest):
     """
-    For each day in the period, returns per-feature SHAP attributions
-    for the action actually taken on that day.
+    (dates, action indices, (T, N) attributions) for the decisions in range,
+    shared across workers by model version, returns content and method.
+    With a windowed model, the attributions of all of a symbol's
+    observation columns (every lag and derived feature) are summed.
     """
-    model, returns_df, returns_arr, dates = _load_model_and_returns(req)
-
-    # run rollout to get the sequence of actions (we only need indices)
-    # this returns list of symbols, but we will re-predict to get indices
-    run_rollout(model, returns_arr, req.symbols)
-
-    # build KernelExplainer over the policy.predict function
-    # shap expects a function f(X) -> [n_samples] of predicted class indices
-    def f(x: np.ndarray) -> np.ndarray:
-        # x has shape (n_samples, n_features)
-        # we want an array of shape (n_samples,) of action indices
-        preds = []
-        for obs in x:
-            action_idx, _ = model.predict(obs.astype(np.float32))
-            preds.append(int(action_idx))
-        return np.array(preds)
-
-    background = returns_arr[: min(100, len(returns_arr))]
-    explainer = shap.KernelExplainer(f, background)
-
-    # shap_values will be a list of arrays, one per possible action/class
-    raw_shap = explainer.shap_values(returns_arr)  # list of [T x N_features]
-    shap_vals_list = raw_shap if isinstance(raw_shap, list) else [raw_shap]
-
-    items: List[PerDecisionExplainItem] = []
-    for i, date in enumerate(dates):
-        # figure out which action was taken on day i
-        action_idx, _ = model.predict(returns_arr[i])
-        # grab the shap row for that class
-        class_shap = shap_vals_list[action_idx]
-        if i >= class_shap.shape[0]:
-            raise HTTPException(
-                500,
-                f"SHAP array too short ({class_shap.shape[0]}) for date index {i}"
-            )
-        contrib = {
-            sym: float(class_shap[i, j])
-            for j, sym in enumerate(req.symbols)
-        }
-        items.append(
-            PerDecisionExplainItem(
-                date=date,
-                action=req.symbols[action_idx],
-                contributions=contrib,
-            )
-        )
+    spec = obs_spec(model_registry.meta(req.model_id), req.window)
+    returns, _ = fetch_window(req.symbols, req.start_date, req.end_date, spec.warmup)
+    key = (
+        req.model_id, model_registry.stamp(req.model_id), returns.digest,
+        req.method, req.ig_steps, req.background_method, req.background_size, req.nsamples,
+    )
+    return shared_cache.get_or_compute("explain", key, lambda: _compute_attributions(req))
+
 
-    return PerDecisionExplainResponse(explains=items)
+def _compute_attributions(req: ExplainRequest):
+    model, returns, returns_arr, dates, spec, warmup = _load_model_and_returns(req)
+    n = len(req.symbols)
+
+    # batched rollout: one action index per explained day
+    actions = rollout_indices(model, returns_arr, n, spec, warmup)
+    x = observations(returns_arr, spec)[warmup:-1]
+
+    if req.method != "kernelshap":
+        contrib = gradient_attributions(model, x, actions, method=req.method, steps=req.ig_steps)
+        return dates, actions, spec.per_symbol(contrib, n)
+
+    # KernelSHAP over the vectorized policy, chunked across a process pool;
+    # the last day has no decision, so it is only used as background
+    contrib = kernel_shap(
+        req.model_id,
+        x,
+        actions,
+        background_method=req.background_method,
+        background_size=req.background_size,
+        nsamples=req.nsamples,
+        chunk_size=req.chunk_size,
+    )
+    return dates, actions, spec.per_symbol(contrib, n)
+
+
+@router.post("/perdecision", response_model=PerDecisionExplainResponse, responses=RESPONSES)
+async def explain_per_decision(req: ExplainRequest, request: Request):
+    """
+    For each day in the period, returns per-feature attributions
+    (KernelSHAP or a gradient method) for the action actually taken.
+    """
+    fmt = negotiate(request)
+    # KernelSHAP fans out to its own pool, so it only needs a thread here
+    dates, actions, contrib = await offload(
+        "explain", _per_decision_attributions, req, request=request,
+        isolate=req.method != "kernelshap",
+    )
+    symbols = req.symbols
+
+    def rows():
+        for day, i, values in zip(dates, actions.tolist(), contrib.tolist()):
+            yield {"date": day, "action": symbols[i], "contributions": dict(zip(symbols, values))}
+
+    def columns():
+        return {"symbols": symbols, "dates": dates, "actions": actions, "contributions": contrib}
+
+    return respond(fmt, lambda: {"explains": list(rows())}, columns, rows)
 
 
 @router.post("/global", response_model=GlobalExplainResponse)
-def explain_global(req: PredictRequest):
+async def explain_global(req: ExplainRequest, request: Request):
+    return await offload(
+        "explain", _explain_global, req, request=request, isolate=req.method != "kernelshap"
+    )
+
+
+def _explain_global(req: ExplainRequest) -> GlobalExplainResponse:
     """
-    Aggregates absolute per-decision SHAP contributions into
-    a single global importance score per feature.
+    Aggregates absolute per-decision contributions into a single global
+    importance score per feature. Use a gradient ``method`` for a fast path.
     """
-    per_resp = explain_per_decision(req)
-    # stack into matrix [T x N_features]
-    mat = np.vstack([
-        list(item.contributions.values()) for item in per_resp.explains
-    ])
+    _, _, contrib = _per_decision_attributions(req)
     # mean absolute across time
-    imp = np.mean(np.abs(mat), axis=0)
+    imp = np.mean(np.abs(contrib), axis=0)
     importance = {sym: float(imp[i]) for i, sym in enumerate(req.symbols)}
     return GlobalExplainResponse(importance=importance)
 
@@ -132,59 +145,126 @@ def explain_global(req: PredictRequest):
 @router.post("/causalpath", response_model=CausalPathResponse)
 def explain_causal_path(req: CausalPathRequest):
     """
-    Given a discovered causal graph and a feature, list all
-    simple directed paths from that feature to others.
+    Simple directed paths from ``feature`` to the other nodes, best first
+    and one page at a time; pass ``next_cursor`` back to continue.
     """
-    G = nx.DiGraph()
-    for edge in req.edges:
-        if not isinstance(edge, CausalEdge):
-            raise HTTPException(400, "Invalid edge format")
-        G.add_edge(edge.source, edge.target, weight=edge.weight)
-
     if req.feature not in req.nodes:
         raise HTTPException(400, f"Feature {req.feature} not in graph nodes")
+    graph = PathGraph(req.nodes, [(e.source, e.target, e.weight) for e in req.edges])
+    source = graph.index[req.feature]
+    max_depth = req.max_depth or max(len(graph) - 1, 1)
+    targets = np.arange(len(graph)) < len(req.nodes)
 
-    paths = []
-    for target in req.nodes:
-        if target == req.feature:
-            continue
-        for path in nx.all_simple_paths(G, source=req.feature, target=target):
-            paths.append(path)
+    query = hashlib.blake2b(
+        req.model_dump_json(exclude={"cursor", "limit", "include_counts"}).encode(), digest_size=8
+    ).hexdigest()
+    offset = 0
+    if req.cursor:
+        digest, _, pos = req.cursor.partition(":")
+        if digest != query or not pos.isdigit():
+            raise HTTPException(400, "Cursor does not belong to this query")
+        offset = int(pos)
 
-    return CausalPathResponse(paths=paths)
+    with stage("paths"):
+        items, more = page(
+            query, offset, req.limit,
+            lambda: graph.ranked_paths(source, req.rank, max_depth, targets),
+        )
+
+    counts = None
+    if req.include_counts:
+        with stage("path_counts"):
+            per_node = graph.path_counts(source, max_depth)
+        if per_node is not None:
+            counts = {
+                n: int(per_node[i]) for i, n in enumerate(req.nodes) if i != source
+            }
+
+    return CausalPathResponse(
+        paths=[[graph.labels[i] for i in path] for path, _ in items],
+        scores=[float(score) for _, score in items],
+        counts=counts,
+        next_cursor=f"{query}:{offset + len(items)}" if more else None,
+    )
 
 
 @router.post("/counterfactual", response_model=CounterfactualResponse)
-def explain_counterfactual(req: CounterfactualRequest):
+async def explain_counterfactual(req: CounterfactualRequest, request: Request):
+    return await offload("explain", _explain_counterfactual, req, request=request)
+
+
+def _explain_counterfactual(req: CounterfactualRequest) -> CounterfactualResponse:
     """
     “What if” analysis: bump one feature by (1 + delta), rerun,
     and report where the policy’s actions change.
     """
-    # load original rollout
-    _, _, returns_arr, _ = _load_model_and_returns(req)
-    orig_actions = run_rollout(
-        PPO.load(os.path.join(MODEL_DIR, f"{req.model_id}.zip")),
-        returns_arr,
-        req.symbols,
-    )
-
-    # perturb
-    returns_df = fetch_returns(req.symbols, req.start_date, req.end_date)
-    if req.feature not in returns_df.columns:
+    model, returns, returns_arr, _, spec, warmup = _load_model_and_returns(req)
+    if req.feature not in returns.symbols:
         raise HTTPException(400, f"Feature {req.feature} not in returns data")
-    returns_df[req.feature] *= (1.0 + req.delta)
-    cf_arr = returns_df.values.astype(np.float32)
-
-    # counterfactual rollout
-    cf_actions = run_rollout(
-        PPO.load(os.path.join(MODEL_DIR, f"{req.model_id}.zip")),
-        cf_arr,
-        req.symbols,
-    )
 
-    diffs = [i for i, (o, c) in enumerate(zip(orig_actions, cf_actions)) if o != c]
+    n = len(req.symbols)
+    orig = rollout_indices(model, returns_arr, n, spec, warmup)
+    # the cached returns stay read-only; the sweep scales a copy
+    col = spec.latest_column(n, returns.symbols.index(req.feature))
+    cf = sweep_actions(model, observations(returns_arr, spec)[warmup:-1], [col], [req.delta])[0]
+
     return CounterfactualResponse(
-        original_actions=orig_actions,
-        counterfactual_actions=cf_actions,
-        difference_indices=diffs,
-    )
\ No newline at end of file
+        original_actions=[req.symbols[i] for i in orig],
+        counterfactual_actions=[req.symbols[i] for i in cf],
+        difference_indices=np.flatnonzero(orig != cf).tolist(),
+    )
+
+
+@router.post("/counterfactual/sweep", response_model=CounterfactualSweepResponse)
+async def explain_counterfactual_sweep(req: CounterfactualSweepRequest, request: Request):
+    return await offload("explain", _explain_counterfactual_sweep, req, request=request)
+
+
+def _explain_counterfactual_sweep(req: CounterfactualSweepRequest) -> CounterfactualSweepResponse:
+    """
+    Every (feature, delta) pair in one batched rollout, plus optionally the
+    smallest delta per feature that flips each decision.
+    """
+    model, returns, returns_arr, dates, spec, warmup = _load_model_and_returns(req)
+    features = req.features or req.symbols
+    unknown = [f for f in features if f not in returns.symbols]
+    if unknown:
+        raise HTTPException(400, f"Features {unknown} not in returns data")
+    if not req.deltas:
+        raise HTTPException(400, "deltas must be non-empty.")
+    n = len(req.symbols)
+    cols = [spec.latest_column(n, returns.symbols.index(f)) for f in features]
+    obs = observations(returns_arr, spec)[warmup:-1]
+
+    orig = rollout_indices(model, returns_arr, n, spec, warmup)
+    pairs = [(f, c, d) for f, c in zip(features, cols) for d in req.deltas]
+    actions = sweep_actions(model, obs, [c for _, c, _ in pairs], [d for _, _, d in pairs])
+    flips = actions != orig[None, :]
+    scenarios = [
+        CounterfactualScenario(
+            feature=f,
+            delta=d,
+            flip_indices=np.flatnonzero(flips[s]).tolist(),
+            flip_rate=float(flips[s].mean()) if flips.shape[1] else 0.0,
+        )
+        for s, (f, _, d) in enumerate(pairs)
+    ]
+
+    minimal = []
+    if req.find_minimal:
+        deltas, flip_to = minimal_flips(model, obs, orig, cols, req.max_delta, req.bisect_steps)
+        minimal = [
+            MinimalFlip(
+                feature=f,
+                deltas=[None if np.isnan(d) else float(d) for d in deltas[k]],
+                actions=[None if a < 0 else req.symbols[a] for a in flip_to[k]],
+            )
+            for k, f in enumerate(features)
+        ]
+
+    return CounterfactualSweepResponse(
+        dates=dates,
+        original_actions=[req.symbols[i] for i in orig],
+        scenarios=scenarios,
+        minimal_flips=minimal,
+    )
@@ -1,9 +1,11 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel, Field
-from typing import List
+from typing import List, Optional
 from datetime import date
-import yfinance as yf
-from causallearn.search.ConstraintBased.PC import pc
+from ..blanket import MarkovBlanketSearch, ci_cache_for
+from ..execution import offload
+from ..metrics import stage
+from ..returns import fetch_returns
 
 router = APIRouter(prefix="/features", tags=["features"])
 
@@ -12,58 +14,60 @@ class FeatureSelectRequest(BaseModel):
     start_date: date
     end_date: date
     alpha: float = Field(0.05)
+    target: Optional[str] = None
+    # several targets share one search and its CI-test cache
+    targets: List[str] = []
+    # largest conditioning set tried when pruning a candidate
+    max_k: int = Field(3, ge=0)
+
+class TargetBlanket(BaseModel):
     target: str
+    parents: List[str]
+    children: List[str]
+    spouses: List[str]
 
 class FeatureSelectResponse(BaseModel):
+    # blanket of the first target, for single-target callers
     parents: List[str]
     children: List[str]
     spouses: List[str]
+    results: List[TargetBlanket] = []
+    # CI tests actually computed for this request vs answered from cache
+    ci_tests: int = 0
+    cache_hits: int = 0
 
 @router.post("/select", response_model=FeatureSelectResponse)
-def select_features(req: FeatureSelectRequest):
-    if req.target not in req.symbols:
-        raise HTTPException(400, "Target must be in symbols.")
+async def select_features(req: FeatureSelectRequest, request: Request):
+    return await offload("features", _select_features, req, request=request)
 
-    try:
-        df = yf.download(
-            req.symbols,
-            start=str(req.start_date),
-            end=str(req.end_date),
-            auto_adjust=False,
-            progress=False,
-        )["Adj Close"]
-    except Exception as e:
-        raise HTTPException(400, f"Error fetching data: {e}")
 
-    df = df.ffill().dropna()
-    if df.shape[0] < 2:
-        raise HTTPException(400, "Not enough data.")
-
-    returns = df.pct_change().dropna().values
-    try:
-        cg = pc(returns, alpha=req.alpha, labels=req.symbols)
-    except Exception as e:
-        raise HTTPException(500, f"PC failed: {e}")
+def _select_features(req: FeatureSelectRequest) -> FeatureSelectResponse:
+    targets = list(dict.fromkeys(([req.target] if req.target else []) + req.targets))
+    if not targets:
+        raise HTTPException(400, "Provide target or targets.")
+    if any(t not in req.symbols for t in targets):
+        raise HTTPException(400, "Target must be in symbols.")
 
-    if not hasattr(cg.G, "graph"):
-        raise HTTPException(500, "Cannot extract adjacency matrix from causal graph.")
-    mat = cg.G.graph  # adjacency matrix
+    returns = fetch_returns(req.symbols, req.start_date, req.end_date)
+    cache = ci_cache_for(
+        (tuple(req.symbols), req.start_date, req.end_date, returns.digest), returns.values
+    )
+    search = MarkovBlanketSearch(cache, req.alpha, req.max_k)
     labels = req.symbols
-    idx = labels.index(req.target)
-
-    parents = [labels[k] for k in range(len(labels)) if mat[k][idx] != 0]
-    children = [labels[k] for k in range(len(labels)) if mat[idx][k] != 0]
 
-    spouses_set = set()
-    for c in children:
-        ci = labels.index(c)
-        for p in range(len(labels)):
-            if mat[p][ci] != 0 and labels[p] != req.target:
-                spouses_set.add(labels[p])
-    spouses = list(spouses_set)
+    results = []
+    with stage("blanket"):
+        for target in targets:
+            mb = search.blanket(labels.index(target))
+            results.append(TargetBlanket(
+                target=target, **{k: [labels[v] for v in vs] for k, vs in mb.items()}
+            ))
 
+    first = results[0]
     return FeatureSelectResponse(
-        parents=parents,
-        children=children,
-        spouses=spouses,
+        parents=first.parents,
+        children=first.children,
+        spouses=first.spouses,
+        results=results,
+        **search.stats,
     )
@@ -0,0 +1,177 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from datetime import date
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+
+from ..backtest import backtest
+from ..core import settings
+from ..execution import offload
+from ..returns import Returns, fetch_returns
+from ..sharedmem import ArraySpec, SharedArray, attach
+from ..workers import cpu_workers, get_pool
+
+router = APIRouter(prefix="/gridsearch", tags=["gridsearch"])
+
+class GridSearchRequest(BaseModel):
+    symbols: List[str]
+    start_date: date
+    end_date: date
+    alphas: List[float]
+    timesteps: List[int]
+    num_envs: int = Field(1, ge=1)
+    # stream one NDJSON line per trial as it finishes instead of one JSON body
+    stream: bool = False
+
+
+class TrialTimings(BaseModel):
+    pc_s: float
+    queue_s: float
+    train_s: float
+    eval_s: float
+    total_s: float
+
+
+class GridResult(BaseModel):
+    alpha: float
+    timesteps: int
+    sharpe: Optional[float] = None
+    sortino: Optional[float] = None
+    universe: List[str] = []
+    timings: Optional[TrialTimings] = None
+    error: Optional[str] = None
+
+
+class GridSearchResponse(BaseModel):
+    results: List[GridResult]
+
+
+def _pc_trial(spec: ArraySpec, alpha: float, labels: List[str]) -> dict:
+    """
+    PC on the shared returns. The trial universe is every symbol with at
+    least one causal edge; if fewer than two are connected, all symbols.
+    """
+    from .causal import run_pc
+
+    t0 = time.perf_counter()
+    with attach(spec) as returns:
+        mat = np.asarray(run_pc(returns, alpha, labels))
+    connected = np.flatnonzero((mat != 0).any(axis=0) | (mat != 0).any(axis=1))
+    if len(connected) < 2:
+        connected = np.arange(len(labels))
+    return {"columns": connected.tolist(), "pc_s": time.perf_counter() - t0}
+
+
+def _train_trial(spec: ArraySpec, columns: List[int], timesteps: int, num_envs: int, submitted: float) -> dict:
+    """Train on the trial universe, then score the deterministic policy in-sample."""
+    from .agent import rollout_indices, train_policy
+
+    started = time.time()
+    with attach(spec) as returns:
+        arr = returns[:, columns]  # fancy indexing copies just this universe
+
+    t0 = time.perf_counter()
+    model = train_policy(arr, [str(c) for c in columns], timesteps, num_envs)
+    train_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    stats = backtest(arr, rollout_indices(model, arr, arr.shape[1]))
+    return {
+        "sharpe": float(stats["sharpe"][0]),
+        "sortino": float(stats["sortino"][0]),
+        "queue_s": started - submitted,
+        "train_s": train_s,
+        "eval_s": time.perf_counter() - t0,
+    }
+
+
+def run_sweep(req: GridSearchRequest, returns: Returns) -> Iterator[GridResult]:
+    """
+    Expand the grid, fetch returns once and share them with every trial
+    through shared memory. PC runs once per distinct alpha and its result
+    is reused by every trial with that alpha; training trials are queued as
+    soon as their PC result is in. Results are yielded as trials finish.
+    """
+    pool = get_pool("gridsearch", cpu_workers(settings.GRIDSEARCH_WORKERS))
+    t_start: Dict[float, float] = {}
+
+    with SharedArray(returns.values) as shared:
+        pending = {}
+        for alpha in dict.fromkeys(req.alphas):
+            t_start[alpha] = time.perf_counter()
+            pending[pool.submit(_pc_trial, shared.spec, alpha, req.symbols)] = ("pc", alpha, None)
+
+        pc_results: Dict[float, dict] = {}
+        try:
+            yield from _collect(req, pool, shared, pending, pc_results, t_start)
+        finally:
+            # client went away or a trial raised: drop whatever hasn't started
+            for future in pending:
+                future.cancel()
+
+
+def _collect(req, pool, shared, pending, pc_results, t_start) -> Iterator[GridResult]:
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            kind, alpha, steps = pending.pop(future)
+            if kind == "pc":
+                try:
+                    pc_results[alpha] = future.result()
+                except Exception as e:
+                    for steps in req.timesteps:
+                        yield GridResult(alpha=alpha, timesteps=steps, error=f"PC failed: {e}")
+                    continue
+                for steps in req.timesteps:
+                    f = pool.submit(
+                        _train_trial, shared.spec, pc_results[alpha]["columns"],
+                        steps, req.num_envs, time.time(),
+                    )
+                    pending[f] = ("train", alpha, steps)
+                continue
+
+            pc = pc_results[alpha]
+            universe = [req.symbols[c] for c in pc["columns"]]
+            try:
+                res = future.result()
+            except Exception as e:
+                yield GridResult(alpha=alpha, timesteps=steps, universe=universe, error=str(e))
+                continue
+            yield GridResult(
+                alpha=alpha,
+                timesteps=steps,
+                sharpe=res["sharpe"],
+                sortino=res["sortino"],
+                universe=universe,
+                timings=TrialTimings(
+                    pc_s=pc["pc_s"],
+                    queue_s=res["queue_s"],
+                    train_s=res["train_s"],
+                    eval_s=res["eval_s"],
+                    total_s=time.perf_counter() - t_start[alpha],
+                ),
+            )
+
+
+@router.post("/run", response_model=GridSearchResponse)
+async def run_grid_search(req: GridSearchRequest, request: Request):
+    # trials run in their own pool; this thread only coordinates them
+    return await offload("gridsearch", _run_grid_search, req, request=request, isolate=False)
+
+
+def _run_grid_search(req: GridSearchRequest):
+    if not req.alphas or not req.timesteps:
+        raise HTTPException(400, "alphas and timesteps must be non-empty.")
+    # fetched up front so data errors surface as a normal error response
+    returns = fetch_returns(req.symbols, req.start_date, req.end_date)
+
+    if req.stream:
+        lines = (r.model_dump_json() + "\n" for r in run_sweep(req, returns))
+        return StreamingResponse(lines, media_type="application/x-ndjson")
+
+    results = sorted(run_sweep(req, returns), key=lambda r: (r.alpha, r.timesteps))
+    return GridSearchResponse(results=results)
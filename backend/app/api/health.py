@@ -1,14 +1,19 @@
+from typing import Dict
+
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
-from .. import models, schemas
-from ..database import SessionLocal, engine
-from ..schemas import HealthResponse
-
-models.Base.metadata.create_all(bind=engine)
+from .. import schemas
+from ..database import SessionLocal, get_engine
+from ..execution import gate_stats
+from ..inference import inference_scheduler
+from ..metrics import process_caches
+from ..schemas import HealthResponse, CacheStatsResponse, GateStats, InferenceStats
+from ..startup import router_loader
 
 router = APIRouter(prefix="/health", tags=["health"])
 
 def get_db():
+    get_engine()
     db = SessionLocal()
     try:
         yield db
@@ -19,3 +24,27 @@ def get_db():
 @router.get("/", response_model=HealthResponse)
 async def health_check():
     return HealthResponse(status="ok")
+
+
+@router.get("/cache", response_model=CacheStatsResponse)
+async def cache_stats():
+    """Returns-cache stats summed over the API process and the exec pool workers."""
+    stats = [c["tcarp_returns_cache"] for c in process_caches().values() if "tcarp_returns_cache" in c]
+    totals = {key: sum(s[key] for s in stats) for key in stats[0]}
+    return CacheStatsResponse(**totals, processes=len(stats))
+
+
+@router.get("/execution", response_model=Dict[str, GateStats])
+async def execution_stats():
+    return gate_stats()
+
+
+@router.get("/inference", response_model=InferenceStats)
+async def inference_stats():
+    return inference_scheduler.stats()
+
+
+@router.get("/startup")
+async def startup_status():
+    """Which heavy routers are loaded, and whether the schema was created."""
+    return router_loader.stats()
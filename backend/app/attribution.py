@@ -0,0 +1,140 @@
+"""
+Feature attributions for policy decisions.
+
+KernelSHAP is model-agnostic but needs many policy evaluations per row, so
+the engine here (1) evaluates the policy on whole batches at once, (2)
+summarizes the background set to ``background_size`` rows, and (3) splits
+the explained rows into chunks that run in a process pool.
+
+The PPO policy is a differentiable torch network, so gradient methods
+(integrated gradients, gradient x input) on the chosen action's logit are
+offered as a fast alternative: all rows in a few batched autograd passes.
+"""
+from typing import Optional
+
+import numpy as np
+import shap
+import torch
+from fastapi import HTTPException
+
+from .core import settings
+from .metrics import timed
+from .registry import model_registry
+from .workers import cpu_workers, get_pool
+
+
+def policy_proba(model, x: np.ndarray) -> np.ndarray:
+    """Vectorized policy: (n, obs_dim) -> (n, n_actions) action probabilities."""
+    from .api.agent import policy_logits
+
+    logits = policy_logits(model, np.asarray(x, dtype=np.float32)).astype(np.float64)
+    logits -= logits.max(axis=1, keepdims=True)
+    proba = np.exp(logits)
+    return proba / proba.sum(axis=1, keepdims=True)
+
+
+def summarize_background(data: np.ndarray, method: str, size: int):
+    if size >= len(data):
+        return np.asarray(data, dtype=np.float64)
+    if method == "kmeans":
+        return shap.kmeans(data, size)
+    if method == "sample":
+        return shap.sample(data, size, random_state=0)
+    raise HTTPException(400, f"Unknown background method: {method}")
+
+
+def _shap_chunk(model_id: str, background, rows: np.ndarray, nsamples) -> np.ndarray:
+    """Runs in a pool worker; the worker's own registry keeps the model loaded."""
+    model = model_registry.load(model_id)
+    explainer = shap.KernelExplainer(lambda x: policy_proba(model, x), background)
+    values = explainer.shap_values(rows, nsamples=nsamples, silent=True)
+    if isinstance(values, list):
+        # older shap: one (n, N) array per class
+        values = np.stack(values, axis=-1)
+    return values
+
+
+@timed("kernel_shap")
+def kernel_shap(
+    model_id: str,
+    x: np.ndarray,
+    actions: np.ndarray,
+    background_method: str = "kmeans",
+    background_size: int = 50,
+    nsamples: Optional[int] = None,
+    chunk_size: int = 64,
+) -> np.ndarray:
+    """
+    KernelSHAP values of each row of ``x`` for the action taken on it.
+    Returns an array shaped like ``x``.
+    """
+    if len(x) == 0:
+        return np.zeros_like(x, dtype=np.float64)
+    background = summarize_background(x, background_method, background_size)
+    nsamples = nsamples or "auto"
+    chunks = [x[lo:lo + chunk_size] for lo in range(0, len(x), chunk_size)]
+
+    if len(chunks) <= 1 or settings.SHAP_WORKERS == 1:
+        parts = [_shap_chunk(model_id, background, c, nsamples) for c in chunks]
+    else:
+        pool = get_pool("shap", cpu_workers(settings.SHAP_WORKERS), preload=True)
+        futures = [
+            pool.submit(_shap_chunk, model_id, background, np.array(c), nsamples)
+            for c in chunks
+        ]
+        parts = [f.result() for f in futures]
+
+    values = np.concatenate(parts)  # (T, N, n_actions)
+    return values[np.arange(len(x)), :, actions]
+
+
+def _action_logit_grads(model, x: np.ndarray, actions: np.ndarray) -> np.ndarray:
+    """d logit[action] / d obs for each row, in one autograd pass."""
+    policy = model.policy
+    policy.set_training_mode(False)
+    obs_t, _ = policy.obs_to_tensor(np.array(x, dtype=np.float32))
+    obs_t.requires_grad_(True)
+    logits = policy.get_distribution(obs_t).distribution.logits
+    idx = torch.as_tensor(actions, dtype=torch.long, device=logits.device)
+    # rows are independent, so the gradient of the sum is the per-row gradient
+    logits.gather(1, idx.view(-1, 1)).sum().backward()
+    return obs_t.grad.cpu().numpy().astype(np.float64)
+
+
+@timed("gradient_attributions")
+def gradient_attributions(
+    model,
+    x: np.ndarray,
+    actions: np.ndarray,
+    method: str = "integrated_gradients",
+    steps: int = 32,
+    batch_size: int = settings.ROLLOUT_BATCH_SIZE,
+) -> np.ndarray:
+    """
+    Attributions of the chosen action's logit, shaped like ``x``.
+
+    ``integrated_gradients`` integrates along the straight path from a zero
+    (flat-market) baseline with a midpoint Riemann sum; ``gradient_input``
+    is the single-step gradient times the input.
+    """
+    x = np.asarray(x, dtype=np.float32)
+    actions = np.asarray(actions)
+    if method == "gradient_input":
+        out = [
+            _action_logit_grads(model, x[lo:lo + batch_size], actions[lo:lo + batch_size])
+            for lo in range(0, len(x), batch_size)
+        ]
+        return np.concatenate(out) * x if out else np.zeros_like(x, dtype=np.float64)
+    if method != "integrated_gradients":
+        raise HTTPException(400, f"Unknown attribution method: {method}")
+
+    alphas = ((np.arange(steps) + 0.5) / steps).astype(np.float32)
+    rows = max(1, batch_size // steps)
+    out = []
+    for lo in range(0, len(x), rows):
+        chunk, acts = x[lo:lo + rows], actions[lo:lo + rows]
+        # (steps, rows, N) interpolants flattened into one batch
+        path = (alphas[:, None, None] * chunk[None]).reshape(-1, x.shape[1])
+        grads = _action_logit_grads(model, path, np.tile(acts, steps))
+        out.append(grads.reshape(steps, len(chunk), -1).mean(axis=0) * chunk)
+    return np.concatenate(out) if out else np.zeros_like(x, dtype=np.float64)
@@ -0,0 +1,87 @@
+"""
+Vectorized backtests of all-in, one-asset-at-a-time policies.
+
+A policy's decisions are an integer array of asset indices, one per day
+but the last: the asset picked on day t is held over day t+1. Many
+strategies are scored together as an (S, T-1) action matrix against one
+(T, N) returns matrix, so P&L, costs, equity and drawdown are a handful of
+array operations over all strategies at once.
+"""
+from typing import Dict, Union
+
+import numpy as np
+
+from .metrics import timed
+
+TRADING_DAYS = 252
+
+ArrayLike = Union[float, np.ndarray]
+
+
+def annualized_ratio(mean: np.ndarray, scale: np.ndarray) -> np.ndarray:
+    """mean / scale * sqrt(252), 0 where ``scale`` is 0."""
+    mean, scale = np.asarray(mean, dtype=np.float64), np.asarray(scale, dtype=np.float64)
+    out = np.zeros(np.broadcast(mean, scale).shape)
+    np.divide(mean, scale, out=out, where=scale > 0)
+    return out * np.sqrt(TRADING_DAYS)
+
+
+def turnover(actions: np.ndarray) -> np.ndarray:
+    """
+    Fraction of capital traded each day: 1 to enter the first position,
+    2 (sell everything, buy the new asset) on each switch, 0 otherwise.
+    """
+    actions = np.atleast_2d(actions)
+    out = np.zeros(actions.shape, dtype=np.float64)
+    if actions.shape[1]:
+        out[:, 0] = 1.0
+        out[:, 1:] = 2.0 * (actions[:, 1:] != actions[:, :-1])
+    return out
+
+
+@timed("backtest")
+def backtest(
+    returns: np.ndarray,
+    actions: np.ndarray,
+    cost_bps: ArrayLike = 0.0,
+    slippage_bps: ArrayLike = 0.0,
+    initial_capital: float = 1.0,
+) -> Dict[str, np.ndarray]:
+    """
+    Score (S, T-1) ``actions`` against (T, N) ``returns``.
+
+    ``cost_bps`` and ``slippage_bps`` are charged on traded notional and may
+    be scalars or per-strategy (S,) arrays. Returns per-strategy arrays
+    (``sharpe``, ``sortino``, ``max_drawdown``, ``turnover``,
+    ``total_return``, ``trades``) plus the (S, T-1) ``pnl`` and ``equity``.
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    actions = np.atleast_2d(np.asarray(actions, dtype=np.intp))
+    n_strats, n_steps = actions.shape
+    if n_steps != len(returns) - 1:
+        raise ValueError(f"expected {len(returns) - 1} actions per strategy, got {n_steps}")
+
+    # decided on day t, held over day t+1
+    gross = returns[np.arange(1, len(returns))[None, :], actions]
+    traded = turnover(actions)
+    rate = (np.asarray(cost_bps, dtype=np.float64) + np.asarray(slippage_bps, dtype=np.float64)) / 1e4
+    pnl = gross - traded * np.broadcast_to(rate, (n_strats,))[:, None]
+
+    equity = initial_capital * np.cumprod(1.0 + pnl, axis=1)
+    peak = np.maximum.accumulate(np.maximum(equity, initial_capital), axis=1)
+    drawdown = 1.0 - equity / peak
+
+    empty = n_steps == 0
+    mean = pnl.mean(axis=1) if not empty else np.zeros(n_strats)
+    std = pnl.std(axis=1) if not empty else np.zeros(n_strats)
+    downside = np.sqrt(np.mean(np.minimum(pnl, 0.0) ** 2, axis=1)) if not empty else np.zeros(n_strats)
+    return {
+        "sharpe": annualized_ratio(mean, std),
+        "sortino": annualized_ratio(mean, downside),
+        "max_drawdown": drawdown.max(axis=1) if not empty else np.zeros(n_strats),
+        "turnover": traded.mean(axis=1) if not empty else np.zeros(n_strats),
+        "trades": (traded[:, 1:] > 0).sum(axis=1),
+        "total_return": equity[:, -1] / initial_capital - 1.0 if not empty else np.zeros(n_strats),
+        "pnl": pnl,
+        "equity": equity,
+    }
@@ -0,0 +1,169 @@
+"""
+Local Markov-blanket discovery (HITON-PC / HITON-MB style).
+
+Instead of learning the whole graph, only variables associated with the
+target are examined: candidates enter the target's parent/child set in
+order of marginal association and are dropped as soon as some subset (of
+size <= max_k) of the other members separates them from the target.
+Spouses are found through the neighbours' own parent/child sets, with
+the same collider rule PC uses to orient v-structures.
+
+All tests go through a ``CITestCache`` over one correlation matrix, shared
+by every target in a request and by later requests on the same returns.
+"""
+import threading
+from collections import OrderedDict, defaultdict
+from itertools import combinations
+from typing import Dict, Hashable, List, Sequence, Set, Tuple
+
+import numpy as np
+
+from .citests import correlation, fisher_z, partial_corr
+
+Query = Tuple[int, int, Tuple[int, ...]]
+
+
+class CITestCache:
+    """Fisher-z p-values keyed by (x, y, S), computed in batches on a miss."""
+
+    def __init__(self, corr: np.ndarray, n: int):
+        self.corr = corr
+        self.n = n
+        self._pvalues: Dict[Query, float] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(x: int, y: int, cond: Sequence[int]) -> Query:
+        return (min(x, y), max(x, y), tuple(sorted(cond)))
+
+    def pvalues(self, queries: Sequence[Query], stats: Dict[str, int]) -> np.ndarray:
+        keys = [self.key(*q) for q in queries]
+        with self._lock:
+            known = {k: self._pvalues[k] for k in keys if k in self._pvalues}
+        missing = list(dict.fromkeys(k for k in keys if k not in known))
+        stats["cache_hits"] += sum(k in known for k in keys)
+        stats["ci_tests"] += len(missing)
+
+        by_size = defaultdict(list)
+        for k in missing:
+            by_size[len(k[2])].append(k)
+        for size, group in by_size.items():
+            x = np.array([k[0] for k in group])
+            y = np.array([k[1] for k in group])
+            cond = np.array([k[2] for k in group], dtype=np.intp).reshape(len(group), size)
+            _, p = fisher_z(partial_corr(self.corr, x, y, cond), self.n, size)
+            known.update(zip(group, p.tolist()))
+        with self._lock:
+            self._pvalues.update((k, known[k]) for k in missing)
+        return np.array([known[k] for k in keys])
+
+
+class MarkovBlanketSearch:
+    def __init__(self, cache: CITestCache, alpha: float, max_k: int):
+        self.cache = cache
+        self.alpha = alpha
+        self.max_k = max_k
+        self.stats = {"ci_tests": 0, "cache_hits": 0}
+        self._cpc: Dict[int, List[int]] = {}
+        self._sepset: Dict[Tuple[int, int], Tuple[int, ...]] = {}
+
+    def _independent(self, queries: List[Query]) -> np.ndarray:
+        return self.cache.pvalues(queries, self.stats) > self.alpha
+
+    def _record(self, a: int, b: int, cond: Tuple[int, ...]) -> None:
+        self._sepset.setdefault((min(a, b), max(a, b)), cond)
+
+    def sepset(self, a: int, b: int):
+        return self._sepset.get((min(a, b), max(a, b)))
+
+    def cpc(self, t: int) -> List[int]:
+        """Candidate parents/children of ``t`` (HITON-PC, interleaved)."""
+        if t in self._cpc:
+            return self._cpc[t]
+        others = [v for v in range(len(self.cache.corr)) if v != t]
+        marginal = self._independent([(v, t, ()) for v in others])
+        for v in np.asarray(others)[marginal]:
+            self._record(t, int(v), ())
+        order = sorted(
+            (v for v, ind in zip(others, marginal) if not ind),
+            key=lambda v: -abs(self.cache.corr[t, v]),
+        )
+
+        cpc: List[int] = []
+        for c in order:
+            cpc.append(c)
+            queries = []
+            for x in cpc:
+                rest = [v for v in cpc if v != x]
+                for k in range(1, min(self.max_k, len(rest)) + 1):
+                    queries.extend((x, t, cond) for cond in combinations(rest, k))
+            if not queries:
+                continue
+            dropped: Set[int] = set()
+            for (x, _, cond), ind in zip(queries, self._independent(queries)):
+                if ind and x not in dropped:
+                    dropped.add(x)
+                    self._record(t, x, cond)
+            cpc = [v for v in cpc if v not in dropped]
+        self._cpc[t] = cpc
+        return cpc
+
+    def pc(self, t: int) -> List[int]:
+        """CPC with the symmetry correction: x is kept only if t is in CPC(x)."""
+        return [x for x in self.cpc(t) if t in self.cpc(x)]
+
+    def blanket(self, t: int) -> Dict[str, List[int]]:
+        """
+        Parents, children and spouses of ``t``. Neighbours that no
+        v-structure orients are listed as both parents and children, as PC's
+        undirected edges were before.
+        """
+        pc = self.pc(t)
+        children: Set[int] = set()
+        spouses: Set[int] = set()
+
+        # t -> y <- z for z adjacent to y but not t, unless y separated them
+        for y in pc:
+            for z in self.pc(y):
+                if z == t or z in pc:
+                    continue
+                cond = self.sepset(t, z)
+                if cond is not None and y not in cond:
+                    children.add(y)
+                    spouses.add(z)
+
+        # x -> t <- w for non-adjacent neighbours whose sepset excludes t
+        parents: Set[int] = set()
+        for x, w in combinations(pc, 2):
+            if w in self.pc(x):
+                continue
+            cond = self.sepset(x, w)
+            if cond is not None and t not in cond:
+                parents.update((x, w))
+
+        undirected = [v for v in pc if v not in parents and v not in children]
+        return {
+            "parents": [v for v in pc if v in parents] + undirected,
+            "children": [v for v in pc if v in children] + undirected,
+            "spouses": sorted(spouses),
+        }
+
+
+_caches: "OrderedDict[Hashable, CITestCache]" = OrderedDict()
+_caches_lock = threading.Lock()
+MAX_CACHES = 8
+
+
+def ci_cache_for(key: Hashable, returns: np.ndarray) -> CITestCache:
+    """Shared test cache for one returns matrix (LRU over the last few)."""
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is not None:
+            _caches.move_to_end(key)
+            return cache
+    cache = CITestCache(correlation(returns), len(returns))
+    with _caches_lock:
+        cache = _caches.setdefault(key, cache)
+        while len(_caches) > MAX_CACHES:
+            _caches.popitem(last=False)
+    return cache
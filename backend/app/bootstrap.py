@@ -0,0 +1,85 @@
+"""
+Bootstrap edge confidence for PC graphs.
+
+Each resample draws T rows of the returns with replacement and runs PC on
+them in a pool worker; the returns are shared through POSIX shared memory
+so a resample only ships its seed. Resamples are submitted in waves of
+``IN_FLIGHT_PER_WORKER`` per worker, adjacency matrices are tallied as they
+arrive, and the run stops submitting once every edge frequency's 95%
+Wilson interval is narrower than ``tol``. Resamples already handed to a
+worker are waited for before the shared returns are unlinked.
+"""
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import List, Tuple
+
+import numpy as np
+
+from .core import settings
+from .metrics import timed
+from .sharedmem import ArraySpec, SharedArray, attach
+from .workers import cpu_workers, get_pool
+
+# resamples before the stopping rule is consulted
+MIN_RESAMPLES = 20
+# resamples submitted but not finished, per pool worker
+IN_FLIGHT_PER_WORKER = 2
+
+
+def _resample_pc(spec: ArraySpec, seed: int, alpha: float, labels: List[str]) -> np.ndarray:
+    from .api.causal import run_pc
+
+    with attach(spec) as returns:
+        rows = np.random.default_rng(seed).integers(0, len(returns), len(returns))
+        sample = returns[rows]  # fancy indexing copies
+    return np.asarray(run_pc(sample, alpha, labels)) != 0
+
+
+def half_width(freq: np.ndarray, n: int, z: float = 1.96) -> np.ndarray:
+    """
+    95% Wilson interval half-width of each frequency after n resamples;
+    unlike the normal approximation it is not 0 at frequencies of 0 or 1.
+    """
+    n = max(n, 1)
+    return z / (1.0 + z * z / n) * np.sqrt(freq * (1.0 - freq) / n + z * z / (4.0 * n * n))
+
+
+@timed("bootstrap")
+def bootstrap_edges(
+    returns: np.ndarray,
+    alpha: float,
+    labels: List[str],
+    resamples: int,
+    tol: float,
+    seed: int = 0,
+) -> Tuple[np.ndarray, int]:
+    """
+    (N, N) frequency with which each causallearn adjacency entry is set
+    across resamples, and the number of resamples used.
+    """
+    workers = cpu_workers(settings.BOOTSTRAP_WORKERS)
+    pool = get_pool("bootstrap", workers)
+    seeds = iter(np.random.SeedSequence(seed).generate_state(resamples))
+    counts = np.zeros((len(labels), len(labels)))
+    done = 0
+
+    with SharedArray(returns) as shared:
+        pending = set()
+        try:
+            while True:
+                for s in seeds:
+                    pending.add(pool.submit(_resample_pc, shared.spec, int(s), alpha, labels))
+                    if len(pending) >= IN_FLIGHT_PER_WORKER * workers:
+                        break
+                if not pending:
+                    break
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    counts += future.result()
+                    done += 1
+                if done >= MIN_RESAMPLES and half_width(counts / done, done).max() < tol:
+                    break
+        finally:
+            # what a worker already holds can't be recalled; let it finish
+            # before the shared returns go away
+            wait([f for f in pending if not f.cancel()])
+    return counts / max(done, 1), done
@@ -0,0 +1,399 @@
+"""
+Result cache and job queue shared by every uvicorn worker.
+
+Each worker process used to keep its own copies of returns, graphs and
+explanations, so N workers repeated the same downloads, PC runs and SHAP
+computations. ``SharedCache`` puts those results in Redis under
+content-hash keys with a TTL. Identical requests that arrive together
+collapse into one computation: the first caller takes a short-lived lock
+(``SET NX PX``) and computes, the others poll for its result, and whoever
+finds the lock expired without a result computes it themselves.
+
+Values are pickled (protocol 5, so numpy arrays go in as raw buffers) and
+zlib-compressed above a small size. ``JobQueue`` is a FIFO list plus a
+per-job record and event log, for long tasks that any worker may pick up.
+
+Unpickling runs code chosen by whoever wrote the bytes, so anyone who can
+write to the Redis instance can execute code in every API worker. Keep
+Redis private to the deployment, and set ``CACHE_SECRET`` (the same value
+in every worker) to have payloads signed with a keyed BLAKE2b tag;
+``loads`` then refuses anything it cannot verify before unpickling it.
+
+``CACHE_BACKEND=memory`` (and ``auto`` when Redis is unreachable) swaps in
+``MemoryStore``, an in-process stand-in with the same semantics; results
+are then shared between threads only, as before.
+"""
+import hashlib
+import hmac
+import pickle
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, List, Optional
+
+from .core import settings
+
+PREFIX = "tcarp"
+# values at least this large are compressed
+COMPRESS_MIN_BYTES = 4096
+# how often a caller waiting on another worker's computation looks again
+LOCK_POLL_S = 0.05
+# MemoryStore evicts least recently used values beyond this many bytes
+MEMORY_STORE_BYTES = 256 * 1024 * 1024
+# how often MemoryStore drops expired lists nobody has read
+LIST_SWEEP_S = 60.0
+
+_RAW, _ZLIB = b"\x00", b"\x01"
+TAG_BYTES = 32
+
+
+def _tag(body) -> bytes:
+    return hashlib.blake2b(body, key=settings.CACHE_SECRET.encode(), digest_size=TAG_BYTES).digest()
+
+
+def dumps(value: Any) -> bytes:
+    data = pickle.dumps(value, protocol=5)
+    if len(data) >= COMPRESS_MIN_BYTES:
+        data = _ZLIB + zlib.compress(data, 1)
+    else:
+        data = _RAW + data
+    return _tag(data) + data if settings.CACHE_SECRET else data
+
+
+def loads(data: bytes) -> Any:
+    if settings.CACHE_SECRET:
+        tag, data = data[:TAG_BYTES], data[TAG_BYTES:]
+        if not hmac.compare_digest(tag, _tag(data)):
+            raise ValueError("Cache payload failed signature check")
+    body = memoryview(data)[1:]
+    if data[:1] == _ZLIB:
+        body = zlib.decompress(body)
+    return pickle.loads(body)
+
+
+def cache_key(namespace: str, *parts) -> str:
+    """``tcarp:<namespace>:<hash of parts>``; parts must have a stable repr."""
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+    return f"{PREFIX}:{namespace}:{digest}"
+
+
+class MemoryStore:
+    """In-process stand-in for the handful of Redis commands used here."""
+
+    name = "memory"
+
+    def __init__(self, max_bytes: int = MEMORY_STORE_BYTES):
+        self.max_bytes = max_bytes
+        self._values: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lists: Dict[str, deque] = {}
+        # list key -> monotonic expiry, for lists given a TTL
+        self._list_expiry: Dict[str, float] = {}
+        self._next_sweep = time.monotonic() + LIST_SWEEP_S
+        self._cond = threading.Condition()
+
+    def _live(self, key: str):
+        entry = self._values.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= time.monotonic():
+            self._drop(key)
+            return None
+        self._values.move_to_end(key)
+        return entry
+
+    def _drop(self, key: str) -> None:
+        self._bytes -= len(self._values.pop(key)[0])
+
+    def _put(self, key: str, value: bytes, ttl: Optional[float]) -> None:
+        if key in self._values:
+            self._drop(key)
+        self._values[key] = (value, time.monotonic() + ttl if ttl else None)
+        self._bytes += len(value)
+        while self._bytes > self.max_bytes and len(self._values) > 1:
+            self._drop(next(iter(self._values)))
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._cond:
+            entry = self._live(key)
+        return None if entry is None else entry[0]
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        with self._cond:
+            self._put(key, value, ttl)
+
+    def set_nx(self, key: str, value: bytes, ttl: float) -> bool:
+        with self._cond:
+            if self._live(key) is not None:
+                return False
+            self._put(key, value, ttl)
+            return True
+
+    def delete_if(self, key: str, value: bytes) -> None:
+        with self._cond:
+            entry = self._live(key)
+            if entry is not None and entry[0] == value:
+                self._drop(key)
+
+    # lists behave like Redis: empty ones don't exist, and a TTL drops the whole list
+
+    def _list(self, key: str) -> deque:
+        expiry = self._list_expiry.get(key)
+        if expiry is not None and expiry <= time.monotonic():
+            self._drop_list(key)
+        return self._lists.get(key) or deque()
+
+    def _drop_list(self, key: str) -> None:
+        self._lists.pop(key, None)
+        self._list_expiry.pop(key, None)
+
+    def _sweep_lists(self) -> None:
+        now = time.monotonic()
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + LIST_SWEEP_S
+        for key in [k for k, t in self._list_expiry.items() if t <= now]:
+            self._drop_list(key)
+
+    def _append(self, key: str, value: bytes) -> None:
+        self._sweep_lists()
+        self._list(key)
+        self._lists.setdefault(key, deque()).append(value)
+
+    def push(self, key: str, value: bytes) -> None:
+        with self._cond:
+            self._append(key, value)
+            self._cond.notify_all()
+
+    def pop(self, key: str, timeout: float) -> Optional[bytes]:
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while not self._list(key):
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    return None
+                self._cond.wait(left)
+            items = self._lists[key]
+            value = items.popleft()
+            if not items:
+                self._drop_list(key)
+            return value
+
+    def remove(self, key: str, value: bytes) -> int:
+        with self._cond:
+            items = self._list(key)
+            kept = deque(v for v in items if v != value)
+            if kept:
+                self._lists[key] = kept
+            else:
+                self._drop_list(key)
+            return len(items) - len(kept)
+
+    def length(self, key: str) -> int:
+        with self._cond:
+            return len(self._list(key))
+
+    def append(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        with self._cond:
+            self._append(key, value)
+            if ttl:
+                self._list_expiry[key] = time.monotonic() + ttl
+
+    def range(self, key: str, start: int) -> List[bytes]:
+        with self._cond:
+            return list(self._list(key))[start:]
+
+
+class RedisStore:
+    name = "redis"
+
+    # delete the lock only if we still hold it
+    _RELEASE = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+
+    def __init__(self, url: str):
+        import redis
+
+        self.client = redis.Redis.from_url(url, socket_connect_timeout=1.0)
+        self.client.ping()
+        self._release = self.client.register_script(self._RELEASE)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(key)
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        self.client.set(key, value, px=int(ttl * 1000) if ttl else None)
+
+    def set_nx(self, key: str, value: bytes, ttl: float) -> bool:
+        return bool(self.client.set(key, value, nx=True, px=int(ttl * 1000)))
+
+    def delete_if(self, key: str, value: bytes) -> None:
+        self._release(keys=[key], args=[value])
+
+    def push(self, key: str, value: bytes) -> None:
+        self.client.rpush(key, value)
+
+    def pop(self, key: str, timeout: float) -> Optional[bytes]:
+        item = self.client.blpop([key], timeout=max(timeout, 0.01))
+        return None if item is None else item[1]
+
+    def remove(self, key: str, value: bytes) -> int:
+        return int(self.client.lrem(key, 0, value))
+
+    def length(self, key: str) -> int:
+        return int(self.client.llen(key))
+
+    def append(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        pipe = self.client.pipeline()
+        pipe.rpush(key, value)
+        if ttl:
+            pipe.pexpire(key, int(ttl * 1000))
+        pipe.execute()
+
+    def range(self, key: str, start: int) -> List[bytes]:
+        return self.client.lrange(key, start, -1)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """The process-wide store, connected on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            backend = settings.CACHE_BACKEND
+            if backend == "memory":
+                _store = MemoryStore()
+            else:
+                try:
+                    _store = RedisStore(settings.REDIS_URL)
+                except Exception:
+                    if backend == "redis":
+                        raise
+                    _store = MemoryStore()
+        return _store
+
+
+class SharedCache:
+    def __init__(self, ttl: float, lock_timeout: float):
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.hits = 0
+        self.misses = 0
+        # misses answered by another caller's computation
+        self.collapsed = 0
+        self._lock = threading.Lock()
+
+    def _count(self, hit: bool, collapsed: bool = False) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+                self.collapsed += collapsed
+            else:
+                self.misses += 1
+
+    def get_or_compute(
+        self, namespace: str, parts: tuple, compute: Callable[[], Any], ttl: Optional[float] = None
+    ) -> Any:
+        if self.ttl <= 0:
+            # disabled (CACHE_TTL <= 0)
+            return compute()
+        store = get_store()
+        key = cache_key(namespace, *parts)
+        lock = f"{key}:lock"
+        token = uuid.uuid4().hex.encode()
+        while True:
+            data = store.get(key)
+            if data is not None:
+                self._count(hit=True)
+                return loads(data)
+            if store.set_nx(lock, token, self.lock_timeout):
+                break
+            # someone else is computing it; wait for the value or the lock to lapse
+            while store.get(lock) is not None:
+                time.sleep(LOCK_POLL_S)
+                data = store.get(key)
+                if data is not None:
+                    self._count(hit=True, collapsed=True)
+                    return loads(data)
+
+        try:
+            # the holder may have finished between our get and set_nx
+            data = store.get(key)
+            if data is not None:
+                self._count(hit=True)
+                return loads(data)
+            self._count(hit=False)
+            value = compute()
+            store.set(key, dumps(value), ttl or self.ttl)
+            return value
+        finally:
+            store.delete_if(lock, token)
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = {"hits": self.hits, "misses": self.misses, "collapsed": self.collapsed}
+        return {"backend": get_store().name, **counts}
+
+
+shared_cache = SharedCache(settings.CACHE_TTL, settings.CACHE_LOCK_TIMEOUT)
+
+
+class JobQueue:
+    """
+    FIFO of job ids with a record and an append-only event log per job.
+    ``claim`` hands each job to exactly one worker; records and logs expire
+    ``ttl`` seconds after their last update.
+    """
+
+    def __init__(self, name: str, ttl: float):
+        self.name = name
+        self.ttl = ttl
+        self._queue = f"{PREFIX}:queue:{name}"
+
+    def _key(self, job_id: str, what: str) -> str:
+        return f"{PREFIX}:job:{self.name}:{job_id}:{what}"
+
+    def enqueue(self, job_id: str, payload: dict) -> None:
+        store = get_store()
+        store.set(self._key(job_id, "payload"), dumps(payload), self.ttl)
+        store.push(self._queue, job_id.encode())
+
+    def claim(self, timeout: float) -> Optional[tuple]:
+        """(job_id, payload) of the oldest queued job, or None after ``timeout``."""
+        store = get_store()
+        raw = store.pop(self._queue, timeout)
+        if raw is None:
+            return None
+        job_id = raw.decode()
+        data = store.get(self._key(job_id, "payload"))
+        return (job_id, loads(data)) if data is not None else None
+
+    def withdraw(self, job_id: str) -> bool:
+        """Remove a job that no worker has claimed yet."""
+        return get_store().remove(self._queue, job_id.encode()) > 0
+
+    def depth(self) -> int:
+        return get_store().length(self._queue)
+
+    def put_record(self, job_id: str, record: dict) -> None:
+        get_store().set(self._key(job_id, "record"), dumps(record), self.ttl)
+
+    def record(self, job_id: str) -> Optional[dict]:
+        data = get_store().get(self._key(job_id, "record"))
+        return None if data is None else loads(data)
+
+    def add_event(self, job_id: str, event: dict) -> None:
+        get_store().append(self._key(job_id, "events"), dumps(event), self.ttl)
+
+    def events(self, job_id: str, start: int = 0) -> List[dict]:
+        return [loads(e) for e in get_store().range(self._key(job_id, "events"), start)]
+
+    def request_cancel(self, job_id: str) -> None:
+        get_store().set(self._key(job_id, "cancel"), b"1", self.ttl)
+
+    def cancel_requested(self, job_id: str) -> bool:
+        return get_store().get(self._key(job_id, "cancel")) is not None
@@ -8,6 +8,92 @@ class Settings(BaseSettings):
     POSTGRES_PORT: int = 5433
     REDIS_URL: str = "redis://localhost:6379/0"
 
+    # --- Startup ---
+    # "eager" imports every router before serving; "lazy" imports a heavy
+    # router on the first request to its prefix; "background" also warms
+    # them all up on a thread once the server is up. MODEL_PRELOAD is
+    # skipped in "lazy" mode since it needs torch.
+    STARTUP_MODE: str = "background"
+
+    # --- Price data ---
+    # "yfinance" downloads missing ranges; "local" reads <PRICE_LOCAL_DIR>/<SYMBOL>.csv
+    PRICE_SOURCE: str = "yfinance"
+    PRICE_LOCAL_DIR: str = "data/local"
+    PRICE_STORE_DIR: str = "data/prices"
+    RETURNS_CACHE_BYTES: int = 256 * 1024 * 1024
+    # seconds a window ending today or later is shared across workers; it
+    # skips the per-process cache, since new bars keep arriving; 0 disables
+    RETURNS_LIVE_TTL: float = 60.0
+
+    # --- Shared cache ---
+    # "redis" (REDIS_URL), "memory" (this process only), or "auto": Redis
+    # when reachable, memory otherwise
+    CACHE_BACKEND: str = "auto"
+    # seconds a cached returns frame / graph / explanation is kept; 0 disables
+    CACHE_TTL: float = 3600.0
+    # seconds before an abandoned compute lock lapses and another worker retries
+    CACHE_LOCK_TIMEOUT: float = 120.0
+    # key for signing cached payloads (same in every worker); empty = unsigned,
+    # which trusts every client that can write to Redis
+    CACHE_SECRET: str = ""
+    # seconds a job record and its event log outlive their last update
+    JOB_TTL: float = 7 * 24 * 3600.0
+    # seconds a worker keeps a finished job in memory; after that status
+    # and events are read back from the job queue
+    JOB_RETENTION: float = 3600.0
+
+    # --- Execution ---
+    # process pool for CPU-bound handlers; 0 = one worker per core
+    EXEC_WORKERS: int = 0
+    # per endpoint group concurrency, e.g. "explain=2,causal=4"; default EXEC_WORKERS
+    EXEC_LIMITS: str = ""
+    # calls allowed to wait per group before new ones get 429
+    EXEC_QUEUE: int = 16
+    # seconds before a call is abandoned with 504
+    EXEC_TIMEOUT: float = 300.0
+
+    # --- Models ---
+    MODEL_DIR: str = "models"
+    MODEL_CACHE_SIZE: int = 8
+    MODEL_CACHE_BYTES: int = 512 * 1024 * 1024
+    # comma-separated model ids to load at startup, in each exec/SHAP pool
+    # worker and (with INFER_BATCHING) in the API process
+    MODEL_PRELOAD: str = ""
+    # rows per policy forward pass in batched rollouts
+    ROLLOUT_BATCH_SIZE: int = 4096
+    # training jobs that may run at once; the rest wait in the queue
+    TRAIN_CONCURRENCY: int = 2
+    # grid-search trial pool size; 0 = one worker per core
+    GRIDSEARCH_WORKERS: int = 0
+
+    # --- Inference ---
+    # merge concurrent /agent/predict forward passes per model; off runs
+    # each request's rollout in the exec pool instead
+    INFER_BATCHING: bool = True
+    # how long the first request of a batch waits for others to join
+    INFER_WINDOW_MS: float = 2.0
+    # observation rows that flush a batch early
+    INFER_MAX_BATCH: int = 4096
+    # torch intra-op threads for the API process's forward passes; the exec
+    # workers already use one core each. 0 = torch's default (every core)
+    INFER_THREADS: int = 1
+
+    # --- Causal ---
+    # discovered graphs (+ fitted SEMs) kept for what-if queries
+    GRAPH_CACHE_SIZE: int = 64
+    # bootstrap resampling pool size; 0 = one worker per core
+    BOOTSTRAP_WORKERS: int = 0
+
+    # --- Explainability ---
+    # KernelSHAP pool size; 0 = one worker per core, 1 = run in-process
+    SHAP_WORKERS: int = 0
+
+    # --- Metrics ---
+    # allow X-Debug-Profile: 1 to sample a request into PROFILE_DIR
+    PROFILE_ENABLED: bool = False
+    PROFILE_INTERVAL_MS: float = 5.0
+    PROFILE_DIR: str = "profiles"
+
     class Config:
         env_file = ".env"
 
@@ -0,0 +1,123 @@
+"""
+Counterfactual sweeps: how the policy's decisions change when one
+symbol's returns are scaled by (1 + delta).
+
+A decision depends only on its own observation row, so every (feature,
+delta) scenario is a perturbed copy of the (T, D) observation matrix, and
+all of them go through the policy as one (S * T, D) batch. With a windowed
+model the perturbed column is the symbol's return on the decision day;
+earlier days and derived features in the window are held fixed. Minimal
+flipping deltas are found per (feature, day) by first stepping through a
+coarse grid of ``FLIP_GRID`` magnitudes up to ``max_delta`` and then
+bisecting the first grid step that flips, with every still-open interval
+evaluated in the same batched forward pass. A flip that only happens
+between two grid points that both keep the decision is not found.
+"""
+from typing import Sequence, Tuple
+
+import numpy as np
+
+from .core import settings
+from .metrics import timed
+
+# scenario rows materialized at once; bounds memory for large sweeps
+MAX_SWEEP_ROWS = 64 * settings.ROLLOUT_BATCH_SIZE
+# coarse magnitudes tried, up to max_delta, before bisecting
+FLIP_GRID = 8
+
+
+def policy_actions(model, obs: np.ndarray, n_symbols: int) -> np.ndarray:
+    """Deterministic, clamped action index for each row of ``obs``."""
+    from .api.agent import policy_logits
+
+    return np.clip(policy_logits(model, obs).argmax(axis=1), 0, n_symbols - 1)
+
+
+@timed("sweep")
+def sweep_actions(
+    model, obs: np.ndarray, features: Sequence[int], deltas: Sequence[float]
+) -> np.ndarray:
+    """
+    Actions under every scenario: (S, T) for S = len(features) pairs, where
+    scenario s scales column ``features[s]`` of ``obs`` by ``1 + deltas[s]``.
+    """
+    n_steps, width = obs.shape
+    n_symbols = model.action_space.n
+    features = np.asarray(features, dtype=np.intp)
+    scale = np.ones((len(features), 1, width), dtype=np.float32)
+    scale[np.arange(len(features)), 0, features] += np.asarray(deltas, dtype=np.float32)
+
+    per_chunk = max(1, MAX_SWEEP_ROWS // max(n_steps, 1))
+    out = np.empty((len(features), n_steps), dtype=np.intp)
+    for lo in range(0, len(features), per_chunk):
+        batch = obs[None] * scale[lo:lo + per_chunk]  # (s, T, D)
+        out[lo:lo + per_chunk] = policy_actions(
+            model, batch.reshape(-1, width), n_symbols
+        ).reshape(len(batch), n_steps)
+    return out
+
+
+@timed("minimal_flips")
+def minimal_flips(
+    model,
+    obs: np.ndarray,
+    base_actions: np.ndarray,
+    features: Sequence[int],
+    max_delta: float,
+    steps: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Smallest |delta| <= ``max_delta`` (to within max_delta / 2**steps) that
+    changes each day's decision when applied to each feature, searching up
+    and down. Returns signed deltas (F, T), NaN where neither direction
+    flips within range, and the action taken at that delta (-1 if none).
+    """
+    n_steps = len(obs)
+    n_symbols = model.action_space.n
+    features = np.asarray(features, dtype=np.intp)
+    # one search per (feature, direction, day)
+    f = np.repeat(features, 2 * n_steps)
+    sign = np.tile(np.repeat([1.0, -1.0], n_steps), len(features))
+    t = np.tile(np.arange(n_steps), 2 * len(features))
+
+    def evaluate(idx: np.ndarray, mag: np.ndarray) -> np.ndarray:
+        rows = obs[t[idx]].copy()
+        rows[np.arange(len(idx)), f[idx]] *= (1.0 + sign[idx] * mag).astype(np.float32)
+        return policy_actions(model, rows, n_symbols)
+
+    # bracket each search with the first grid magnitude that flips it, so a
+    # decision that flips and flips back before max_delta is still found
+    hi = np.full(len(f), float(max_delta))
+    lo = np.zeros(len(f))
+    hi_action = np.full(len(f), -1, dtype=np.intp)
+    pending = np.arange(len(f))
+    grid = np.linspace(0.0, float(max_delta), FLIP_GRID + 1)
+    for below, mag in zip(grid[:-1], grid[1:]):
+        if not len(pending):
+            break
+        action = evaluate(pending, np.full(len(pending), mag))
+        flipped = action != base_actions[t[pending]]
+        hit = pending[flipped]
+        lo[hit], hi[hit], hi_action[hit] = below, mag, action[flipped]
+        pending = pending[~flipped]
+    open_ = np.flatnonzero(hi_action >= 0)  # searches with a flip in range
+    for _ in range(steps):
+        if not len(open_):
+            break
+        mid = (lo[open_] + hi[open_]) / 2
+        action = evaluate(open_, mid)
+        flipped = action != base_actions[t[open_]]
+        hi[open_[flipped]] = mid[flipped]
+        hi_action[open_[flipped]] = action[flipped]
+        lo[open_[~flipped]] = mid[~flipped]
+
+    found = np.zeros(len(f), dtype=bool)
+    found[open_] = True
+    signed = np.where(found, sign * hi, np.nan).reshape(len(features), 2, n_steps)
+    action = np.where(found, hi_action, -1).reshape(len(features), 2, n_steps)
+
+    # keep the smaller magnitude of the two directions
+    down = np.abs(signed[:, 1]) < np.nan_to_num(np.abs(signed[:, 0]), nan=np.inf)
+    best = np.where(down, signed[:, 1], signed[:, 0])
+    best_action = np.where(down, action[:, 1], action[:, 0])
+    return best, best_action
@@ -11,6 +11,16 @@ SQLALCHEMY_DATABASE_URL = (
     f"{settings.POSTGRES_DB}"
 )
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL, pool_pre_ping=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
\ No newline at end of file
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+Base = declarative_base()
+
+_engine = None
+
+
+def get_engine():
+    """Created on first use, so importing this module doesn't load the DB driver."""
+    global _engine
+    if _engine is None:
+        _engine = create_engine(SQLALCHEMY_DATABASE_URL, pool_pre_ping=True)
+        SessionLocal.configure(bind=_engine)
+    return _engine
@@ -0,0 +1,191 @@
+"""
+Admission control and offloading for CPU-bound handlers.
+
+Heavy endpoints are ``async def`` wrappers around a plain function that
+``offload`` runs either in the shared "exec" process pool (so the GIL of
+the API process stays free for light routes) or, for handlers that drive
+their own pools or need in-process state, on a worker thread.
+
+Each endpoint group has a ``Gate``: at most ``limit`` calls run at once,
+at most ``EXEC_QUEUE`` more wait, and anything beyond that is rejected
+with 429 and a Retry-After estimate. Every call has a deadline
+(``EXEC_TIMEOUT``) and is abandoned when the client disconnects; work that
+has not started in the pool yet is cancelled, work that has is left to
+finish and its result dropped.
+"""
+import asyncio
+import math
+import time
+from functools import partial
+from typing import Callable, Dict, Optional
+
+from fastapi import HTTPException, Request
+
+from . import metrics
+from .core import settings
+from .workers import cpu_workers, get_pool
+
+# how often a waiting call checks whether its client is still there
+DISCONNECT_POLL_S = 0.25
+
+
+def _limits() -> Dict[str, int]:
+    limits = {}
+    for part in settings.EXEC_LIMITS.split(","):
+        name, _, value = part.partition("=")
+        if name.strip() and value.strip():
+            limits[name.strip()] = int(value)
+    return limits
+
+
+class Gate:
+    def __init__(self, name: str, limit: int, queue: int):
+        self.name = name
+        self.limit = limit
+        self.queue = queue
+        # admitted calls: running plus waiting for a slot
+        self.pending = 0
+        self.running = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.abandoned = 0
+        # moving average of service time, for Retry-After
+        self.avg_s = 1.0
+        self._sem: Optional[asyncio.Semaphore] = None
+
+    @property
+    def sem(self) -> asyncio.Semaphore:
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(self.limit)
+        return self._sem
+
+    @property
+    def waiting(self) -> int:
+        return max(0, self.pending - self.running)
+
+    def full(self) -> bool:
+        return self.pending >= self.limit + self.queue
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.avg_s * (self.waiting + 1) / self.limit))
+
+    def record(self, seconds: float) -> None:
+        self.avg_s = 0.8 * self.avg_s + 0.2 * seconds
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "queue": self.queue,
+            "running": self.running,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "abandoned": self.abandoned,
+            "avg_s": self.avg_s,
+        }
+
+
+_gates: Dict[str, Gate] = {}
+
+
+def gate(name: str) -> Gate:
+    g = _gates.get(name)
+    if g is None:
+        limit = _limits().get(name, cpu_workers(settings.EXEC_WORKERS))
+        g = _gates[name] = Gate(name, limit, settings.EXEC_QUEUE)
+    return g
+
+
+def gate_stats() -> Dict[str, dict]:
+    return {name: g.stats() for name, g in _gates.items()}
+
+
+async def _admitted(g: Gate, fn: Callable, args: tuple, isolate: bool, timeout: float):
+    await g.sem.acquire()
+    g.running += 1
+    t0 = time.perf_counter()
+    # the worker times its stages (and samples itself when profiling) and
+    # hands them back with the result
+    call = partial(metrics.collect, fn, args, isolate and metrics.profiling())
+    try:
+        if isolate:
+            pool = get_pool("exec", cpu_workers(settings.EXEC_WORKERS), preload=True)
+            work = asyncio.wrap_future(pool.submit(call))
+        else:
+            work = asyncio.get_running_loop().run_in_executor(None, call)
+        try:
+            # cancelling the asyncio future cancels the pool future if it hasn't started
+            result, stages, stacks, caches = await asyncio.wait_for(work, timeout)
+        except asyncio.TimeoutError:
+            g.timed_out += 1
+            raise HTTPException(504, "Request deadline exceeded")
+        metrics.merge(stages, stacks, caches)
+        return result
+    finally:
+        g.running -= 1
+        g.sem.release()
+        g.record(time.perf_counter() - t0)
+
+
+async def _watch_disconnect(request: Request) -> None:
+    while not await request.is_disconnected():
+        await asyncio.sleep(DISCONNECT_POLL_S)
+
+
+async def _client_left(request: Request, task: asyncio.Future) -> bool:
+    """Wait for ``task`` or a disconnect; if the client went first, cancel ``task``."""
+    watcher = asyncio.ensure_future(_watch_disconnect(request))
+    try:
+        await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+    if task.done():
+        return False
+    task.cancel()
+    return True
+
+
+async def until_disconnect(request: Request, awaitable):
+    """Await ``awaitable``, cancelling it with a 499 if the client disconnects first."""
+    task = asyncio.ensure_future(awaitable)
+    if await _client_left(request, task):
+        raise HTTPException(499, "Client closed request")
+    return task.result()
+
+
+async def offload(
+    name: str,
+    fn: Callable,
+    *args,
+    request: Optional[Request] = None,
+    isolate: bool = True,
+    timeout: Optional[float] = None,
+):
+    """
+    Run ``fn(*args)`` under gate ``name``: in the exec process pool if
+    ``isolate`` (``fn`` and its arguments must pickle), else on a thread.
+    """
+    g = gate(name)
+    if g.full():
+        g.rejected += 1
+        raise HTTPException(
+            429,
+            f"Too many concurrent {name} requests; retry later",
+            headers={"Retry-After": str(g.retry_after())},
+        )
+
+    # counted before the first await so concurrent arrivals see each other
+    g.pending += 1
+    try:
+        task = asyncio.ensure_future(
+            _admitted(g, fn, args, isolate, timeout or settings.EXEC_TIMEOUT)
+        )
+        if request is None:
+            return await task
+        if await _client_left(request, task):
+            g.abandoned += 1
+            # nobody is listening; 499 is what nginx logs for this
+            raise HTTPException(499, "Client closed request")
+        return task.result()
+    finally:
+        g.pending -= 1
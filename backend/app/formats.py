@@ -0,0 +1,116 @@
+"""
+Response formats for the large array payloads (predictions, per-decision
+attributions), chosen from the request's Accept header:
+
+    application/json      the documented response model (default); encoded
+                          straight from the arrays with orjson, no per-item
+                          pydantic objects
+    application/x-msgpack columnar: one map of columns, where numeric arrays
+                          are ``{"dtype", "shape", "data"}`` with ``data`` the
+                          raw little-endian buffer (``np.frombuffer`` reads it)
+    application/x-ndjson  one JSON object per row, streamed in batches while
+                          the body is being encoded
+
+Handlers return the computed arrays from their worker and call ``respond``
+with three builders, of which only the negotiated one runs.
+"""
+from typing import Callable, Iterable, Iterator
+
+import numpy as np
+import orjson
+from fastapi import HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+
+from .metrics import stage
+
+JSON = "application/json"
+MSGPACK = "application/x-msgpack"
+NDJSON = "application/x-ndjson"
+
+FORMATS = (JSON, MSGPACK, NDJSON)
+ALIASES = {
+    "application/msgpack": MSGPACK,
+    "application/vnd.msgpack": MSGPACK,
+    "application/jsonl": NDJSON,
+    "application/x-jsonlines": NDJSON,
+    "*/*": JSON,
+    "application/*": JSON,
+}
+
+# rows per chunk written to an NDJSON stream
+NDJSON_BATCH = 256
+
+# extra content types for the OpenAPI docs of routes that call ``respond``
+RESPONSES = {200: {"content": {MSGPACK: {}, NDJSON: {}}}}
+
+_ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def negotiate(request: Request) -> str:
+    """The best supported format in Accept; JSON if there is no preference."""
+    accept = request.headers.get("accept", "").strip()
+    if not accept:
+        return JSON
+    offers = []
+    for part in accept.split(","):
+        media, *params = [p.strip() for p in part.split(";")]
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        offers.append((q, media.lower()))
+    # stable sort: equal q keeps the client's order
+    for q, media in sorted(offers, key=lambda o: -o[0]):
+        media = ALIASES.get(media, media)
+        if q > 0 and media in FORMATS:
+            return media
+    raise HTTPException(406, f"Supported formats: {', '.join(FORMATS)}")
+
+
+def _pack_default(obj):
+    if isinstance(obj, np.ndarray):
+        arr = np.ascontiguousarray(obj, dtype=obj.dtype.newbyteorder("<"))
+        return {"dtype": arr.dtype.str, "shape": list(arr.shape), "data": arr.tobytes()}
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Cannot pack {type(obj).__name__}")
+
+
+def pack(columns: dict) -> bytes:
+    import msgpack
+
+    return msgpack.packb(columns, default=_pack_default, use_bin_type=True)
+
+
+def _ndjson(rows: Iterable[dict]) -> Iterator[bytes]:
+    batch = []
+    for row in rows:
+        batch.append(orjson.dumps(row, option=_ORJSON_OPTIONS))
+        if len(batch) >= NDJSON_BATCH:
+            yield b"\n".join(batch) + b"\n"
+            batch = []
+    if batch:
+        yield b"\n".join(batch) + b"\n"
+
+
+def respond(
+    fmt: str,
+    document: Callable[[], dict],
+    columns: Callable[[], dict],
+    rows: Callable[[], Iterable[dict]],
+) -> Response:
+    """
+    ``document`` builds the JSON body (the response model's shape),
+    ``columns`` the msgpack map and ``rows`` the NDJSON rows.
+    """
+    if fmt == NDJSON:
+        # a sync iterator: Starlette encodes it on a worker thread
+        return StreamingResponse(_ndjson(rows()), media_type=NDJSON)
+    with stage("encode"):
+        if fmt == MSGPACK:
+            return Response(pack(columns()), media_type=MSGPACK)
+        return Response(orjson.dumps(document(), option=_ORJSON_OPTIONS), media_type=JSON)
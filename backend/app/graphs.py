@@ -0,0 +1,121 @@
+"""
+Discovered causal graphs with fitted linear SEMs, cached for what-if queries.
+
+A graph is keyed by (symbols, dates, alpha, returns digest), so a what-if
+after a discover reuses the graph instead of re-running PC. PC returns a
+CPDAG; undirected (and bidirected) edges are oriented from the lower to
+the higher symbol index, and if the result still has a cycle every edge
+is oriented that way. The SEM is x_j = sum_i B[i, j] x_i + e_j with B
+fitted by least squares of each node on its parents.
+"""
+import threading
+from collections import OrderedDict, defaultdict
+from graphlib import CycleError, TopologicalSorter
+from typing import Callable, Dict, Hashable, List
+
+import numpy as np
+from scipy.linalg import solve_triangular
+
+from .core import settings
+
+
+def orient(mat: np.ndarray) -> np.ndarray:
+    """causallearn adjacency -> (N, N) bool DAG mask, ``dag[i, j]`` meaning i -> j."""
+    mat = np.asarray(mat)
+    directed = (mat == -1) & (mat.T == 1)
+    linked = (mat != 0) | (mat.T != 0)
+    upper = np.triu(np.ones(mat.shape, dtype=bool), 1)
+    dag = directed | (linked & ~directed & ~directed.T & upper)
+    try:
+        topological_order(dag)
+    except CycleError:
+        dag = linked & upper
+    return dag
+
+
+def topological_order(dag: np.ndarray) -> np.ndarray:
+    sorter = TopologicalSorter({j: np.flatnonzero(dag[:, j]).tolist() for j in range(len(dag))})
+    return np.array(list(sorter.static_order()), dtype=np.intp)
+
+
+class LinearSEM:
+    def __init__(self, dag: np.ndarray, x: np.ndarray):
+        self.dag = dag
+        self.order = topological_order(dag)
+        n_vars = len(dag)
+        cov = np.cov(np.asarray(x, dtype=np.float64), rowvar=False).reshape(n_vars, n_vars)
+
+        # nodes with the same number of parents share one batched solve
+        by_k = defaultdict(list)
+        for j in range(n_vars):
+            by_k[int(dag[:, j].sum())].append(j)
+        self.coef = np.zeros((n_vars, n_vars))
+        self.noise_var = np.diag(cov).copy()
+        for k, nodes in by_k.items():
+            if k == 0:
+                continue
+            nodes = np.array(nodes)
+            parents = np.stack([np.flatnonzero(dag[:, j]) for j in nodes])
+            a = cov[parents[:, :, None], parents[:, None, :]]
+            b = cov[parents, nodes[:, None]]
+            try:
+                beta = np.linalg.solve(a, b[..., None])[..., 0]
+            except np.linalg.LinAlgError:
+                # collinear parents somewhere in the batch
+                beta = (np.linalg.pinv(a, hermitian=True) @ b[..., None])[..., 0]
+            self.coef[parents, nodes[:, None]] = beta
+            self.noise_var[nodes] -= (beta * b).sum(axis=1)
+
+    def propagate(self, shocks: np.ndarray) -> np.ndarray:
+        """
+        Total effect on every node of exogenous shocks ``(S, N)``, i.e.
+        x = shocks (I - B)^-1, as one triangular solve in topological order.
+        """
+        order = self.order
+        b = self.coef[np.ix_(order, order)]  # strictly upper triangular
+        lhs = np.eye(len(b)) - b.T
+        x = solve_triangular(lhs, np.atleast_2d(shocks)[:, order].T, lower=True, unit_diagonal=True)
+        out = np.empty_like(x.T)
+        out[:, order] = x.T
+        return out
+
+
+class CausalGraph:
+    def __init__(self, symbols: List[str], mat: np.ndarray, x: np.ndarray):
+        self.symbols = list(symbols)
+        self.mat = np.asarray(mat)
+        self.sem = LinearSEM(orient(self.mat), x)
+
+
+class GraphCache:
+    """Thread-safe LRU of ``CausalGraph`` bounded by count."""
+
+    def __init__(self, max_items: int):
+        self.max_items = max_items
+        self._items: "OrderedDict[Hashable, CausalGraph]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], CausalGraph]) -> CausalGraph:
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return item
+            self.misses += 1
+
+        item = compute()
+        with self._lock:
+            self._items[key] = item
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+        return item
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._items)}
+
+
+graph_cache = GraphCache(settings.GRAPH_CACHE_SIZE)
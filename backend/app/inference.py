@@ -0,0 +1,145 @@
+"""
+Micro-batching for concurrent /agent/predict calls.
+
+Each request submits its observation matrix under its model id. The
+first submission for a model opens a batch that waits ``INFER_WINDOW_MS``
+for others to join, or less if ``INFER_MAX_BATCH`` rows arrive first.
+The batch then goes through the policy in one forward pass on the
+inference thread, and each request gets back its own slice of logits.
+While one batch runs, the next one for the same model fills up.
+
+Forward passes run on a single thread in the API process, so torch's
+intra-op pool (``INFER_THREADS``, one thread by default, next to the
+exec pool's one per worker) is the only parallelism and requests never
+oversubscribe the cores. A request whose client disconnects is cancelled
+(see ``execution.until_disconnect``) and left out of its batch if that
+has not run yet. Batch sizes and queueing delay go to the
+``tcarp_inference_*`` histograms; ``stats()`` has running totals.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from .core import settings
+from .metrics import INFERENCE_BATCH_REQUESTS, INFERENCE_BATCH_ROWS, INFERENCE_QUEUE_SECONDS
+from .registry import model_registry
+
+
+class _Pending(NamedTuple):
+    obs: np.ndarray
+    future: asyncio.Future
+    submitted: float
+
+
+def _init_thread(threads: int) -> None:
+    import torch
+
+    if threads > 0:
+        torch.set_num_threads(threads)
+
+
+class InferenceScheduler:
+    def __init__(self, window_ms: float, max_batch: int, threads: int):
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self.threads = threads
+        self._pending: Dict[str, List[_Pending]] = {}
+        self._rows: Dict[str, int] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.batches = 0
+        self.requests = 0
+        self.rows = 0
+        self.queue_s = 0.0
+        self.failed = 0
+        self.dropped = 0
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                1, thread_name_prefix="inference", initializer=_init_thread, initargs=(self.threads,)
+            )
+        return self._executor
+
+    async def logits(self, model_id: str, obs: np.ndarray) -> np.ndarray:
+        """Action logits for each row of ``obs``, computed with whatever else is pending."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.setdefault(model_id, []).append(_Pending(obs, future, time.perf_counter()))
+        self._rows[model_id] = self._rows.get(model_id, 0) + len(obs)
+        if self._rows[model_id] >= self.max_batch:
+            self._flush(model_id)
+        elif model_id not in self._timers:
+            self._timers[model_id] = loop.call_later(self.window, self._flush, model_id)
+        return await future
+
+    def _flush(self, model_id: str) -> None:
+        timer = self._timers.pop(model_id, None)
+        if timer is not None:
+            timer.cancel()
+        self._rows.pop(model_id, None)
+        # requests whose client went away are dropped before the forward pass
+        pending = self._pending.pop(model_id, [])
+        batch = [p for p in pending if not p.future.done()]
+        self.dropped += len(pending) - len(batch)
+        if not batch:
+            return
+        work = asyncio.get_running_loop().run_in_executor(
+            self.executor, self._run, model_id, [p.obs for p in batch], [p.submitted for p in batch]
+        )
+        work.add_done_callback(lambda f: self._scatter(batch, f))
+
+    def _run(self, model_id: str, parts: List[np.ndarray], submitted: List[float]) -> List[np.ndarray]:
+        from .api.agent import policy_logits
+
+        started = time.perf_counter()
+        for t in submitted:
+            INFERENCE_QUEUE_SECONDS.observe((model_id,), started - t)
+        rows = sum(len(p) for p in parts)
+        INFERENCE_BATCH_REQUESTS.observe((model_id,), len(parts))
+        INFERENCE_BATCH_ROWS.observe((model_id,), rows)
+        self.batches += 1
+        self.requests += len(parts)
+        self.rows += rows
+        self.queue_s += sum(started - t for t in submitted)
+
+        model = model_registry.load(model_id)
+        obs = parts[0] if len(parts) == 1 else np.concatenate(parts)
+        logits = policy_logits(model, obs)
+        return np.split(logits, np.cumsum([len(p) for p in parts])[:-1])
+
+    def _scatter(self, batch: List[_Pending], work: asyncio.Future) -> None:
+        error = work.exception()
+        if error is not None:
+            self.failed += 1
+        for i, p in enumerate(batch):
+            if p.future.done():
+                continue
+            if error is not None:
+                p.future.set_exception(error)
+            else:
+                p.future.set_result(work.result()[i])
+
+    def stats(self) -> dict:
+        return {
+            "window_ms": self.window * 1000.0,
+            "max_batch": self.max_batch,
+            "threads": self.threads,
+            "batches": self.batches,
+            "requests": self.requests,
+            "rows": self.rows,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "pending": sum(len(q) for q in self._pending.values()),
+            "avg_batch_requests": self.requests / self.batches if self.batches else 0.0,
+            "avg_queue_ms": 1000.0 * self.queue_s / self.requests if self.requests else 0.0,
+        }
+
+
+inference_scheduler = InferenceScheduler(
+    settings.INFER_WINDOW_MS, settings.INFER_MAX_BATCH, settings.INFER_THREADS
+)
@@ -0,0 +1,338 @@
+"""
+Asynchronous PPO training jobs.
+
+``POST /agent/train`` only enqueues a job on the shared job queue; the
+first API worker with a free slot claims it and trains in a bounded
+process pool (``TRAIN_CONCURRENCY``). Pool workers report progress through
+a manager queue that a drainer thread folds into the job records, which
+are also published to the job queue so the status and Server-Sent Events
+endpoints work from any API worker. Finished jobs are dropped from memory
+after ``JOB_RETENTION`` and then served from the queue like any other.
+
+Importing this module is cheap (stable-baselines3 is only imported by the
+pool workers), and the manager process and drainer start with the first
+job a worker claims, so starting the dispatcher at boot keeps lazy startup.
+"""
+import time
+import uuid
+import threading
+import multiprocessing as mp
+from concurrent.futures import Future
+from datetime import date
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException
+
+from .cache import JobQueue
+from .core import settings
+from .observations import ObsSpec
+from .registry import model_registry
+from .workers import get_pool
+
+TERMINAL = ("done", "failed", "cancelled")
+
+
+class TrainingCancelled(Exception):
+    """Raised inside ``model.learn`` so a cancelled job never saves a model."""
+
+
+def _run_training(
+    job_id, model_id, symbols, start_date, end_date, timesteps, events, cancel_flags, num_envs=1,
+    spec=None,
+):
+    """Pool worker entry point."""
+    from .api.agent import _train_agent_internal
+    from .progress import ProgressCallback
+
+    events.put({"job_id": job_id, "type": "started", "time": time.time()})
+    callback = ProgressCallback(job_id, events, cancel_flags)
+    return _train_agent_internal(
+        symbols, start_date, end_date, timesteps,
+        model_id=model_id, callback=callback, num_envs=num_envs, spec=spec or ObsSpec(),
+    )
+
+
+class TrainingJob:
+    def __init__(self, job_id: str, model_id: str, symbols: List[str], timesteps: int):
+        self.job_id = job_id
+        self.model_id = model_id
+        self.symbols = symbols
+        self.timesteps = timesteps
+        self.status = "queued"
+        self.error: Optional[str] = None
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.events: List[dict] = []
+        self.future: Optional[Future] = None
+
+    @property
+    def wall_time(self) -> Optional[float]:
+        if self.started_at is None:
+            return None
+        return (self.finished_at or time.time()) - self.started_at
+
+    @property
+    def queue_wait(self) -> float:
+        return (self.started_at or time.time()) - self.submitted_at
+
+    def summary(self) -> dict:
+        progress = next((e for e in reversed(self.events) if e["type"] == "progress"), None)
+        return {
+            "job_id": self.job_id,
+            "model_id": self.model_id,
+            "status": self.status,
+            "total_timesteps": self.timesteps,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "queue_wait_s": self.queue_wait,
+            "wall_time_s": self.wall_time,
+            "error": self.error,
+            "progress": progress,
+        }
+
+
+class QueuedJob:
+    """
+    A job this worker is not running: still queued, or claimed by another
+    worker. Reads its record and event log from the shared job queue.
+    """
+
+    def __init__(self, queue: JobQueue, record: dict):
+        self._queue = queue
+        self._record = record
+        self.job_id = record["job_id"]
+        self.model_id = record["model_id"]
+        self.status = record["status"]
+
+    @property
+    def events(self) -> List[dict]:
+        return self._queue.events(self.job_id)
+
+    def summary(self) -> dict:
+        return self._record
+
+
+class TrainingJobManager:
+    """
+    Jobs go through a shared ``JobQueue``; every API worker runs a
+    dispatcher thread that claims a job whenever it has a free training
+    slot, so jobs spread across workers. Records and progress events are
+    published back to the queue for status requests served by any worker.
+    """
+
+    def __init__(self, concurrency: int):
+        self.concurrency = concurrency
+        self.queue = JobQueue("train", settings.JOB_TTL)
+        # jobs this worker has claimed, and ids of those it submitted
+        self._jobs: Dict[str, TrainingJob] = {}
+        self._submitted: List[str] = []
+        self._lock = threading.Lock()
+        self._slots = threading.Semaphore(concurrency)
+        self._started = False
+        self._manager = None
+        self._events = None
+        self._cancel_flags = None
+
+    def start(self) -> None:
+        """
+        Start the dispatcher. Called at startup so every API worker claims
+        queued jobs, not only those that submit one.
+        """
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._dispatch, name="train-dispatch", daemon=True).start()
+
+    def _ensure_manager(self) -> None:
+        # progress queue and cancel flags shared with the pool workers
+        with self._lock:
+            if self._manager is not None:
+                return
+            self._manager = mp.get_context("spawn").Manager()
+            self._events = self._manager.Queue()
+            self._cancel_flags = self._manager.dict()
+        threading.Thread(target=self._drain, name="train-progress", daemon=True).start()
+
+    def _publish(self, job: TrainingJob, event: Optional[dict] = None) -> None:
+        self.queue.put_record(job.job_id, job.summary())
+        if event is not None:
+            self.queue.add_event(job.job_id, event)
+
+    def _drain(self) -> None:
+        # job-finished notices go through the same queue as worker events,
+        # so they are always applied after the job's last progress event
+        while True:
+            try:
+                event = self._events.get()
+            except (EOFError, OSError):
+                # manager process went away (interpreter shutdown)
+                return
+            with self._lock:
+                job = self._jobs.get(event["job_id"])
+                if job is None:
+                    continue
+                if event["type"] == "started":
+                    job.status = "running"
+                    job.started_at = event["time"]
+                elif event["type"] == "finished":
+                    job.status = event["status"]
+                    job.error = event["error"]
+                    job.finished_at = event["time"]
+                    self._cancel_flags.pop(job.job_id, None)
+                    if job.status == "done":
+                        # the worker wrote the full metadata (symbols, window, features)
+                        model_registry.refresh(job.model_id)
+                    event = {"job_id": job.job_id, "type": job.status, **job.summary()}
+                job.events.append(event)
+            self._publish(job, event)
+
+    def _prune(self) -> None:
+        cutoff = time.time() - settings.JOB_RETENTION
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job.status in TERMINAL and job.finished_at < cutoff
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+        for job_id in expired:
+            # in case a cancel request raced the job's end
+            self._cancel_flags.pop(job_id, None)
+
+    def _dispatch(self) -> None:
+        while True:
+            self._prune()
+            self._forward_cancels()
+            if not self._slots.acquire(timeout=1.0):
+                continue
+            try:
+                claimed = self.queue.claim(timeout=1.0)
+            except Exception:
+                # store unreachable; try again shortly
+                time.sleep(1.0)
+                claimed = None
+            if claimed is None:
+                self._slots.release()
+                continue
+            self._start(*claimed)
+
+    def _forward_cancels(self) -> None:
+        # cancel requests made through another worker
+        with self._lock:
+            active = [j.job_id for j in self._jobs.values() if j.status not in TERMINAL]
+        for job_id in active:
+            if self.queue.cancel_requested(job_id):
+                self._cancel_flags[job_id] = True
+
+    def _start(self, job_id: str, payload: dict) -> None:
+        job = TrainingJob(job_id, payload["model_id"], payload["symbols"], payload["timesteps"])
+        job.submitted_at = payload["submitted_at"]
+        if self.queue.cancel_requested(job_id):
+            job.status = "cancelled"
+            job.finished_at = time.time()
+            self._publish(job, {"job_id": job_id, "type": "cancelled", **job.summary()})
+            self._slots.release()
+            return
+        self._ensure_manager()
+        with self._lock:
+            self._jobs[job_id] = job
+        pool = get_pool("train", self.concurrency)
+        job.future = pool.submit(
+            _run_training, job_id, job.model_id, job.symbols,
+            payload["start_date"], payload["end_date"], job.timesteps,
+            self._events, self._cancel_flags, payload["num_envs"], payload.get("spec"),
+        )
+        job.future.add_done_callback(lambda f: self._finish(job, f))
+
+    def _finish(self, job: TrainingJob, future: Future) -> None:
+        self._slots.release()
+        error = None
+        if future.cancelled() or isinstance(future.exception(), TrainingCancelled):
+            status = "cancelled"
+        elif future.exception() is not None:
+            exc = future.exception()
+            status = "failed"
+            error = str(getattr(exc, "detail", None) or exc) or type(exc).__name__
+        else:
+            status = "done"
+        self._events.put({
+            "job_id": job.job_id, "type": "finished", "status": status,
+            "error": error, "time": time.time(),
+        })
+
+    def submit(
+        self,
+        symbols: List[str],
+        start_date: date,
+        end_date: date,
+        timesteps: int,
+        num_envs: int = 1,
+        spec: Optional[ObsSpec] = None,
+    ) -> TrainingJob:
+        self.start()
+        job = TrainingJob(uuid.uuid4().hex, uuid.uuid4().hex, symbols, timesteps)
+        self.queue.put_record(job.job_id, job.summary())
+        self.queue.enqueue(job.job_id, {
+            "model_id": job.model_id, "symbols": symbols, "start_date": start_date,
+            "end_date": end_date, "timesteps": timesteps, "num_envs": num_envs,
+            "spec": spec, "submitted_at": job.submitted_at,
+        })
+        with self._lock:
+            self._submitted.append(job.job_id)
+        return job
+
+    def get(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        record = self.queue.record(job_id)
+        if record is None:
+            raise HTTPException(404, "Training job not found")
+        return QueuedJob(self.queue, record)
+
+    def cancel(self, job_id: str):
+        job = self.get(job_id)
+        if job.status in TERMINAL:
+            return job
+        if isinstance(job, TrainingJob):
+            if job.future is None or not job.future.cancel():
+                # already running: the worker's callback stops at the next step
+                self._cancel_flags[job_id] = True
+            return job
+        if self.queue.withdraw(job_id):
+            record = {**job.summary(), "status": "cancelled", "finished_at": time.time()}
+            self.queue.put_record(job_id, record)
+            self.queue.add_event(job_id, {"job_id": job_id, "type": "cancelled", **record})
+            return QueuedJob(self.queue, record)
+        # claimed by another worker; its dispatcher forwards the request
+        self.queue.request_cancel(job_id)
+        return job
+
+    def stats(self) -> dict:
+        with self._lock:
+            jobs = list(self._jobs.values())
+            elsewhere = [i for i in self._submitted if i not in self._jobs]
+        # jobs submitted here but queued or running on another worker
+        records = {i: self.queue.record(i) for i in elsewhere}
+        cutoff = time.time() - settings.JOB_RETENTION
+        stale = {
+            i for i, r in records.items()
+            if r is None or (r["status"] in TERMINAL and r["finished_at"] < cutoff)
+        }
+        if stale:
+            with self._lock:
+                self._submitted = [i for i in self._submitted if i not in stale]
+        records = [r for i, r in records.items() if i not in stale]
+        return {
+            "concurrency": self.concurrency,
+            "queue_depth": self.queue.depth(),
+            "running": sum(j.status == "running" for j in jobs),
+            "jobs": [j.summary() for j in jobs] + records,
+        }
+
+
+training_jobs = TrainingJobManager(settings.TRAIN_CONCURRENCY)
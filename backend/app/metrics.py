@@ -0,0 +1,361 @@
+"""
+Request and pipeline-stage timing, exported for Prometheus.
+
+``stage(name)`` (a context manager) and ``timed(name)`` (a decorator) time
+one step of a handler, e.g. fetch_returns, model_load, rollout or
+kernel_shap. ``MetricsMiddleware`` gives every request a list that stages
+append to, then records them in ``tcarp_stage_seconds`` by route and stage,
+records the whole request in ``tcarp_request_seconds``, and returns them
+in a ``Server-Timing`` header. Work that ``offload`` runs in the exec
+pool goes through ``collect``, which brings its stage timings back to the
+request that submitted it.
+
+``GET /metrics`` renders the histograms plus cache, pool, gate and inference gauges in
+the Prometheus text format. The gauges are read at scrape time. Cache
+gauges carry a ``process`` label: "api" for this process, the pid for
+each exec pool worker, whose stats come back with every task it runs
+(``collect``) and so are as of its last task.
+
+With ``PROFILE_ENABLED`` set, a request carrying ``X-Debug-Profile: 1``
+is sampled every ``PROFILE_INTERVAL_MS`` (in the API process and in the pool
+worker that runs it). The collapsed stacks are written to ``PROFILE_DIR``,
+ready for flamegraph.pl or speedscope, and the file name is returned in
+``X-Profile``.
+"""
+import os
+import sys
+import importlib
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .core import settings
+
+# seconds; default upper bounds of the histogram buckets (+Inf is implicit)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+PROFILE_HEADER = "x-debug-profile"
+
+# (stage, seconds) recorded during the current request, if any
+_stages: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("stages", default=None)
+# collapsed stacks sampled for the current request, if it is being profiled
+_profile: ContextVar[Optional[Counter]] = ContextVar("profile", default=None)
+
+# per-process caches: gauge prefix -> (module, attribute)
+CACHES = {
+    "tcarp_returns_cache": ("returns", "returns_cache"),
+    "tcarp_graph_cache": ("graphs", "graph_cache"),
+    "tcarp_model_cache": ("registry", "model_registry"),
+}
+# exec pool worker pid -> its cache stats as of its last task
+_worker_caches: Dict[int, Dict[str, dict]] = {}
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...], buckets: Tuple[float, ...] = BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._counts: Dict[tuple, List[int]] = {}
+        self._sums: Dict[tuple, float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float) -> None:
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(labels)
+            if counts is None:
+                counts = self._counts[labels] = [0] * (len(self.buckets) + 1)
+            counts[i] += 1
+            self._sums[labels] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(k, list(v), self._sums[k]) for k, v in self._counts.items()]
+        for labels, counts, total in sorted(items):
+            base = _labels(self.labels, labels)
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{{{base}{',' if base else ''}le=\"{le}\"}} {cumulative}")
+            lines.append(f"{self.name}_sum{{{base}}} {total}")
+            lines.append(f"{self.name}_count{{{base}}} {cumulative}")
+        return lines
+
+
+def _labels(names: Tuple[str, ...], values: tuple) -> str:
+    def escape(v) -> str:
+        return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    return ",".join(f'{n}="{escape(v)}"' for n, v in zip(names, values))
+
+
+REQUEST_SECONDS = Histogram(
+    "tcarp_request_seconds", "Request latency by route.", ("route", "method", "status")
+)
+STAGE_SECONDS = Histogram(
+    "tcarp_stage_seconds", "Pipeline stage latency by route.", ("route", "stage")
+)
+# micro-batched /agent/predict forward passes (see app.inference)
+INFERENCE_BATCH_REQUESTS = Histogram(
+    "tcarp_inference_batch_requests", "Requests merged into one forward pass.", ("model",),
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+INFERENCE_BATCH_ROWS = Histogram(
+    "tcarp_inference_batch_rows", "Observation rows per forward pass.", ("model",),
+    buckets=(16, 64, 256, 1024, 4096, 16384, 65536),
+)
+INFERENCE_QUEUE_SECONDS = Histogram(
+    "tcarp_inference_queue_seconds", "Time from submission to the start of the forward pass.", ("model",),
+    buckets=(0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
+
+
+# --- stage timers ---
+
+def record(name: str, seconds: float) -> None:
+    stages = _stages.get()
+    if stages is not None:
+        stages.append((name, seconds))
+    else:
+        # outside any request (background jobs, helper threads)
+        STAGE_SECONDS.observe(("", name), seconds)
+
+
+@contextmanager
+def stage(name: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - t0)
+
+
+def timed(name: str) -> Callable:
+    def decorator(fn: Callable) -> Callable:
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def cache_stats() -> Dict[str, dict]:
+    """Stats of the caches this process has imported, by gauge prefix."""
+    stats = {}
+    for prefix, (module, attr) in CACHES.items():
+        mod = sys.modules.get(f"{__package__}.{module}")
+        if mod is not None:
+            stats[prefix] = getattr(mod, attr).stats()
+    return stats
+
+
+def collect(fn: Callable, args: tuple, profile: bool = False):
+    """
+    Run ``fn(*args)`` (typically in a pool worker) and return its result
+    with the stages it recorded, if ``profile`` its sampled stacks, and
+    (pid, ``cache_stats()``) of the process it ran in.
+    """
+    stages: List[Tuple[str, float]] = []
+    token = _stages.set(stages)
+    sampler = Sampler(settings.PROFILE_INTERVAL_MS / 1000.0).start() if profile else None
+    try:
+        result = fn(*args)
+    finally:
+        _stages.reset(token)
+        stacks = sampler.stop() if sampler else None
+    return result, stages, stacks, (os.getpid(), cache_stats())
+
+
+def merge(
+    stages: List[Tuple[str, float]], stacks: Optional[Counter], caches: Tuple[int, Dict[str, dict]]
+) -> None:
+    """Fold what ``collect`` returned into the current request and the worker cache stats."""
+    for name, seconds in stages:
+        record(name, seconds)
+    profile = _profile.get()
+    if profile is not None and stacks:
+        profile.update(stacks)
+    pid, stats = caches
+    if pid != os.getpid():
+        _worker_caches[pid] = stats
+
+
+def process_caches() -> Dict[str, Dict[str, dict]]:
+    """
+    Cache stats by process: "api" (everything imported, so idle caches
+    show up as zeros) and each live exec pool worker's pid.
+    """
+    from .workers import worker_pids
+
+    for module, _ in CACHES.values():
+        importlib.import_module(f"{__package__}.{module}")
+    live = worker_pids("exec")
+    for pid in [p for p in _worker_caches if p not in live]:
+        # a worker of a pool that has since been shut down
+        _worker_caches.pop(pid, None)
+    return {"api": cache_stats(), **{str(pid): s for pid, s in _worker_caches.items()}}
+
+
+def profiling() -> bool:
+    return _profile.get() is not None
+
+
+def server_timing(stages: List[Tuple[str, float]], total: float) -> str:
+    by_name: Dict[str, float] = defaultdict(float)
+    for name, seconds in stages:
+        by_name[name] += seconds
+    parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in by_name.items()]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+# --- sampling profiler ---
+
+# leaf functions of threads that are blocked, not working
+IDLE_FRAMES = {"wait", "select", "poll", "_poll", "recv_bytes", "_recv_bytes", "_recv", "accept", "_wait_for_tstate_lock"}
+
+
+class Sampler:
+    """Collapsed-stack sampler over every other thread of this process."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self) -> "Sampler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own or frame.f_code.co_name in IDLE_FRAMES:
+                    continue
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(names))] += 1
+
+
+def dump_profile(stacks: Counter, label: str) -> str:
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{label.strip('/').replace('/', '_') or 'root'}-{uuid.uuid4().hex[:8]}.folded"
+    with open(os.path.join(settings.PROFILE_DIR, name), "w") as f:
+        for stack, n in stacks.most_common():
+            f.write(f"{stack} {n}\n")
+    return name
+
+
+# --- middleware ---
+
+def _route(scope) -> str:
+    # the matched template keeps label cardinality bounded
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            return await self.app(scope, receive, send)
+
+        stages: List[Tuple[str, float]] = []
+        stages_token = _stages.set(stages)
+        sampler = None
+        if settings.PROFILE_ENABLED and dict(scope["headers"]).get(PROFILE_HEADER.encode()) == b"1":
+            profile_token = _profile.set(Counter())
+            sampler = Sampler(settings.PROFILE_INTERVAL_MS / 1000.0).start()
+        t0 = time.perf_counter()
+        status = 500
+
+        async def send_timed(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing(stages, time.perf_counter() - t0).encode()))
+                if sampler is not None:
+                    stacks = _profile.get()
+                    stacks.update(sampler.stop())
+                    headers.append((b"x-profile", dump_profile(stacks, scope["path"]).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            if sampler is not None:
+                sampler.stop()  # no-op if the response already stopped it
+                _profile.reset(profile_token)
+            _stages.reset(stages_token)
+            route = _route(scope)
+            REQUEST_SECONDS.observe((route, scope["method"], str(status)), time.perf_counter() - t0)
+            for name, seconds in stages:
+                STAGE_SECONDS.observe((route, name), seconds)
+
+
+# --- exposition ---
+
+def _gauge(name: str, labels: Dict[str, str], value) -> str:
+    text = _labels(tuple(labels), tuple(labels.values()))
+    return f"{name}{{{text}}} {value}" if text else f"{name} {value}"
+
+
+def _gauges() -> List[str]:
+    from .cache import shared_cache
+    from .execution import gate_stats
+    from .inference import inference_scheduler
+    from .workers import pool_stats
+
+    shared = shared_cache.stats()
+    series = [
+        (prefix, {"process": process}, stats)
+        for process, caches in process_caches().items()
+        for prefix, stats in caches.items()
+    ]
+    series += [
+        ("tcarp_inference", {}, inference_scheduler.stats()),
+        ("tcarp_shared_cache", {"backend": shared.pop("backend")}, shared),
+    ]
+    series += [("tcarp_gate", {"gate": name}, stats) for name, stats in gate_stats().items()]
+    series += [("tcarp_pool", {"pool": name}, stats) for name, stats in pool_stats().items()]
+    return [
+        _gauge(f"{prefix}_{key}", labels, value)
+        for prefix, labels, stats in series
+        for key, value in stats.items()
+    ]
+
+
+def render() -> str:
+    lines = []
+    for histogram in (
+        REQUEST_SECONDS, STAGE_SECONDS,
+        INFERENCE_BATCH_REQUESTS, INFERENCE_BATCH_ROWS, INFERENCE_QUEUE_SECONDS,
+    ):
+        lines += histogram.render()
+    lines += _gauges()
+    return "\n".join(lines) + "\n"
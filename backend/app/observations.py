@@ -0,0 +1,107 @@
+"""
+Policy observations built from a (T, N) returns matrix.
+
+Each day gets a row of K values: the N returns, then each symbol's
+volatility and/or cumulative return over the last ``window`` days if
+``features`` asks for them. With ``window`` W the observation on day t is
+rows t-W+1 .. t, oldest first and flattened; days before the start are
+zeros.
+
+The rows are computed once, vectorized, into one contiguous buffer, and
+``sliding_window_view`` over it with a stride of K gives every day's
+observation as a contiguous (W * K,) view. Stepping an env indexes a row
+and allocates nothing. Serving paths fetch ``spec.warmup`` extra days
+before the requested window (``returns.fetch_window``) so its first
+observations hold real history, then drop those rows. The default spec
+(window 1, no features) is the returns row itself, which is what models
+trained before these options expect; models record their spec in their
+metadata JSON.
+"""
+from typing import NamedTuple, Optional, Tuple
+
+import numpy as np
+from fastapi import HTTPException
+from numpy.lib.stride_tricks import sliding_window_view
+
+FEATURES = ("volatility", "cumulative")
+
+
+class ObsSpec(NamedTuple):
+    window: int = 1
+    features: Tuple[str, ...] = ()
+
+    @classmethod
+    def from_meta(cls, meta: dict) -> "ObsSpec":
+        return cls(int(meta.get("window", 1)), tuple(meta.get("features", ())))
+
+    @property
+    def warmup(self) -> int:
+        """Days of history before a decision day that its observation reads."""
+        return self.window - 1
+
+    def meta(self) -> dict:
+        return {"window": self.window, "features": list(self.features)}
+
+    def row_width(self, n_symbols: int) -> int:
+        return n_symbols * (1 + len(self.features))
+
+    def width(self, n_symbols: int) -> int:
+        return self.window * self.row_width(n_symbols)
+
+    def latest_column(self, n_symbols: int, symbol: int) -> int:
+        """Observation column of the current day's return of ``symbol``."""
+        return (self.window - 1) * self.row_width(n_symbols) + symbol
+
+    def per_symbol(self, values: np.ndarray, n_symbols: int) -> np.ndarray:
+        """Sum (T, width) per-column values into (T, N) per-symbol values."""
+        return values.reshape(len(values), -1, n_symbols).sum(axis=1)
+
+
+def obs_spec(meta: dict, window: Optional[int] = None) -> ObsSpec:
+    """A model's spec; a requested ``window`` must match the one it was trained with."""
+    spec = ObsSpec.from_meta(meta)
+    if window is not None and window != spec.window:
+        raise HTTPException(400, f"Model was trained with window={spec.window}, not {window}.")
+    return spec
+
+
+def day_rows(returns: np.ndarray, spec: ObsSpec) -> np.ndarray:
+    """(T, K) per-day rows: returns, then the requested window statistics."""
+    unknown = [f for f in spec.features if f not in FEATURES]
+    if unknown:
+        raise HTTPException(400, f"Unknown observation features: {unknown}")
+    r = np.asarray(returns, dtype=np.float64)
+    n_days = len(r)
+    parts = [r]
+    if spec.features:
+        # trailing-window sums from prefix sums; early days use what history exists
+        hi = np.arange(1, n_days + 1)
+        lo = np.maximum(hi - spec.window, 0)
+        count = (hi - lo)[:, None]
+
+        def window_sum(x: np.ndarray) -> np.ndarray:
+            prefix = np.vstack([np.zeros((1, x.shape[1])), np.cumsum(x, axis=0)])
+            return prefix[hi] - prefix[lo]
+
+        for name in spec.features:
+            if name == "volatility":
+                mean = window_sum(r) / count
+                var = window_sum(r * r) / count - mean * mean
+                parts.append(np.sqrt(np.maximum(var, 0.0)))
+            else:
+                parts.append(np.expm1(window_sum(np.log1p(r))))
+    return np.hstack(parts).astype(np.float32)
+
+
+def observations(returns: np.ndarray, spec: ObsSpec = ObsSpec()) -> np.ndarray:
+    """
+    (T, width) read-only observation matrix; row t is a view into one
+    shared buffer, so nothing is copied per day.
+    """
+    if spec == ObsSpec():
+        return np.asarray(returns, dtype=np.float32)
+    rows = day_rows(returns, spec)
+    n_days, k = rows.shape
+    flat = np.zeros((spec.window - 1 + n_days) * k, dtype=np.float32)
+    flat[(spec.window - 1) * k:] = rows.ravel()
+    return sliding_window_view(flat, spec.window * k)[::k]
@@ -0,0 +1,172 @@
+"""
+Ranked, bounded path queries over a causal graph.
+
+The graph is held as CSR integer arrays (``indptr``/``indices``/``weights``)
+rather than a labelled networkx graph. Simple paths out of a source are
+produced lazily in best-first order of cost, so a top-k query never
+materializes the full (exponential) path set:
+
+* ``product``: cost = -sum log|w|, i.e. strongest product of weights first
+* ``sum``: cost = -sum w, i.e. largest total weight first
+
+Edge costs may be negative (|w| > 1, or negative weights under ``sum``),
+so each partial path is queued with a lower bound on anything it can still
+become: its cost plus the h most negative edge costs in the graph, for h
+hops left. A path is emitted only once its exact cost is the smallest
+bound left in the queue.
+
+On a DAG, per-target path counts come from a layered dynamic program
+instead of enumeration.
+"""
+import heapq
+import itertools
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class PathGraph:
+    def __init__(self, nodes: Sequence[str], edges: Sequence[Tuple[str, str, float]]):
+        self.labels = list(nodes)
+        index = {n: i for i, n in enumerate(self.labels)}
+        for s, t, _ in edges:
+            for n in (s, t):
+                if n not in index:
+                    index[n] = len(self.labels)
+                    self.labels.append(n)
+        self.index = index
+        n = len(self.labels)
+
+        src = np.array([index[s] for s, _, _ in edges], dtype=np.intp)
+        dst = np.array([index[t] for _, t, _ in edges], dtype=np.intp)
+        w = np.array([w for _, _, w in edges], dtype=np.float64)
+        order = np.argsort(src, kind="stable")
+        self.indptr = np.concatenate([[0], np.cumsum(np.bincount(src, minlength=n))])
+        self.indices = dst[order]
+        self.weights = w[order]
+        self.sources = src[order]
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def is_dag(self) -> bool:
+        indeg = np.bincount(self.indices, minlength=len(self))
+        ready = list(np.flatnonzero(indeg == 0))
+        seen = 0
+        while ready:
+            v = ready.pop()
+            seen += 1
+            for u in self.indices[self.indptr[v]:self.indptr[v + 1]]:
+                indeg[u] -= 1
+                if indeg[u] == 0:
+                    ready.append(u)
+        return seen == len(self)
+
+    def path_counts(self, source: int, max_depth: int) -> Optional[np.ndarray]:
+        """
+        Number of paths from ``source`` to every node with 1..max_depth
+        edges, or None if the graph has a cycle (counting simple paths is
+        then #P-hard). Object dtype keeps the counts exact.
+        """
+        if not self.is_dag():
+            return None
+        layer = np.zeros(len(self), dtype=object)
+        layer[source] = 1
+        total = np.zeros(len(self), dtype=object)
+        for _ in range(min(max_depth, len(self) - 1)):
+            nxt = np.zeros(len(self), dtype=object)
+            np.add.at(nxt, self.indices, layer[self.sources])
+            if not nxt.any():
+                break
+            total += nxt
+            layer = nxt
+        return total
+
+    def ranked_paths(
+        self, source: int, rank: str, max_depth: int, targets: Optional[np.ndarray] = None
+    ) -> Iterator[Tuple[Tuple[int, ...], float]]:
+        """
+        Simple paths out of ``source`` ending in ``targets`` (bool mask,
+        default every node), best first, as (node indices, score).
+        """
+        if rank == "product":
+            with np.errstate(divide="ignore"):
+                costs = -np.log(np.abs(self.weights))
+        elif rank == "sum":
+            costs = -self.weights
+        else:
+            raise ValueError(f"Unknown rank: {rank}")
+        finite = np.isfinite(costs)
+        # gain[h] = most a path can still drop its cost by in h more hops
+        negative = np.sort(costs[finite & (costs < 0)])[:max_depth]
+        gain = np.concatenate([[0.0], np.cumsum(negative)])
+        gain = np.concatenate([gain, np.full(max(max_depth + 1 - len(gain), 0), gain[-1])])
+        if targets is None:
+            targets = np.ones(len(self), dtype=bool)
+
+        tie = itertools.count()
+        # (priority, tie, cost, score, path, is_final)
+        heap = [(0.0, next(tie), 0.0, 1.0 if rank == "product" else 0.0, (source,), False)]
+        while heap:
+            _, _, cost, score, path, final = heapq.heappop(heap)
+            if final:
+                yield path, score
+                continue
+            v = path[-1]
+            hops_left = max_depth - len(path)  # after taking one more edge
+            for e in range(self.indptr[v], self.indptr[v + 1]):
+                u = int(self.indices[e])
+                if u in path or not finite[e]:
+                    continue
+                c = cost + costs[e]
+                s = score * self.weights[e] if rank == "product" else score + self.weights[e]
+                p = path + (u,)
+                if targets[u]:
+                    heapq.heappush(heap, (c, next(tie), c, s, p, True))
+                if hops_left > 0:
+                    heapq.heappush(heap, (c + gain[hops_left], next(tie), c, s, p, False))
+
+
+class SuspendedQueries:
+    """
+    Small LRU of half-consumed path generators, keyed by (query, offset),
+    so the next page resumes where the last one stopped. A miss (evicted,
+    or served by another process) just replays the query up to the offset.
+    """
+
+    def __init__(self, max_items: int = 64):
+        self.max_items = max_items
+        self._items: "OrderedDict[Hashable, Iterator]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def pop(self, key: Hashable) -> Optional[Iterator]:
+        with self._lock:
+            return self._items.pop(key, None)
+
+    def put(self, key: Hashable, it: Iterator) -> None:
+        with self._lock:
+            self._items[key] = it
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+
+suspended_queries = SuspendedQueries()
+
+
+def page(
+    key: Hashable, offset: int, limit: int, start: Callable[[], Iterator]
+) -> Tuple[List, bool]:
+    """
+    Items ``offset .. offset+limit`` of the iterator ``start()`` returns,
+    plus whether more follow.
+    """
+    it = suspended_queries.pop((key, offset))
+    if it is None:
+        it = itertools.islice(start(), offset, None)
+    items = list(itertools.islice(it, limit + 1))
+    more = len(items) > limit
+    if more:
+        suspended_queries.put((key, offset + limit), itertools.chain(items[limit:], it))
+    return items[:limit], more
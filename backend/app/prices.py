@@ -0,0 +1,277 @@
+"""
+Price-source layer with an on-disk columnar store.
+
+Every router used to call ``yf.download`` directly, so each API call was a
+full network download. ``PriceStore`` keeps one memory-mapped ``.npy`` file
+per symbol and only asks its ``PriceSource`` for the date ranges it has not
+seen yet; everything else is read straight from disk.
+
+On-disk layout (``<PRICE_STORE_DIR>/<SYMBOL>.npy``) is a float64 array of
+shape ``(1 + len(FIELDS), n_days)``: row 0 holds the date as days since the
+epoch, the remaining rows hold one field each, so every field is a
+contiguous row that can be sliced without copying. A small sidecar
+``<SYMBOL>.json`` records which half-open day ranges have been fetched, so
+weekends and holidays are not re-requested. A range counts as fetched up
+to the last bar the source returned, and past that only over weekends: an
+empty answer may be a failed download, so weekdays without bars at the
+end of a range are asked for again next time.
+"""
+import os
+import json
+import threading
+from abc import ABC, abstractmethod
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .core import settings
+
+FIELDS = ("Open", "High", "Low", "Close", "Adj Close", "Volume")
+EPOCH = date(1970, 1, 1)
+
+Range = Tuple[int, int]
+
+
+def to_days(d: date) -> int:
+    return (d - EPOCH).days
+
+
+def from_days(n: int) -> date:
+    return EPOCH + timedelta(days=int(n))
+
+
+def _empty_bars() -> pd.DataFrame:
+    return pd.DataFrame(columns=list(FIELDS), index=pd.DatetimeIndex([], name="Date"))
+
+
+def _normalize_bars(df: pd.DataFrame) -> pd.DataFrame:
+    """Coerce a source frame to a date index and exactly FIELDS as columns."""
+    if df is None or df.empty:
+        return _empty_bars()
+    df = df.copy()
+    df.index = pd.DatetimeIndex(pd.to_datetime(df.index)).tz_localize(None).normalize()
+    if "Adj Close" not in df.columns and "Close" in df.columns:
+        df["Adj Close"] = df["Close"]
+    df = df.reindex(columns=list(FIELDS)).astype(np.float64)
+    df = df[~df.index.duplicated(keep="last")].sort_index()
+    return df.dropna(how="all")
+
+
+# --- Sources ---
+
+class PriceSource(ABC):
+    """Anything that can produce daily bars for a set of symbols."""
+
+    @abstractmethod
+    def fetch(self, symbols: List[str], start: date, end: date) -> Dict[str, pd.DataFrame]:
+        """Return ``{symbol: bars}`` for dates in ``[start, end)``."""
+
+
+class YFinanceSource(PriceSource):
+    """Downloads bars from Yahoo Finance, one batched call per range."""
+
+    def fetch(self, symbols, start, end):
+        import yfinance as yf
+
+        data = yf.download(
+            symbols,
+            start=str(start),
+            end=str(end),
+            auto_adjust=False,
+            group_by="ticker",
+            progress=False,
+        )
+        out: Dict[str, pd.DataFrame] = {}
+        for sym in symbols:
+            if isinstance(data.columns, pd.MultiIndex):
+                if sym in data.columns.get_level_values(0):
+                    bars = data[sym]
+                elif sym in data.columns.get_level_values(1):
+                    bars = data.xs(sym, axis=1, level=1)
+                else:
+                    bars = None
+            else:
+                bars = data if len(symbols) == 1 else None
+            out[sym] = _normalize_bars(bars)
+        return out
+
+
+class LocalFileSource(PriceSource):
+    """
+    Reads ``<root>/<SYMBOL>.csv`` (or ``.parquet``) with a Date column.
+    Never touches the network, so it is what air-gapped nodes and offline
+    runs should use.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _read(self, symbol: str) -> pd.DataFrame:
+        csv_path = os.path.join(self.root, f"{symbol}.csv")
+        pq_path = os.path.join(self.root, f"{symbol}.parquet")
+        if os.path.exists(csv_path):
+            df = pd.read_csv(csv_path, index_col=0, parse_dates=True)
+        elif os.path.exists(pq_path):
+            df = pd.read_parquet(pq_path)
+        else:
+            return _empty_bars()
+        return _normalize_bars(df)
+
+    def fetch(self, symbols, start, end):
+        lo, hi = pd.Timestamp(start), pd.Timestamp(end)
+        out = {}
+        for sym in symbols:
+            bars = self._read(sym)
+            out[sym] = bars[(bars.index >= lo) & (bars.index < hi)]
+        return out
+
+
+def make_source(name: str) -> PriceSource:
+    if name == "yfinance":
+        return YFinanceSource()
+    if name == "local":
+        return LocalFileSource(settings.PRICE_LOCAL_DIR)
+    raise ValueError(f"Unknown price source: {name}")
+
+
+# --- Store ---
+
+def _merge_ranges(ranges: List[Range]) -> List[Range]:
+    merged: List[Range] = []
+    for lo, hi in sorted(r for r in ranges if r[1] > r[0]):
+        if merged and lo <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], hi))
+        else:
+            merged.append((lo, hi))
+    return merged
+
+
+def _subtract_ranges(want: Range, have: List[Range]) -> List[Range]:
+    lo, hi = want
+    gaps: List[Range] = []
+    for h_lo, h_hi in have:
+        if h_hi <= lo or h_lo >= hi:
+            continue
+        if h_lo > lo:
+            gaps.append((lo, h_lo))
+        lo = max(lo, h_hi)
+    if lo < hi:
+        gaps.append((lo, hi))
+    return gaps
+
+
+def _covered(gap: Range, bars: pd.DataFrame, today: int) -> Range:
+    """The part of a fetched ``gap`` to record as covered (see the module docstring)."""
+    lo, hi = gap
+    end = lo if bars.empty else to_days(bars.index[-1].date()) + 1
+    rest = np.arange(end, hi).astype("datetime64[D]")
+    weekdays = np.flatnonzero(np.is_busday(rest))
+    end = end + int(weekdays[0]) if len(weekdays) else hi
+    # today's bar may still change, so never mark it as covered
+    return lo, min(end, today)
+
+
+class PriceStore:
+    """On-disk, per-symbol columnar cache in front of a ``PriceSource``."""
+
+    def __init__(self, root: str, source: PriceSource):
+        self.root = root
+        self.source = source
+        os.makedirs(root, exist_ok=True)
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _lock(self, symbol: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(symbol, threading.Lock())
+
+    def _data_path(self, symbol: str) -> str:
+        return os.path.join(self.root, f"{symbol}.npy")
+
+    def _coverage_path(self, symbol: str) -> str:
+        return os.path.join(self.root, f"{symbol}.json")
+
+    def coverage(self, symbol: str) -> List[Range]:
+        path = self._coverage_path(symbol)
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            return [tuple(r) for r in json.load(f)["ranges"]]
+
+    def missing(self, symbol: str, start: date, end: date) -> List[Range]:
+        """Day ranges inside ``[start, end)`` the store has never fetched."""
+        return _subtract_ranges((to_days(start), to_days(end)), self.coverage(symbol))
+
+    def ensure(self, symbols: List[str], start: date, end: date) -> None:
+        """Fetch only the missing ranges, batching symbols that share a gap."""
+        by_gap: Dict[Range, List[str]] = {}
+        for sym in symbols:
+            for gap in self.missing(sym, start, end):
+                by_gap.setdefault(gap, []).append(sym)
+
+        today = to_days(date.today())
+        for (lo, hi), syms in by_gap.items():
+            fetched = self.source.fetch(syms, from_days(lo), from_days(hi))
+            for sym in syms:
+                bars = fetched.get(sym, _empty_bars())
+                covered = _covered((lo, hi), bars, today)
+                if bars.empty and covered[1] <= covered[0]:
+                    continue
+                self._write(sym, bars, covered)
+
+    def _write(self, symbol: str, bars: pd.DataFrame, covered: Range) -> None:
+        with self._lock(symbol):
+            new = np.empty((1 + len(FIELDS), len(bars)), dtype=np.float64)
+            new[0] = (bars.index.values.astype("datetime64[D]").astype(np.int64))
+            new[1:] = bars.values.T
+
+            path = self._data_path(symbol)
+            if os.path.exists(path):
+                old = np.load(path)
+                # on overlapping dates the fresh fetch wins
+                keep = ~np.isin(old[0], new[0])
+                new = np.concatenate([old[:, keep], new], axis=1)
+            new = new[:, np.argsort(new[0], kind="stable")]
+
+            tmp = path + ".tmp.npy"
+            np.save(tmp, new)
+            os.replace(tmp, path)
+
+            ranges = _merge_ranges(self.coverage(symbol) + [covered])
+            tmp = self._coverage_path(symbol) + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump({"ranges": ranges}, f)
+            os.replace(tmp, self._coverage_path(symbol))
+
+    def read(self, symbol: str, start: date, end: date) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Memory-mapped ``(days, bars)`` for ``[start, end)``. Both are views
+        into the file: ``days`` has shape (n,), ``bars`` (len(FIELDS), n).
+        """
+        path = self._data_path(symbol)
+        if not os.path.exists(path):
+            return np.empty(0), np.empty((len(FIELDS), 0))
+        arr = np.load(path, mmap_mode="r")
+        lo, hi = np.searchsorted(arr[0], [to_days(start), to_days(end)])
+        return arr[0, lo:hi], arr[1:, lo:hi]
+
+    def load(
+        self, symbols: List[str], start: date, end: date, field: str = "Adj Close"
+    ) -> pd.DataFrame:
+        """Prices for one field as a (dates x symbols) frame, like ``yf.download``."""
+        row = FIELDS.index(field)
+        self.ensure(symbols, start, end)
+        columns = {}
+        for sym in symbols:
+            days, bars = self.read(sym, start, end)
+            index = pd.DatetimeIndex(days.astype("int64").astype("datetime64[D]"), name="Date")
+            columns[sym] = pd.Series(bars[row], index=index)
+        return pd.DataFrame(columns, columns=symbols)
+
+
+@lru_cache()
+def get_price_store() -> PriceStore:
+    return PriceStore(settings.PRICE_STORE_DIR, make_source(settings.PRICE_SOURCE))
@@ -0,0 +1,63 @@
+"""
+Training progress callback, run inside the training pool workers.
+
+Kept out of ``app.jobs`` so the API process can import the job manager
+without stable-baselines3.
+"""
+import time
+from typing import List
+
+from stable_baselines3.common.callbacks import BaseCallback
+
+from .jobs import TrainingCancelled
+
+
+class ProgressCallback(BaseCallback):
+    """
+    Streams episode reward, PPO loss and throughput back to the API process
+    once per rollout, and stops training when the job is cancelled.
+    """
+
+    def __init__(self, job_id: str, events, cancel_flags):
+        super().__init__()
+        self.job_id = job_id
+        self.events = events
+        self.cancel_flags = cancel_flags
+        self._episode_rewards: List[float] = []
+        self._running = None
+
+    def _on_training_start(self) -> None:
+        self._t0 = time.perf_counter()
+        self._running = [0.0] * self.training_env.num_envs
+
+    def _on_step(self) -> bool:
+        for i, (r, d) in enumerate(zip(self.locals["rewards"], self.locals["dones"])):
+            self._running[i] += float(r)
+            if d:
+                self._episode_rewards.append(self._running[i])
+                self._running[i] = 0.0
+        if self.cancel_flags.get(self.job_id, False):
+            raise TrainingCancelled(self.job_id)
+        return True
+
+    def _emit(self) -> None:
+        elapsed = time.perf_counter() - self._t0
+        recent = self._episode_rewards[-10:]
+        self.events.put({
+            "job_id": self.job_id,
+            "type": "progress",
+            "timesteps": int(self.num_timesteps),
+            "episodes": len(self._episode_rewards),
+            "episode_reward": sum(recent) / len(recent) if recent else None,
+            "loss": self.logger.name_to_value.get("train/loss"),
+            "steps_per_s": self.num_timesteps / elapsed if elapsed > 0 else None,
+            "elapsed_s": elapsed,
+        })
+
+    def _on_rollout_start(self) -> None:
+        # the previous update's loss is in the logger until the next dump
+        if self.num_timesteps > 0:
+            self._emit()
+
+    def _on_training_end(self) -> None:
+        self._emit()
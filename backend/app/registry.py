@@ -0,0 +1,174 @@
+"""
+In-memory index of trained models plus a bounded LRU of loaded policies.
+
+``PPO.load`` unzips the archive and rebuilds the torch modules, which costs
+more than the inference that follows, so loaded models are kept around.
+The cache is bounded both by count and by the bytes held in parameters and
+optimizer state. An entry is reloaded when its ``.zip`` changes on disk.
+"""
+import os
+import json
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from .core import settings
+from .metrics import timed
+
+if TYPE_CHECKING:
+    from stable_baselines3 import PPO
+
+
+def _model_nbytes(model: "PPO") -> int:
+    tensors = list(model.policy.parameters())
+    optimizer = getattr(model.policy, "optimizer", None)
+    if optimizer is not None:
+        for state in optimizer.state.values():
+            tensors.extend(v for v in state.values() if hasattr(v, "element_size"))
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
+class ModelRegistry:
+    def __init__(self, model_dir: str, max_models: int, max_bytes: int):
+        self.model_dir = model_dir
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        os.makedirs(model_dir, exist_ok=True)
+
+        self._index: Dict[str, dict] = {}
+        # model_id -> (model, (mtime_ns, size) of the zip it came from, nbytes)
+        self._loaded: "OrderedDict[str, Tuple[PPO, Tuple[int, int], int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+
+    def _meta_path(self, model_id: str) -> str:
+        return os.path.join(self.model_dir, f"{model_id}.json")
+
+    def zip_path(self, model_id: str) -> str:
+        return os.path.join(self.model_dir, f"{model_id}.zip")
+
+    # --- metadata index ---
+
+    def scan(self) -> int:
+        """(Re)build the metadata index from ``<model_dir>/*.json``."""
+        index = {}
+        for name in os.listdir(self.model_dir):
+            if name.endswith(".json"):
+                model_id = name[: -len(".json")]
+                with open(self._meta_path(model_id)) as f:
+                    index[model_id] = json.load(f)
+        with self._lock:
+            self._index = index
+        return len(index)
+
+    def register(self, model_id: str, meta: dict) -> None:
+        with self._lock:
+            self._index[model_id] = meta
+
+    def refresh(self, model_id: str) -> dict:
+        """Re-read one model's metadata JSON into the index."""
+        with self._lock:
+            self._index.pop(model_id, None)
+        return self.meta(model_id)
+
+    def meta(self, model_id: str) -> dict:
+        with self._lock:
+            meta = self._index.get(model_id)
+        if meta is None:
+            # may have been trained by another worker since the last scan
+            path = self._meta_path(model_id)
+            if not os.path.exists(path):
+                raise HTTPException(404, "Model metadata not found; please retrain")
+            with open(path) as f:
+                meta = json.load(f)
+            self.register(model_id, meta)
+        return meta
+
+    def list_models(self) -> List[dict]:
+        with self._lock:
+            items = list(self._index.items())
+            loaded = set(self._loaded)
+        out = []
+        for model_id, meta in sorted(items):
+            out.append({
+                "model_id": model_id,
+                "symbols": meta.get("symbols", []),
+                "window": meta.get("window", 1),
+                "features": meta.get("features", []),
+                "loaded": model_id in loaded,
+            })
+        return out
+
+    # --- loaded policies ---
+
+    def stamp(self, model_id: str) -> Tuple[int, int]:
+        """(mtime_ns, size) of the model's zip; changes whenever it is rewritten."""
+        try:
+            st = os.stat(self.zip_path(model_id))
+        except FileNotFoundError:
+            raise HTTPException(404, "Model binary not found")
+        return st.st_mtime_ns, st.st_size
+
+    def _cached(self, model_id: str, stamp: Tuple[int, int]) -> Optional["PPO"]:
+        with self._lock:
+            entry = self._loaded.get(model_id)
+            if entry is None:
+                return None
+            if entry[1] != stamp:
+                # zip was replaced on disk: drop the stale policy
+                self._bytes -= self._loaded.pop(model_id)[2]
+                return None
+            self._loaded.move_to_end(model_id)
+            return entry[0]
+
+    @timed("model_load")
+    def load(self, model_id: str) -> "PPO":
+        """Return the loaded policy for ``model_id``, loading it at most once."""
+        self.meta(model_id)
+        stamp = self.stamp(model_id)
+        model = self._cached(model_id, stamp)
+        if model is not None:
+            return model
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(model_id, threading.Lock())
+        with load_lock:
+            model = self._cached(model_id, stamp)
+            if model is not None:
+                return model
+            # imported here so the index can be scanned without torch loaded
+            from stable_baselines3 import PPO
+
+            model = PPO.load(self.zip_path(model_id))
+            nbytes = _model_nbytes(model)
+            with self._lock:
+                self._loaded[model_id] = (model, stamp, nbytes)
+                self._bytes += nbytes
+                while len(self._loaded) > 1 and (
+                    len(self._loaded) > self.max_models or self._bytes > self.max_bytes
+                ):
+                    _, (_, _, old_bytes) = self._loaded.popitem(last=False)
+                    self._bytes -= old_bytes
+        return model
+
+    def preload(self, model_ids: List[str]) -> None:
+        for model_id in model_ids:
+            self.load(model_id)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "indexed": len(self._index),
+                "loaded": len(self._loaded),
+                "bytes": self._bytes,
+                "max_models": self.max_models,
+                "max_bytes": self.max_bytes,
+            }
+
+
+model_registry = ModelRegistry(
+    settings.MODEL_DIR, settings.MODEL_CACHE_SIZE, settings.MODEL_CACHE_BYTES
+)
@@ -0,0 +1,171 @@
+"""
+Shared returns preparation: prices -> ffill -> dropna -> pct_change.
+
+Every router goes through ``fetch_returns`` so they all use the same price
+field and the same cleaning steps. Results are memoized in a process-wide
+LRU bounded by bytes, backed by the cross-worker ``shared_cache``, and
+handed out as read-only float32 arrays; callers that need to modify
+returns (e.g. counterfactuals) copy what they change. Windows that reach
+today are only kept in the shared cache, for ``RETURNS_LIVE_TTL``.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+from functools import partial
+from typing import Callable, Dict, Hashable, List, Tuple
+
+import numpy as np
+import pandas as pd
+from fastapi import HTTPException
+
+from .cache import shared_cache
+from .core import settings
+from .metrics import timed
+from .prices import get_price_store
+
+DEFAULT_FIELD = "Adj Close"
+# extra calendar days fetched for warm-up history, for holidays
+WARMUP_SLACK_DAYS = 10
+
+
+class Returns:
+    """Daily returns for ``symbols``; ``values`` is a read-only (T, N) float32 array."""
+
+    __slots__ = ("dates", "symbols", "values", "_digest")
+
+    def __init__(self, dates: pd.DatetimeIndex, symbols: List[str], values: np.ndarray):
+        values = np.ascontiguousarray(values, dtype=np.float32)
+        values.setflags(write=False)
+        self.dates = dates
+        self.symbols = list(symbols)
+        self.values = values
+        self._digest = None
+
+    @property
+    def digest(self) -> str:
+        """Content hash of ``values``, for keying results derived from them."""
+        if self._digest is None:
+            self._digest = hashlib.blake2b(self.values.tobytes(), digest_size=16).hexdigest()
+        return self._digest
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes + self.dates.nbytes
+
+    def __len__(self) -> int:
+        return self.values.shape[0]
+
+    def __reduce__(self):
+        # rebuilt through __init__ so unpickled values are read-only again
+        return Returns, (self.dates, self.symbols, self.values)
+
+    def date_strings(self) -> List[str]:
+        return self.dates.strftime("%Y-%m-%d").tolist()
+
+    def frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.values, index=self.dates, columns=self.symbols)
+
+
+class ReturnsCache:
+    """Thread-safe LRU keyed on request parameters, bounded by total bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[Hashable, Returns]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Returns]) -> Returns:
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return item
+            self.misses += 1
+
+        item = compute()
+        with self._lock:
+            if key not in self._items and item.nbytes <= self.max_bytes:
+                self._items[key] = item
+                self._bytes += item.nbytes
+                while self._bytes > self.max_bytes:
+                    _, old = self._items.popitem(last=False)
+                    self._bytes -= old.nbytes
+                    self.evictions += 1
+        return item
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._items),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+returns_cache = ReturnsCache(settings.RETURNS_CACHE_BYTES)
+
+
+def _prepare(symbols: Tuple[str, ...], start_date: date, end_date: date, field: str) -> Returns:
+    try:
+        prices = get_price_store().load(list(symbols), start_date, end_date, field=field)
+    except Exception as e:
+        raise HTTPException(400, f"Error fetching data: {e}")
+
+    prices = prices.ffill().dropna()
+    if prices.shape[0] < 2:
+        raise HTTPException(400, "Not enough data.")
+
+    returns = prices.pct_change().dropna()
+    return Returns(returns.index, list(symbols), returns.values)
+
+
+@timed("fetch_returns")
+def fetch_returns(
+    symbols: List[str], start_date: date, end_date: date, field: str = DEFAULT_FIELD
+) -> Returns:
+    key = (tuple(symbols), start_date, end_date, field)
+    compute = partial(_prepare, key[0], start_date, end_date, field)
+    if end_date >= date.today():
+        # today's bar may still change and later ones are still to come
+        if settings.RETURNS_LIVE_TTL <= 0:
+            return compute()
+        return shared_cache.get_or_compute("returns", key, compute, ttl=settings.RETURNS_LIVE_TTL)
+    return returns_cache.get_or_compute(
+        key, lambda: shared_cache.get_or_compute("returns", key, compute)
+    )
+
+
+def fetch_window(
+    symbols: List[str], start_date: date, end_date: date, warmup: int, field: str = DEFAULT_FIELD
+) -> Tuple[Returns, int]:
+    """
+    ``fetch_returns`` for the window plus up to ``warmup`` trading days before
+    it, and how many leading rows are that warm-up history. Rows from there
+    on are the ones ``fetch_returns(symbols, start_date, end_date)`` covers.
+    """
+    if warmup <= 0:
+        return fetch_returns(symbols, start_date, end_date, field), 0
+    lookback = start_date - timedelta(days=warmup * 7 // 5 + WARMUP_SLACK_DAYS)
+    returns = fetch_returns(symbols, lookback, end_date, field)
+    # a window's first return is dated its second trading day
+    first = int(returns.dates.searchsorted(pd.Timestamp(start_date))) + 1
+    if first >= len(returns):
+        raise HTTPException(400, "Not enough data.")
+    skip = max(first - warmup, 0)
+    if skip:
+        returns = Returns(returns.dates[skip:], returns.symbols, returns.values[skip:])
+    return returns, first - skip
@@ -0,0 +1,64 @@
+"""
+Rolling-window causal skeletons.
+
+Window moments are kept as running sums (sum x, sum x x^T) that are
+updated with the rows entering and leaving the window, so each step costs
+O(step * N^2) instead of a pass over the whole window. Each window's
+skeleton search is seeded from the previous window's separating sets.
+"""
+from typing import Iterator, NamedTuple
+
+import numpy as np
+
+from .skeleton import Skeleton, pc_skeleton
+
+# recompute the sums from scratch this often to bound floating-point drift
+RESYNC_EVERY = 256
+
+
+class RollingMoments:
+    def __init__(self, x: np.ndarray):
+        self.reset(x)
+
+    def reset(self, x: np.ndarray) -> None:
+        self.n = len(x)
+        self.s1 = x.sum(axis=0)
+        self.s2 = x.T @ x
+
+    def update(self, entering: np.ndarray, leaving: np.ndarray) -> None:
+        """Rank-k update; the window length must stay the same."""
+        self.s1 += entering.sum(axis=0) - leaving.sum(axis=0)
+        self.s2 += entering.T @ entering - leaving.T @ leaving
+
+    def corr(self) -> np.ndarray:
+        mean = self.s1 / self.n
+        cov = (self.s2 - self.n * np.outer(mean, mean)) / (self.n - 1)
+        sd = np.sqrt(np.clip(np.diag(cov), 0.0, None))
+        sd[sd == 0] = 1.0
+        return np.clip(cov / np.outer(sd, sd), -1.0, 1.0)
+
+
+class WindowGraph(NamedTuple):
+    lo: int  # first row of the window
+    hi: int  # one past the last row
+    corr: np.ndarray
+    skeleton: Skeleton
+
+
+def rolling_skeletons(
+    x: np.ndarray, window: int, step: int, alpha: float, max_cond: int = 3
+) -> Iterator[WindowGraph]:
+    """Skeleton of every ``window``-row slice of ``x``, advancing ``step`` rows at a time."""
+    x = np.asarray(x, dtype=np.float64)
+    moments = RollingMoments(x[:window])
+    previous = None
+    for w, lo in enumerate(range(0, len(x) - window + 1, step)):
+        hi = lo + window
+        if w:
+            if step >= window or w % RESYNC_EVERY == 0:
+                moments.reset(x[lo:hi])
+            else:
+                moments.update(x[hi - step:hi], x[lo - step:lo])
+        corr = moments.corr()
+        previous = pc_skeleton(corr, window, alpha, max_cond, seed=previous)
+        yield WindowGraph(lo, hi, corr, previous)
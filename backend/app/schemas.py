@@ -1,12 +1,46 @@
 from datetime import date
-from typing import List, Dict
-from pydantic import BaseModel
+from typing import Any, List, Dict, Literal, Optional
+from pydantic import BaseModel, Field
 
 # --- Health ---
 
 class HealthResponse(BaseModel):
     status: str = "ok"
 
+class CacheStatsResponse(BaseModel):
+    hits: int
+    misses: int
+    evictions: int
+    entries: int
+    bytes: int
+    max_bytes: int
+    # the API process plus the exec pool workers that have reported
+    processes: int = 1
+
+class GateStats(BaseModel):
+    limit: int
+    queue: int
+    running: int
+    waiting: int
+    rejected: int
+    timed_out: int
+    abandoned: int
+    avg_s: float
+
+class InferenceStats(BaseModel):
+    window_ms: float
+    max_batch: int
+    threads: int
+    batches: int
+    requests: int
+    rows: int
+    failed: int
+    # requests whose client disconnected before their batch ran
+    dropped: int
+    pending: int
+    avg_batch_requests: float
+    avg_queue_ms: float
+
 # --- Causal Discovery ---
 
 class CausalRequest(BaseModel):
@@ -42,21 +76,68 @@ class TrainRequest(BaseModel):
     start_date: date
     end_date: date
     total_timesteps: int
+    # >1 trains on a vectorized env with that many copies stepped together
+    num_envs: int = Field(1, ge=1)
+    # days of history in each observation, plus optional per-symbol
+    # statistics over the same window; both are stored with the model
+    window: int = Field(1, ge=1, le=250)
+    features: List[Literal["volatility", "cumulative"]] = []
 
 class TrainResponse(BaseModel):
     model_id: str
+    job_id: Optional[str] = None
+    status: Optional[str] = None
+
+class TrainJobStatus(BaseModel):
+    job_id: str
+    model_id: str
+    status: str
+    total_timesteps: int
+    submitted_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    queue_wait_s: float
+    wall_time_s: Optional[float] = None
+    error: Optional[str] = None
+    progress: Optional[Dict[str, Any]] = None
+
+class TrainJobsResponse(BaseModel):
+    concurrency: int
+    queue_depth: int
+    running: int
+    jobs: List[TrainJobStatus]
+
+class ModelInfo(BaseModel):
+    model_id: str
+    symbols: List[str]
+    window: int = 1
+    features: List[str] = []
+    loaded: bool
 
 class PredictRequest(BaseModel):
     model_id: str
     symbols: List[str]
     start_date: date
     end_date: date
+    # optional check: must equal the window the model was trained with
+    window: Optional[int] = Field(None, ge=1)
 
 class PredictResponse(BaseModel):
     dates: List[str]
     returns: Dict[str, List[float]]
     actions: List[str]
 
+class ExplainRequest(PredictRequest):
+    # kernelshap is exact but slow; the gradient methods run in a few
+    # batched autograd passes on the policy network
+    method: Literal["kernelshap", "integrated_gradients", "gradient_input"] = "kernelshap"
+    ig_steps: int = Field(32, gt=0)
+    background_method: Literal["kmeans", "sample"] = "kmeans"
+    background_size: int = Field(50, gt=0)
+    # KernelSHAP coalition samples per row; None lets shap pick ("auto")
+    nsamples: Optional[int] = Field(None, gt=0)
+    chunk_size: int = Field(64, gt=0)
+
 class PerDecisionExplainItem(BaseModel):
     date: date
     action: str
@@ -79,9 +160,22 @@ class CausalPathRequest(BaseModel):
     nodes: List[str]
     edges: List[CausalEdge]
     feature: str
+    # longest path in edges; None = up to len(nodes) - 1, which can be
+    # exponentially slow on dense graphs with weights above 1
+    max_depth: Optional[int] = Field(6, gt=0)
+    # paths come best first: strongest |product| or largest sum of weights
+    rank: Literal["product", "sum"] = "product"
+    limit: int = Field(100, gt=0, le=10_000)
+    # next_cursor from the previous page of the same query
+    cursor: Optional[str] = None
+    include_counts: bool = True
 
 class CausalPathResponse(BaseModel):
     paths: List[List[str]]
+    scores: List[float] = []
+    # paths per target, counted without enumerating them; None if the graph has a cycle
+    counts: Optional[Dict[str, int]] = None
+    next_cursor: Optional[str] = None
 
 # --- Counterfactual explainability ---
 class CounterfactualRequest(PredictRequest):
@@ -91,4 +185,72 @@ class CounterfactualRequest(PredictRequest):
 class CounterfactualResponse(BaseModel):
     original_actions: List[str]
     counterfactual_actions: List[str]
-    difference_indices: List[int]
\ No newline at end of file
+    difference_indices: List[int]
+
+class CounterfactualSweepRequest(PredictRequest):
+    # empty = every symbol
+    features: List[str] = []
+    # each feature's returns are scaled by (1 + delta), as in /counterfactual
+    deltas: List[float]
+    # bisect for the smallest |delta| <= max_delta that flips each decision
+    find_minimal: bool = True
+    max_delta: float = Field(1.0, gt=0)
+    bisect_steps: int = Field(16, gt=0, le=40)
+
+class CounterfactualScenario(BaseModel):
+    feature: str
+    delta: float
+    flip_indices: List[int]
+    flip_rate: float
+
+class MinimalFlip(BaseModel):
+    feature: str
+    # per decision: signed smallest flipping delta, None if none within max_delta
+    deltas: List[Optional[float]]
+    # action taken at that delta
+    actions: List[Optional[str]]
+
+class CounterfactualSweepResponse(BaseModel):
+    dates: List[str]
+    original_actions: List[str]
+    scenarios: List[CounterfactualScenario]
+    minimal_flips: List[MinimalFlip] = []
+
+# --- Backtest ---
+class BacktestScenario(BaseModel):
+    model_id: str
+    name: Optional[str] = None
+    # None falls back to the request-level value
+    cost_bps: Optional[float] = Field(None, ge=0)
+    slippage_bps: Optional[float] = Field(None, ge=0)
+
+class BacktestRequest(BaseModel):
+    # empty = every symbol any of the models was trained on
+    symbols: List[str] = []
+    start_date: date
+    end_date: date
+    # model_id / model_ids are shorthand for scenarios with request-level costs
+    model_id: Optional[str] = None
+    model_ids: List[str] = []
+    scenarios: List[BacktestScenario] = []
+    cost_bps: float = Field(0.0, ge=0)
+    slippage_bps: float = Field(0.0, ge=0)
+    initial_capital: float = Field(1.0, gt=0)
+    include_equity: bool = True
+
+class BacktestResult(BaseModel):
+    name: str
+    model_id: str
+    sharpe: float
+    sortino: float
+    max_drawdown: float
+    turnover: float
+    trades: int
+    total_return: float
+    equity: Optional[List[float]] = None
+
+class BacktestResponse(BaseModel):
+    dates: List[str]
+    results: List[BacktestResult]
+    # first scenario's Sharpe, for single-scenario callers
+    sharpe: Optional[float] = None
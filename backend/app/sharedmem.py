@@ -0,0 +1,50 @@
+"""
+Hand a NumPy array to pool workers through POSIX shared memory.
+
+The owner creates a ``SharedArray`` and passes its picklable ``spec`` to
+tasks; workers ``attach`` to get a read-only view without copying or
+pickling the data.
+"""
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from typing import Iterator, Tuple
+
+import numpy as np
+
+# (shm name, shape, dtype str)
+ArraySpec = Tuple[str, Tuple[int, ...], str]
+
+
+class SharedArray:
+    def __init__(self, arr: np.ndarray):
+        arr = np.ascontiguousarray(arr)
+        self._shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+        view = np.ndarray(arr.shape, dtype=arr.dtype, buffer=self._shm.buf)
+        view[...] = arr
+        self.spec: ArraySpec = (self._shm.name, arr.shape, arr.dtype.str)
+
+    def close(self) -> None:
+        self._shm.close()
+        self._shm.unlink()
+
+    def __enter__(self) -> "SharedArray":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+@contextmanager
+def attach(spec: ArraySpec) -> Iterator[np.ndarray]:
+    """Read-only view of a ``SharedArray`` from another process."""
+    name, shape, dtype = spec
+    # spawned pool workers share the owner's resource tracker, so the
+    # owner's unlink is the only cleanup the segment needs
+    shm = shared_memory.SharedMemory(name=name)
+    view = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+    view.flags.writeable = False
+    try:
+        yield view
+    finally:
+        del view
+        shm.close()
@@ -0,0 +1,79 @@
+"""
+PC-stable skeleton search on a correlation matrix.
+
+Level k tests every remaining edge against every size-k subset of either
+endpoint's neighbours. Adjacencies are frozen within a level, so a whole
+level is one batch of Fisher-z tests. A previous skeleton can seed the
+search: its separating sets are re-tested first, and pairs that are still
+independent are dropped before level 0.
+"""
+from collections import defaultdict
+from itertools import combinations
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from .citests import fisher_z, partial_corr
+
+Pair = Tuple[int, int]
+
+
+class Skeleton(NamedTuple):
+    adj: np.ndarray  # (N, N) symmetric bool
+    sepsets: Dict[Pair, Tuple[int, ...]]  # (i, j), i < j -> separating set
+    tests: int
+
+    def edges(self) -> set:
+        i, j = np.nonzero(np.triu(self.adj))
+        return set(zip(i.tolist(), j.tolist()))
+
+
+def _remove_independent(corr, n, alpha, adj, sepsets, candidates) -> int:
+    """Test (i, j, S) candidates grouped by |S|; drop the pairs found independent."""
+    by_size = defaultdict(list)
+    for pair, cond in candidates:
+        by_size[len(cond)].append((pair, cond))
+    best: Dict[Pair, Tuple[float, Tuple[int, ...]]] = {}
+    for k, group in by_size.items():
+        x = np.array([p[0] for p, _ in group])
+        y = np.array([p[1] for p, _ in group])
+        cond = np.array([c for _, c in group], dtype=np.intp).reshape(len(group), k)
+        _, pval = fisher_z(partial_corr(corr, x, y, cond), n, k)
+        for g in np.flatnonzero(pval > alpha):
+            pair, c = group[g]
+            if pair not in best or pval[g] > best[pair][0]:
+                best[pair] = (pval[g], c)
+    for (i, j), (_, cond) in best.items():
+        adj[i, j] = adj[j, i] = False
+        sepsets[(i, j)] = cond
+    return sum(len(g) for g in by_size.values())
+
+
+def pc_skeleton(
+    corr: np.ndarray,
+    n: int,
+    alpha: float,
+    max_cond: int = 3,
+    seed: Optional[Skeleton] = None,
+) -> Skeleton:
+    """Skeleton of the variables behind ``corr`` (estimated from ``n`` samples)."""
+    adj = ~np.eye(len(corr), dtype=bool)
+    sepsets: Dict[Pair, Tuple[int, ...]] = {}
+    tests = 0
+    if seed is not None and seed.sepsets:
+        tests += _remove_independent(corr, n, alpha, adj, sepsets, seed.sepsets.items())
+
+    for k in range(max_cond + 1):
+        # dict keys dedupe the S shared by both endpoints' neighbourhoods
+        candidates = {}
+        for i, j in zip(*np.nonzero(np.triu(adj))):
+            i, j = int(i), int(j)
+            for a, b in ((i, j), (j, i)):
+                others = np.flatnonzero(adj[a])
+                others = others[others != b]
+                for cond in combinations(others.tolist(), k):
+                    candidates[((i, j), cond)] = None
+        if not candidates:
+            break
+        tests += _remove_independent(corr, n, alpha, adj, sepsets, candidates)
+    return Skeleton(adj, sepsets, tests)
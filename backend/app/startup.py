@@ -0,0 +1,168 @@
+"""
+Deferred loading of the heavy routers.
+
+Importing the causal, agent and explain routers pulls in torch,
+stable-baselines3, gymnasium, shap and causallearn, which takes seconds. With
+``STARTUP_MODE`` set to "lazy" or "background" the app binds with only the
+light routes; a heavy router is imported and included the first time a
+request hits its prefix ("lazy"), or by a warm-up thread that starts once
+the server is up ("background"), whichever comes first. "eager" imports
+everything before serving, as before.
+
+Database schema setup runs on a thread too, so a slow or unreachable
+Postgres no longer holds up startup, and so does starting the training
+job dispatcher, which every worker runs to claim queued jobs.
+"""
+import importlib
+import threading
+import time
+from typing import Dict, List, Optional
+
+import anyio
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+from .core import settings
+from .workers import cpu_workers, warm_pool
+
+# prefix -> module defining ``router``; keep in sync with the routers' prefixes
+HEAVY_ROUTERS = {
+    "/causal": "app.api.causal",
+    "/features": "app.api.features",
+    "/agent": "app.api.agent",
+    "/explain": "app.api.explain",
+    "/gridsearch": "app.api.gridsearch",
+    "/backtest": "app.api.backtest",
+}
+
+
+class RouterLoader:
+    """Imports each router module at most once and includes it in the app."""
+
+    def __init__(self, routers: Dict[str, str]):
+        self.routers = routers
+        self.app: Optional[FastAPI] = None
+        self.state: Dict[str, dict] = {m: {"status": "pending"} for m in routers.values()}
+        self.db: dict = {"status": "pending"}
+        self._locks = {m: threading.Lock() for m in routers.values()}
+
+    def module_for(self, path: str) -> Optional[str]:
+        for prefix, module in self.routers.items():
+            if path == prefix or path.startswith(prefix + "/"):
+                return module
+        return None
+
+    def loaded(self, module: str) -> bool:
+        return self.state[module]["status"] == "loaded"
+
+    def load(self, module: str) -> None:
+        with self._locks[module]:
+            if self.loaded(module):
+                return
+            self.state[module] = {"status": "loading"}
+            t0 = time.perf_counter()
+            try:
+                router = importlib.import_module(module).router
+            except Exception as e:
+                self.state[module] = {"status": "failed", "error": str(e)}
+                raise
+            self.app.include_router(router)
+            # regenerate /openapi.json with the new routes
+            self.app.openapi_schema = None
+            self.state[module] = {"status": "loaded", "seconds": time.perf_counter() - t0}
+
+    def load_all(self) -> None:
+        for module in self.routers.values():
+            try:
+                self.load(module)
+            except Exception:
+                # recorded in state; the next request to the prefix retries
+                pass
+
+    def stats(self) -> dict:
+        return {"mode": settings.STARTUP_MODE, "routers": dict(self.state), "database": self.db}
+
+
+router_loader = RouterLoader(HEAVY_ROUTERS)
+
+
+class LazyRouterMiddleware:
+    """Loads the router behind a request's prefix before the app routes it."""
+
+    def __init__(self, app, loader: RouterLoader):
+        self.app = app
+        self.loader = loader
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] in ("http", "websocket"):
+            module = self.loader.module_for(scope["path"])
+            if module is not None and not self.loader.loaded(module):
+                try:
+                    await anyio.to_thread.run_sync(self.loader.load, module)
+                except Exception as e:
+                    if scope["type"] == "http":
+                        response = JSONResponse({"detail": f"Router unavailable: {e}"}, 503)
+                        return await response(scope, receive, send)
+                    raise
+        await self.app(scope, receive, send)
+
+
+def init_db() -> None:
+    t0 = time.perf_counter()
+    try:
+        from .database import get_engine
+        from .models import Base
+
+        Base.metadata.create_all(bind=get_engine())
+        router_loader.db = {"status": "ready", "seconds": time.perf_counter() - t0}
+    except Exception as e:
+        router_loader.db = {"status": "failed", "error": str(e)}
+
+
+def start_training_jobs() -> None:
+    # jobs.py imports stable-baselines3, so this stays off the startup path
+    from .jobs import training_jobs
+
+    training_jobs.start()
+
+
+def preload_ids() -> List[str]:
+    return [m.strip() for m in settings.MODEL_PRELOAD.split(",") if m.strip()]
+
+
+def preload_models() -> None:
+    """Load MODEL_PRELOAD into this process's registry."""
+    from .registry import model_registry
+
+    model_registry.preload(preload_ids())
+
+
+def warm_models() -> None:
+    """
+    Load MODEL_PRELOAD where policies run: in every exec pool worker,
+    started now, and in this process when batched inference is on.
+    """
+    if not settings.MODEL_PRELOAD.strip():
+        return
+    if settings.INFER_BATCHING:
+        preload_models()
+    warm_pool("exec", cpu_workers(settings.EXEC_WORKERS), preload=True)
+
+
+def _warm_up() -> None:
+    router_loader.load_all()
+    warm_models()
+
+
+def start(app: FastAPI) -> None:
+    """Called from the lifespan hook, before the server accepts requests."""
+    router_loader.app = app
+    threading.Thread(target=init_db, name="db-init", daemon=True).start()
+    threading.Thread(target=start_training_jobs, name="jobs-init", daemon=True).start()
+    if settings.STARTUP_MODE == "eager":
+        # import errors should stop the server here, as they used to
+        for module in HEAVY_ROUTERS.values():
+            router_loader.load(module)
+        warm_models()
+    elif settings.STARTUP_MODE == "background":
+        threading.Thread(target=_warm_up, name="warm-up", daemon=True).start()
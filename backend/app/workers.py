@@ -0,0 +1,112 @@
+"""
+Named, lazily created process pools for CPU-bound work.
+
+Pools use the "spawn" start method so workers never inherit torch's
+thread pools or open sockets from the API process, and each worker is
+limited to one intra-op torch thread so N workers use N cores. Pools that
+run policies can load ``MODEL_PRELOAD`` in each worker as it starts, and
+``warm_pool`` starts all of a pool's workers ahead of the first request.
+"""
+import os
+import atexit
+import logging
+import threading
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.queues import SimpleQueue
+from typing import Dict, Set
+
+logger = logging.getLogger(__name__)
+
+
+def cpu_workers(configured: int) -> int:
+    """``configured`` if positive, otherwise one worker per core."""
+    return configured if configured > 0 else (os.cpu_count() or 1)
+
+
+def _init_worker(preload: bool, started: SimpleQueue) -> None:
+    import torch
+
+    torch.set_num_threads(1)
+    started.put(os.getpid())
+    if preload:
+        from .registry import model_registry
+        from .startup import preload_ids
+
+        for model_id in preload_ids():
+            try:
+                model_registry.load(model_id)
+            except Exception as exc:
+                # a bad id fails the requests that use it, not every task in the pool
+                logger.warning("worker %d could not preload %s: %r", os.getpid(), model_id, exc)
+
+
+_pools: Dict[str, ProcessPoolExecutor] = {}
+# each pool's workers report their pid here as they start
+_started: Dict[str, SimpleQueue] = {}
+_pids: Dict[str, Set[int]] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(name: str, max_workers: int, preload: bool = False) -> ProcessPoolExecutor:
+    """The pool called ``name``; with ``preload`` its workers load MODEL_PRELOAD."""
+    with _pools_lock:
+        pool = _pools.get(name)
+        if pool is None:
+            ctx = mp.get_context("spawn")
+            _started[name] = ctx.SimpleQueue()
+            _pids[name] = set()
+            pool = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=ctx,
+                initializer=_init_worker,
+                initargs=(preload, _started[name]),
+            )
+            _pools[name] = pool
+        return pool
+
+
+def _noop() -> None:
+    pass
+
+
+def warm_pool(name: str, max_workers: int, preload: bool = False) -> None:
+    """Start every worker of a pool now and wait until they have initialized."""
+    pool = get_pool(name, max_workers, preload)
+    # with spawn, a worker starts per submit while none is idle
+    for future in [pool.submit(_noop) for _ in range(max_workers)]:
+        future.result()
+
+
+def worker_pids(name: str) -> Set[int]:
+    """Pids of a pool's workers, as their initializers reported them; empty if none started."""
+    with _pools_lock:
+        started = _started.get(name)
+        if started is None:
+            return set()
+        while not started.empty():
+            _pids[name].add(started.get())
+        return set(_pids[name])
+
+
+def pool_stats() -> Dict[str, Dict[str, int]]:
+    with _pools_lock:
+        pools = dict(_pools)
+    return {
+        name: {
+            "workers": pool._max_workers,
+            # submitted and not yet finished, including those still queued
+            "pending": len(pool._pending_work_items),
+        }
+        for name, pool in pools.items()
+    }
+
+
+@atexit.register
+def shutdown_pools() -> None:
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        _pools.clear()
+        _started.clear()
+        _pids.clear()
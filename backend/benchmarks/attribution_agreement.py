@@ -0,0 +1,94 @@
+"""
+How closely do the gradient attributions agree with KernelSHAP?
+
+Trains a small PPO policy on a fixed synthetic returns fixture, explains
+every decision with each method and prints timings plus agreement with
+KernelSHAP as JSON.
+
+    cd backend && python -m benchmarks.attribution_agreement
+"""
+import os
+import json
+import time
+import tempfile
+
+os.environ.setdefault("MODEL_DIR", tempfile.mkdtemp(prefix="tcarp-bench-models-"))
+os.environ.setdefault("SHAP_WORKERS", "1")
+
+import numpy as np
+import pandas as pd
+
+
+def _fixture(n_days: int = 160, n_symbols: int = 5, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0.0, 0.01, size=(n_days, n_symbols))
+    # a little lead-lag structure so the policy has something to pick up
+    returns[1:, 1] += 0.5 * returns[:-1, 0]
+    index = pd.bdate_range("2021-01-01", periods=n_days)
+    return pd.DataFrame(returns, index=index, columns=[f"S{i}" for i in range(n_symbols)])
+
+
+def _rankdata(a: np.ndarray) -> np.ndarray:
+    return np.argsort(np.argsort(a, axis=-1), axis=-1).astype(np.float64)
+
+
+def _spearman_rows(a: np.ndarray, b: np.ndarray) -> float:
+    ra, rb = _rankdata(a), _rankdata(b)
+    ra -= ra.mean(axis=1, keepdims=True)
+    rb -= rb.mean(axis=1, keepdims=True)
+    den = np.sqrt((ra ** 2).sum(axis=1) * (rb ** 2).sum(axis=1))
+    ok = den > 0
+    return float(np.mean((ra * rb).sum(axis=1)[ok] / den[ok]))
+
+
+def agreement(reference: np.ndarray, other: np.ndarray) -> dict:
+    ref_imp, other_imp = np.abs(reference).mean(axis=0), np.abs(other).mean(axis=0)
+    return {
+        "global_spearman": _spearman_rows(ref_imp[None], other_imp[None]),
+        "global_top1_match": bool(ref_imp.argmax() == other_imp.argmax()),
+        "per_decision_spearman_abs": _spearman_rows(np.abs(reference), np.abs(other)),
+        "per_decision_sign_agreement": float(
+            np.mean(np.sign(reference) == np.sign(other))
+        ),
+        "per_decision_top1_match": float(
+            np.mean(np.abs(reference).argmax(axis=1) == np.abs(other).argmax(axis=1))
+        ),
+    }
+
+
+def main() -> None:
+    from stable_baselines3 import PPO
+
+    from app.api.agent import TradingEnv, rollout_indices
+    from app.attribution import gradient_attributions, kernel_shap
+    from app.registry import model_registry
+
+    frame = _fixture()
+    model = PPO("MlpPolicy", TradingEnv(frame), seed=0, verbose=0)
+    model.learn(total_timesteps=2048)
+    model_id = "attribution-fixture"
+    model.save(model_registry.zip_path(model_id))
+    model_registry.register(model_id, {"symbols": list(frame.columns)})
+
+    returns_arr = frame.values.astype(np.float32)
+    x = returns_arr[:-1]
+    actions = rollout_indices(model, returns_arr, frame.shape[1])
+
+    results = {"rows": int(len(x)), "features": int(x.shape[1]), "methods": {}}
+    t0 = time.perf_counter()
+    reference = kernel_shap(model_id, x, actions, background_size=20, nsamples=200)
+    results["methods"]["kernelshap"] = {"seconds": time.perf_counter() - t0}
+
+    for method in ("integrated_gradients", "gradient_input"):
+        t0 = time.perf_counter()
+        attrs = gradient_attributions(model, x, actions, method=method)
+        results["methods"][method] = {
+            "seconds": time.perf_counter() - t0,
+            **agreement(reference, attrs),
+        }
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Backtest engine throughput: many strategies scored in one vectorized call
+vs a per-strategy, per-day Python loop.
+
+Uses random returns and random (sticky) action sequences so only the
+scoring is timed, not policy inference. Prints timings as JSON.
+
+    cd backend && python -m benchmarks.backtest --days 500 --models 50
+"""
+import json
+import time
+import argparse
+
+import numpy as np
+
+
+def _loop_backtest(returns: np.ndarray, actions: np.ndarray, rate: float) -> list:
+    out = []
+    for acts in actions:
+        equity, peak, max_dd, prev = 1.0, 1.0, 0.0, None
+        pnl = []
+        for t, a in enumerate(acts):
+            traded = 1.0 if prev is None else 2.0 * (a != prev)
+            r = returns[t + 1, a] - traded * rate
+            pnl.append(r)
+            equity *= 1.0 + r
+            peak = max(peak, equity)
+            max_dd = max(max_dd, 1.0 - equity / peak)
+            prev = a
+        out.append((float(np.mean(pnl) / np.std(pnl) * np.sqrt(252)), max_dd))
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=500)
+    parser.add_argument("--symbols", type=int, default=20)
+    parser.add_argument("--models", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    from app.backtest import backtest
+
+    rng = np.random.default_rng(0)
+    returns = rng.normal(0.0, 0.01, size=(args.days, args.symbols)).astype(np.float32)
+    # hold each pick for a few days, like a real policy
+    switch = rng.random((args.models, args.days - 1)) < 0.2
+    picks = rng.integers(0, args.symbols, size=(args.models, args.days - 1))
+    actions = picks[np.arange(args.models)[:, None], np.maximum.accumulate(
+        np.where(switch, np.arange(args.days - 1), 0), axis=1
+    )]
+
+    t0 = time.perf_counter()
+    for _ in range(args.repeat):
+        stats = backtest(returns, actions, cost_bps=5.0, slippage_bps=2.0)
+    vectorized = (time.perf_counter() - t0) / args.repeat
+
+    t0 = time.perf_counter()
+    reference = _loop_backtest(returns.astype(np.float64), actions, 7e-4)
+    loop = time.perf_counter() - t0
+
+    ref_sharpe, ref_dd = np.array(reference).T
+    print(json.dumps({
+        "days": args.days,
+        "symbols": args.symbols,
+        "models": args.models,
+        "vectorized_s": vectorized,
+        "loop_s": loop,
+        "speedup": loop / vectorized,
+        "max_abs_diff": {
+            "sharpe": float(np.abs(stats["sharpe"] - ref_sharpe).max()),
+            "max_drawdown": float(np.abs(stats["max_drawdown"] - ref_dd).max()),
+        },
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
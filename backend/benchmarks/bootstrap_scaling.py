@@ -0,0 +1,56 @@
+"""
+Bootstrap edge-confidence scaling with pool size.
+
+Runs B PC resamples on a synthetic universe for each worker count and
+prints wall time and speedup over one worker, as JSON. Early stopping is
+disabled (tol=0) so every run does the same work.
+
+    cd backend && python -m benchmarks.bootstrap_scaling --symbols 30 --resamples 200 --workers 1 2 4 8
+"""
+import json
+import time
+import argparse
+
+import numpy as np
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=750)
+    parser.add_argument("--symbols", type=int, default=30)
+    parser.add_argument("--resamples", type=int, default=200)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    from app import workers
+    from app.bootstrap import bootstrap_edges
+    from app.core import settings
+
+    rng = np.random.default_rng(0)
+    x = rng.normal(0.0, 0.01, size=(args.days, args.symbols))
+    for j in range(1, args.symbols, 3):
+        x[:, j] += 0.6 * x[:, j - 1]
+    labels = [f"S{i}" for i in range(args.symbols)]
+
+    timings = {}
+    for n in args.workers:
+        settings.BOOTSTRAP_WORKERS = n
+        workers.shutdown_pools()
+        # spawn the pool and import causallearn in every worker before timing
+        bootstrap_edges(x, 0.05, labels, n, tol=0.0)
+        t0 = time.perf_counter()
+        bootstrap_edges(x, 0.05, labels, args.resamples, tol=0.0)
+        timings[n] = time.perf_counter() - t0
+
+    base = timings[args.workers[0]]
+    print(json.dumps({
+        "days": args.days,
+        "symbols": args.symbols,
+        "resamples": args.resamples,
+        "seconds": timings,
+        "speedup": {n: base / t for n, t in timings.items()},
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Environment stepping throughput: TradingEnv vs SB3's vectorized wrappers
+vs the pure-NumPy TradingVecEnv.
+
+Steps every env with random actions (no policy) and prints env-steps/s
+for each implementation as JSON. ``--window`` and ``--features`` select
+windowed observations (see ``app.observations``); a step should cost the
+same at any window. ``--ppo-steps`` also trains PPO on TradingVecEnv with
+``--num-envs`` copies, which checks that SB3 accepts the env's spaces.
+
+    cd backend && python -m benchmarks.env_throughput --num-envs 16
+    cd backend && python -m benchmarks.env_throughput --window 20 --features volatility cumulative
+"""
+import json
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+
+def _returns(days: int, symbols: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range("2010-01-01", periods=days)
+    return pd.DataFrame(
+        rng.normal(0.0, 0.01, size=(days, symbols)).astype(np.float32),
+        index=index,
+        columns=[f"S{i}" for i in range(symbols)],
+    )
+
+
+def _bench_single(frame: pd.DataFrame, steps: int, spec) -> float:
+    from app.api.agent import TradingEnv
+
+    env = TradingEnv(frame, spec)
+    actions = np.random.default_rng(1).integers(0, frame.shape[1], size=steps)
+    env.reset()
+    t0 = time.perf_counter()
+    for a in actions:
+        _, _, done, _, _ = env.step(int(a))
+        if done:
+            env.reset()
+    return steps / (time.perf_counter() - t0)
+
+
+def _bench_vec(venv, n_actions: int, steps: int) -> float:
+    k = venv.num_envs
+    rounds = max(1, steps // k)
+    actions = np.random.default_rng(1).integers(0, n_actions, size=(rounds, k))
+    venv.reset()
+    t0 = time.perf_counter()
+    for a in actions:
+        venv.step(a)
+    elapsed = time.perf_counter() - t0
+    venv.close()
+    return rounds * k / elapsed
+
+
+def _bench_ppo(frame: pd.DataFrame, num_envs: int, timesteps: int, spec) -> float:
+    from app.api.agent import train_policy
+
+    t0 = time.perf_counter()
+    train_policy(frame.values, list(frame.columns), timesteps, num_envs, spec=spec)
+    return timesteps / (time.perf_counter() - t0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=2500)
+    parser.add_argument("--symbols", type=int, default=20)
+    parser.add_argument("--num-envs", type=int, default=16)
+    parser.add_argument("--steps", type=int, default=50_000)
+    parser.add_argument("--window", type=int, default=1)
+    parser.add_argument("--features", nargs="*", default=[])
+    parser.add_argument("--skip-subproc", action="store_true")
+    parser.add_argument("--ppo-steps", type=int, default=2048, help="0 skips the PPO run")
+    args = parser.parse_args()
+
+    from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv
+    from app.api.agent import TradingEnv, TradingVecEnv
+    from app.observations import ObsSpec
+
+    frame = _returns(args.days, args.symbols)
+    spec = ObsSpec(args.window, tuple(args.features))
+    k, n = args.num_envs, args.symbols
+    results = {
+        "days": args.days,
+        "symbols": n,
+        "num_envs": k,
+        "obs_dim": spec.width(n),
+        "env_steps_per_s": {
+            # bare step() loop, no SB3 wrapper around it
+            "TradingEnv": _bench_single(frame, args.steps, spec),
+            "DummyVecEnv": _bench_vec(
+                DummyVecEnv([lambda: TradingEnv(frame, spec)] * k), n, args.steps
+            ),
+            "TradingVecEnv": _bench_vec(
+                TradingVecEnv(frame.values, k, seed=0, spec=spec), n, args.steps
+            ),
+        },
+    }
+    if not args.skip_subproc:
+        results["env_steps_per_s"]["SubprocVecEnv"] = _bench_vec(
+            SubprocVecEnv([lambda: TradingEnv(frame, spec)] * k), n, args.steps
+        )
+    if args.ppo_steps:
+        results["ppo_steps_per_s"] = _bench_ppo(frame, max(k, 2), args.ppo_steps, spec)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
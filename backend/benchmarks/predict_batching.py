@@ -0,0 +1,124 @@
+"""
+Concurrent /agent/predict throughput with and without micro-batching.
+
+Trains a small policy on synthetic prices, then sends ``--requests``
+predict calls, ``--concurrency`` at a time, each over a short recent
+window (a dashboard poll), through the ASGI app in-process. Runs once with
+INFER_BATCHING on and once off (each request's rollout in the exec pool).
+For each run it prints requests/s, p50 and p95 latency, and for the
+batched run how many forward passes served the requests.
+
+    cd backend && python -m benchmarks.predict_batching --concurrency 32 --requests 512
+"""
+import os
+import json
+import asyncio
+import argparse
+import tempfile
+import statistics
+import time
+from datetime import timedelta
+
+
+def _configure(workdir: str) -> None:
+    """Settings are read at import time, so this runs before any app import."""
+    os.environ.update({
+        "PRICE_SOURCE": "local",
+        "PRICE_LOCAL_DIR": os.path.join(workdir, "local"),
+        "PRICE_STORE_DIR": os.path.join(workdir, "store"),
+        "MODEL_DIR": os.path.join(workdir, "models"),
+        "CACHE_BACKEND": "memory",
+        # admit the whole burst; the gates would otherwise 429 the excess
+        "EXEC_QUEUE": "4096",
+    })
+
+
+async def _run(client, body: dict, requests: int, concurrency: int) -> dict:
+    latencies = []
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with sem:
+            t0 = time.perf_counter()
+            r = await client.post("/agent/predict", json=body)
+            latencies.append(time.perf_counter() - t0)
+            r.raise_for_status()
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - t0
+    latencies.sort()
+    return {
+        "requests_per_s": requests / elapsed,
+        "p50_ms": 1000 * statistics.median(latencies),
+        "p95_ms": 1000 * latencies[int(0.95 * (len(latencies) - 1))],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--symbols", type=int, default=10)
+    parser.add_argument("--days", type=int, default=500)
+    parser.add_argument("--window-days", type=int, default=30, help="days per predict call")
+    parser.add_argument("--timesteps", type=int, default=1024)
+    parser.add_argument("--requests", type=int, default=256)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    _configure(tempfile.mkdtemp(prefix="tcarp-infer-"))
+    from .synthetic import synthetic_market, write_prices
+
+    market = synthetic_market(args.symbols, args.days)
+    write_prices(market, os.environ["PRICE_LOCAL_DIR"])
+
+    import httpx
+    from fastapi import FastAPI
+
+    from app.api import agent
+    from app.core import settings
+    from app.inference import inference_scheduler
+
+    symbols = list(market.prices.columns)
+    first, last = market.prices.index[0].date(), market.prices.index[-1].date()
+    model_id = agent._train_agent_internal(symbols, first, last, args.timesteps)
+    body = {
+        "model_id": model_id,
+        "symbols": symbols,
+        "start_date": str(last - timedelta(days=args.window_days)),
+        "end_date": str(last + timedelta(days=1)),
+    }
+
+    app = FastAPI()
+    app.include_router(agent.router)
+
+    async def bench() -> dict:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            results = {}
+            for batching in (True, False):
+                settings.INFER_BATCHING = batching
+                # warm-up: model load, returns cache, pool start-up
+                await _run(client, body, args.concurrency, args.concurrency)
+                before = dict(inference_scheduler.stats())
+                run = await _run(client, body, args.requests, args.concurrency)
+                if batching:
+                    after = inference_scheduler.stats()
+                    batches = after["batches"] - before["batches"]
+                    requests = after["requests"] - before["requests"]
+                    run["batches"] = batches
+                    run["avg_batch_requests"] = requests / batches if batches else 0.0
+                results["batched" if batching else "unbatched"] = run
+            return results
+
+    print(json.dumps({
+        "symbols": args.symbols,
+        "window_days": args.window_days,
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "infer_window_ms": settings.INFER_WINDOW_MS,
+        "results": asyncio.run(bench()),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+API cold-start cost.
+
+Every measurement runs in a fresh interpreter so nothing is already in
+``sys.modules``. For each module, prints the time to import it on its own
+and the third-party packages that cost the most (from ``-X importtime``);
+for each STARTUP_MODE, prints the time to import ``main`` and run its
+lifespan startup, i.e. until the server could accept a connection.
+
+    cd backend && python -m benchmarks.startup --top 5
+"""
+import os
+import re
+import sys
+import json
+import argparse
+import subprocess
+
+MODULES = [
+    "app.api.health",
+    "app.api.causal",
+    "app.api.features",
+    "app.api.agent",
+    "app.api.explain",
+    "app.api.gridsearch",
+    "app.api.backtest",
+]
+
+# -X importtime lines: "import time: self [us] | cumulative | imported package"
+_IMPORTTIME = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s*(\S+)")
+
+_STARTUP = """
+import asyncio, json, time
+t0 = time.perf_counter()
+import main
+imported = time.perf_counter() - t0
+
+async def boot():
+    async with main.app.router.lifespan_context(main.app):
+        return time.perf_counter() - t0
+
+ready = asyncio.run(boot())
+print(json.dumps({"import_s": imported, "ready_s": ready}))
+"""
+
+
+def _run(code: str, env: dict, importtime: bool = False) -> subprocess.CompletedProcess:
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+    return subprocess.run(cmd, capture_output=True, text=True, env=env)
+
+
+def module_cost(module: str, top: int, env: dict) -> dict:
+    code = f"import time; t0 = time.perf_counter(); import {module}; print(time.perf_counter() - t0)"
+    proc = _run(code, env, importtime=True)
+    if proc.returncode != 0:
+        return {"error": proc.stderr.strip().splitlines()[-1]}
+
+    # cumulative time per third-party package; its outermost import is the largest
+    packages: dict = {}
+    for line in proc.stderr.splitlines():
+        m = _IMPORTTIME.match(line)
+        if m is None:
+            continue
+        root = m.group(3).split(".")[0]
+        if root != "app" and root not in sys.stdlib_module_names:
+            packages[root] = max(packages.get(root, 0.0), int(m.group(2)) / 1e6)
+    heaviest = sorted(packages.items(), key=lambda kv: -kv[1])[:top]
+    return {"seconds": float(proc.stdout.strip()), "heaviest": dict(heaviest)}
+
+
+def startup_cost(mode: str, env: dict) -> dict:
+    proc = _run(_STARTUP, {**env, "STARTUP_MODE": mode})
+    if proc.returncode != 0:
+        return {"error": proc.stderr.strip().splitlines()[-1]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--modules", nargs="+", default=MODULES)
+    parser.add_argument("--modes", nargs="+", default=["eager", "lazy", "background"])
+    parser.add_argument("--top", type=int, default=5)
+    args = parser.parse_args()
+
+    env = {**os.environ, "PYTHONPATH": os.getcwd()}
+    print(json.dumps({
+        "modules": {m: module_cost(m, args.top, env) for m in args.modules},
+        "startup": {mode: startup_cost(mode, env) for mode in args.modes},
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Offline end-to-end benchmark suite with JSON baselines.
+
+Generates a synthetic market (see ``benchmarks.synthetic``), points
+``PRICE_SOURCE=local`` at it and times every pipeline stage with the
+result caches disabled, so each run does the full work:
+
+    fetch_returns       price store -> cleaned returns
+    causal_discover     PC through the /causal/discover handler
+    feature_select      Markov-blanket search through the /features/select handler
+    env_step            TradingEnv.step
+    ppo_train           PPO.learn on TradingEnv
+    run_rollout         batched policy rollout over the whole window
+    explain_kernelshap  POST /explain/perdecision (KernelSHAP) via TestClient
+    explain_gradient    POST /explain/perdecision (integrated gradients) via TestClient
+    counterfactual      POST /explain/counterfactual/sweep via TestClient
+
+Each stage reports the median of ``repeats`` runs after one warm-up run.
+``--save`` writes the results as a baseline; ``--compare`` checks them
+against one and exits non-zero when a stage is more than ``--threshold``
+slower (stages faster than ``--min-seconds`` are compared against that
+floor, so timer noise does not fail the check).
+
+    cd backend && python -m benchmarks.suite --save benchmarks/baselines/small.json
+    cd backend && python -m benchmarks.suite --compare benchmarks/baselines/small.json --threshold 0.3
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import statistics
+from datetime import date, timedelta
+from typing import Callable, Dict
+
+SIZES = {
+    "small": {"symbols": 8, "days": 500, "timesteps": 2048, "explain_days": 60, "repeats": 3},
+    "medium": {"symbols": 20, "days": 1500, "timesteps": 8192, "explain_days": 120, "repeats": 5},
+}
+
+
+def _configure(workdir: str) -> None:
+    """Settings are read at import time, so this runs before any app import."""
+    os.environ.update({
+        "PRICE_SOURCE": "local",
+        "PRICE_LOCAL_DIR": os.path.join(workdir, "local"),
+        "PRICE_STORE_DIR": os.path.join(workdir, "store"),
+        "MODEL_DIR": os.path.join(workdir, "models"),
+        # no result caches: every run recomputes
+        "CACHE_BACKEND": "memory",
+        "CACHE_TTL": "0",
+        "GRAPH_CACHE_SIZE": "0",
+        "RETURNS_CACHE_BYTES": "0",
+        "SHAP_WORKERS": "1",
+    })
+
+
+def _time(fn: Callable, repeats: int, warmup: bool = True) -> dict:
+    if warmup:
+        fn()
+    runs = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - t0)
+    return {"seconds": statistics.median(runs), "runs": runs}
+
+
+def run(size: dict, seed: int) -> Dict[str, dict]:
+    from .synthetic import synthetic_market, write_prices
+
+    market = synthetic_market(size["symbols"], size["days"], seed=seed)
+    write_prices(market, os.environ["PRICE_LOCAL_DIR"])
+
+    import numpy as np
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from app import blanket
+    from app.api import explain
+    from app.api.agent import TradingEnv, run_rollout, train_policy
+    from app.api.causal import CausalDiscoverRequest, _discover
+    from app.api.features import FeatureSelectRequest, _select_features
+    from app.registry import model_registry
+    from app.returns import fetch_returns
+
+    symbols = list(market.prices.columns)
+    start = market.prices.index[0].date()
+    end = market.prices.index[-1].date() + timedelta(days=1)
+    window = {"symbols": symbols, "start_date": start, "end_date": end}
+    repeats = size["repeats"]
+    stages: Dict[str, dict] = {}
+
+    stages["fetch_returns"] = _time(lambda: fetch_returns(symbols, start, end), repeats)
+    returns = fetch_returns(symbols, start, end)
+
+    stages["causal_discover"] = _time(lambda: _discover(CausalDiscoverRequest(**window)), repeats)
+
+    def select():
+        blanket._caches.clear()
+        _select_features(FeatureSelectRequest(**window, targets=symbols[:3]))
+    stages["feature_select"] = _time(select, repeats)
+
+    env = TradingEnv(returns.frame())
+    steps = 10 * len(returns)
+    actions = np.random.default_rng(seed).integers(0, len(symbols), size=steps)
+
+    def step_env():
+        env.reset()
+        for a in actions:
+            if env.step(int(a))[2]:
+                env.reset()
+    stages["env_step"] = _time(step_env, repeats)
+    stages["env_step"]["steps_per_s"] = steps / stages["env_step"]["seconds"]
+
+    timesteps = size["timesteps"]
+    model = None
+
+    def train():
+        nonlocal model
+        model = train_policy(returns.values, symbols, timesteps)
+    # one run: training is the slowest stage and its own warm-up is negligible
+    stages["ppo_train"] = _time(train, 1, warmup=False)
+    stages["ppo_train"]["steps_per_s"] = timesteps / stages["ppo_train"]["seconds"]
+
+    model_id = "benchmark-suite"
+    model.save(model_registry.zip_path(model_id))
+    with open(os.path.join(model_registry.model_dir, f"{model_id}.json"), "w") as f:
+        json.dump({"symbols": symbols}, f)
+    model_registry.register(model_id, {"symbols": symbols})
+
+    stages["run_rollout"] = _time(lambda: run_rollout(model, returns.values, symbols), repeats)
+
+    app = FastAPI()
+    app.include_router(explain.router)
+    client = TestClient(app)
+    tail = {
+        "model_id": model_id,
+        "symbols": symbols,
+        "start_date": str(end - timedelta(days=int(size["explain_days"] * 7 / 5))),
+        "end_date": str(end),
+    }
+
+    def post(path: str, body: dict) -> Callable:
+        def call():
+            r = client.post(path, json=body)
+            if r.status_code != 200:
+                raise RuntimeError(f"{path}: {r.status_code} {r.text}")
+        return call
+
+    stages["explain_kernelshap"] = _time(post("/explain/perdecision", {
+        **tail, "method": "kernelshap", "nsamples": 64, "background_size": 20,
+    }), repeats)
+    stages["explain_gradient"] = _time(post("/explain/perdecision", {
+        **tail, "method": "integrated_gradients",
+    }), repeats)
+    stages["counterfactual"] = _time(post("/explain/counterfactual/sweep", {
+        **tail, "deltas": [-0.5, -0.1, 0.1, 0.5], "find_minimal": True,
+    }), repeats)
+    return stages
+
+
+def compare(results: dict, baseline: dict, threshold: float, min_seconds: float) -> list:
+    regressions = []
+    for name, current in results["stages"].items():
+        base = baseline["stages"].get(name)
+        if base is None:
+            continue
+        limit = max(base["seconds"], min_seconds) * (1.0 + threshold)
+        if current["seconds"] > limit:
+            regressions.append({
+                "stage": name,
+                "baseline_s": base["seconds"],
+                "current_s": current["seconds"],
+                "ratio": current["seconds"] / base["seconds"],
+            })
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", choices=sorted(SIZES), default="small")
+    parser.add_argument("--repeats", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="write the results to this baseline file")
+    parser.add_argument("--compare", help="baseline file to check the results against")
+    parser.add_argument("--threshold", type=float, default=0.3)
+    parser.add_argument("--min-seconds", type=float, default=0.01)
+    args = parser.parse_args()
+
+    size = dict(SIZES[args.size])
+    if args.repeats is not None:
+        size["repeats"] = args.repeats
+    _configure(tempfile.mkdtemp(prefix="tcarp-bench-"))
+
+    results = {
+        "size": args.size,
+        "params": size,
+        "machine": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "date": str(date.today()),
+        "stages": run(size, args.seed),
+    }
+
+    failed = False
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        results["regressions"] = compare(results, baseline, args.threshold, args.min_seconds)
+        failed = bool(results["regressions"])
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or ".", exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+
+    print(json.dumps(results, indent=2))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
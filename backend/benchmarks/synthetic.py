@@ -0,0 +1,127 @@
+"""
+Synthetic market data for offline benchmarks.
+
+Returns follow a linear model with planted links: contemporaneous ones
+(source before target in symbol order, so the instantaneous part is a DAG
+PC can recover) and lagged ones (source leads target by 1..max_lag days).
+The sample is cut into regimes; each regime scales the noise volatility
+and the link strength, so rolling and bootstrap discovery see structure
+that changes over time.
+
+Prices are ``100 * cumprod(1 + returns)`` and can be written as
+``<SYMBOL>.csv`` files that ``PRICE_SOURCE=local`` reads, so the real
+``fetch_returns`` path runs without the network.
+
+    cd backend && python -m benchmarks.synthetic --symbols 10 --days 750 --out data/local
+"""
+import os
+import json
+import argparse
+from typing import List, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+
+class Link(NamedTuple):
+    source: str
+    target: str
+    lag: int
+    coef: float
+
+
+class SyntheticMarket(NamedTuple):
+    returns: pd.DataFrame
+    prices: pd.DataFrame
+    links: List[Link]
+    # first day index of every regime
+    regime_starts: List[int]
+
+
+def synthetic_market(
+    symbols: int = 10,
+    days: int = 750,
+    max_lag: int = 3,
+    contemporaneous: int = None,
+    lagged: int = None,
+    regimes: int = 2,
+    start: str = "2015-01-01",
+    seed: int = 0,
+) -> SyntheticMarket:
+    rng = np.random.default_rng(seed)
+    names = [f"SYN{i:03d}" for i in range(symbols)]
+    contemporaneous = symbols // 3 if contemporaneous is None else contemporaneous
+    lagged = symbols // 2 if lagged is None else lagged
+
+    links: List[Link] = []
+    for _ in range(contemporaneous):
+        i, j = sorted(rng.choice(symbols, size=2, replace=False))
+        links.append(Link(names[i], names[j], 0, float(rng.uniform(0.4, 0.8))))
+    for _ in range(lagged):
+        i, j = rng.choice(symbols, size=2, replace=False)
+        links.append(Link(names[i], names[j], int(rng.integers(1, max_lag + 1)), float(rng.uniform(0.3, 0.6))))
+    links = list({(l.source, l.target, l.lag): l for l in links}.values())
+
+    regime_starts = sorted(set([0] + rng.choice(np.arange(1, days), size=regimes - 1, replace=False).tolist()))
+    regime = np.searchsorted(regime_starts, np.arange(days), side="right") - 1
+    vol = rng.uniform(0.007, 0.02, size=len(regime_starts))[regime]
+    strength = rng.uniform(0.5, 1.5, size=len(regime_starts))[regime]
+
+    index = {n: k for k, n in enumerate(names)}
+    src = np.array([index[l.source] for l in links], dtype=np.intp)
+    dst = np.array([index[l.target] for l in links], dtype=np.intp)
+    lag = np.array([l.lag for l in links], dtype=np.intp)
+    coef = np.array([l.coef for l in links])
+    instant = lag == 0
+    # contemporaneous links in topological (= symbol) order
+    order = np.argsort(src[instant], kind="stable")
+
+    x = np.zeros((days, symbols))
+    noise = rng.standard_normal((days, symbols))
+    for t in range(days):
+        row = noise[t] * vol[t]
+        past = ~instant & (lag <= t)
+        np.add.at(row, dst[past], strength[t] * coef[past] * x[t - lag[past], src[past]])
+        for k in np.flatnonzero(instant)[order]:
+            row[dst[k]] += strength[t] * coef[k] * row[src[k]]
+        x[t] = row
+
+    dates = pd.bdate_range(start, periods=days, name="Date")
+    returns = pd.DataFrame(x, index=dates, columns=names)
+    prices = 100.0 * (1.0 + returns).cumprod()
+    return SyntheticMarket(returns, prices, links, regime_starts)
+
+
+def write_prices(market: SyntheticMarket, root: str) -> None:
+    """One ``<SYMBOL>.csv`` per symbol with a Close column, for PRICE_SOURCE=local."""
+    os.makedirs(root, exist_ok=True)
+    for sym in market.prices.columns:
+        market.prices[[sym]].rename(columns={sym: "Close"}).to_csv(os.path.join(root, f"{sym}.csv"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--symbols", type=int, default=10)
+    parser.add_argument("--days", type=int, default=750)
+    parser.add_argument("--max-lag", type=int, default=3)
+    parser.add_argument("--regimes", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="data/local")
+    args = parser.parse_args()
+
+    market = synthetic_market(
+        args.symbols, args.days, args.max_lag, regimes=args.regimes, seed=args.seed
+    )
+    write_prices(market, args.out)
+    print(json.dumps({
+        "out": args.out,
+        "symbols": list(market.prices.columns),
+        "start_date": str(market.prices.index[0].date()),
+        "end_date": str(market.prices.index[-1].date()),
+        "regime_starts": market.regime_starts,
+        "links": [l._asdict() for l in market.links],
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,31 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.api import health, causal, features, agent, explain
+from app.api import health, metrics
 from fastapi.staticfiles import StaticFiles
-from app.api.health import router as health_router
-from app.api.agent import router as agent_router
-from app.api.causal import router as causal_router
-from app.api.features import router as features_router
 import os
 
+from app import startup
+from app.metrics import MetricsMiddleware
+from app.registry import model_registry
+
 os.makedirs("exports", exist_ok=True)
 
-app = FastAPI(title="TCARP Core API", version="0.1.0")
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    model_registry.scan()
+    # heavy routers, schema setup and model preloading (see STARTUP_MODE)
+    startup.start(app)
+    yield
+
+
+app = FastAPI(title="TCARP Core API", version="0.1.0", lifespan=lifespan)
+
+
+# added first so it sits inside CORS: its 503s still get CORS headers
+app.add_middleware(startup.LazyRouterMiddleware, loader=startup.router_loader)
 
 origins = [
     "http://localhost:3000",
@@ -23,16 +37,11 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# outermost, so its timings include lazy router loading
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(health.router)
-app.include_router(causal.router)
-app.include_router(features.router)
-app.include_router(agent.router)
-app.include_router(health_router)
-app.include_router(agent_router)
-app.include_router(causal_router)
-app.include_router(features_router)
-app.include_router(explain.router)
+app.include_router(metrics.router)
 
 app.mount("/exports", StaticFiles(directory="exports"), name="exports")
 
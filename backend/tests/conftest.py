@@ -0,0 +1,19 @@
+import os
+
+# settings are read at import time; the tests need no database or Redis
+os.environ.setdefault("POSTGRES_USER", "test")
+os.environ.setdefault("POSTGRES_PASSWORD", "test")
+os.environ.setdefault("POSTGRES_DB", "test")
+os.environ["CACHE_BACKEND"] = "memory"
+
+import pytest
+
+from app import cache
+
+
+@pytest.fixture(autouse=True)
+def store(monkeypatch):
+    """A fresh in-process store for every test."""
+    fresh = cache.MemoryStore()
+    monkeypatch.setattr(cache, "_store", fresh)
+    return fresh
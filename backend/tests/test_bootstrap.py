@@ -0,0 +1,15 @@
+import numpy as np
+
+from app.bootstrap import half_width
+
+
+def test_half_width_is_positive_at_extreme_frequencies():
+    widths = half_width(np.array([0.0, 1.0]), 20)
+    assert (widths > 0.05).all()
+    # and shrinks with more resamples
+    assert (half_width(np.array([0.0, 1.0]), 200) < 0.02).all()
+
+
+def test_half_width_matches_normal_approximation_for_large_n():
+    n = 100_000
+    np.testing.assert_allclose(half_width(np.array([0.5]), n), 1.96 * np.sqrt(0.25 / n), rtol=1e-3)
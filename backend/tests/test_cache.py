@@ -0,0 +1,107 @@
+import threading
+import time
+
+import pytest
+
+from app import cache
+from app.cache import JobQueue, SharedCache
+
+
+def test_concurrent_misses_compute_once():
+    shared = SharedCache(ttl=60.0, lock_timeout=10.0)
+    calls = []
+    results = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"value": 42}
+
+    def worker():
+        results.append(shared.get_or_compute("test", ("key",), compute))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == [{"value": 42}] * 8
+    assert shared.misses == 1
+    assert shared.collapsed == 7
+
+
+def test_values_expire_after_ttl():
+    shared = SharedCache(ttl=60.0, lock_timeout=10.0)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return len(calls)
+
+    assert shared.get_or_compute("test", ("key",), compute, ttl=0.05) == 1
+    assert shared.get_or_compute("test", ("key",), compute, ttl=0.05) == 1
+    time.sleep(0.1)
+    assert shared.get_or_compute("test", ("key",), compute, ttl=0.05) == 2
+
+
+def test_disabled_cache_always_computes():
+    shared = SharedCache(ttl=0.0, lock_timeout=10.0)
+    calls = []
+    for _ in range(3):
+        shared.get_or_compute("test", ("key",), lambda: calls.append(1))
+    assert len(calls) == 3
+
+
+def test_signed_payloads_reject_tampering(monkeypatch):
+    monkeypatch.setattr(cache.settings, "CACHE_SECRET", "secret")
+    data = cache.dumps({"a": 1})
+    assert cache.loads(data) == {"a": 1}
+    with pytest.raises(ValueError):
+        cache.loads(data[:-1] + bytes([data[-1] ^ 1]))
+
+
+def test_memory_store_reads_do_not_create_lists(store):
+    assert store.length("missing") == 0
+    assert store.range("missing", 0) == []
+    assert store.pop("missing", 0.01) is None
+    assert store.remove("missing", b"x") == 0
+    assert store._lists == {}
+
+
+def test_memory_store_lists_expire(store):
+    store.append("events", b"1", ttl=0.05)
+    store.append("events", b"2", ttl=0.05)
+    assert store.range("events", 1) == [b"2"]
+    time.sleep(0.1)
+    assert store.range("events", 0) == []
+    assert "events" not in store._lists
+
+
+def test_queue_claims_in_order():
+    queue = JobQueue("test", ttl=60.0)
+    queue.enqueue("a", {"n": 1})
+    queue.enqueue("b", {"n": 2})
+    assert queue.depth() == 2
+    assert queue.claim(timeout=0.1) == ("a", {"n": 1})
+    assert queue.claim(timeout=0.1) == ("b", {"n": 2})
+    assert queue.claim(timeout=0.05) is None
+
+
+def test_withdraw_only_unclaimed_jobs():
+    queue = JobQueue("test", ttl=60.0)
+    queue.enqueue("a", {})
+    queue.enqueue("b", {})
+    assert queue.withdraw("b")
+    assert queue.claim(timeout=0.1) == ("a", {})
+    assert not queue.withdraw("a")
+    assert queue.depth() == 0
+
+
+def test_cancel_requests_are_shared():
+    queue = JobQueue("test", ttl=60.0)
+    other = JobQueue("test", ttl=60.0)
+    assert not other.cancel_requested("a")
+    queue.request_cancel("a")
+    assert other.cancel_requested("a")
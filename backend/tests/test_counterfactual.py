@@ -0,0 +1,23 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from app import counterfactual
+from app.counterfactual import minimal_flips
+
+
+def test_flip_inside_range_is_found(monkeypatch):
+    # picks symbol 1 only while column 0 is scaled by 1.3 .. 1.5
+    def actions(model, obs, n_symbols):
+        return ((obs[:, 0] > 1.3) & (obs[:, 0] < 1.5)).astype(np.intp)
+
+    monkeypatch.setattr(counterfactual, "policy_actions", actions)
+    model = SimpleNamespace(action_space=SimpleNamespace(n=2))
+    obs = np.ones((3, 2), dtype=np.float32)
+
+    deltas, flip_to = minimal_flips(model, obs, np.zeros(3, dtype=np.intp), [0, 1], 1.0, 16)
+    # the action at max_delta equals the original, so only the grid finds it
+    np.testing.assert_allclose(deltas[0], 0.3, atol=1e-3)
+    assert flip_to[0].tolist() == [1, 1, 1]
+    assert np.isnan(deltas[1]).all()
+    assert flip_to[1].tolist() == [-1, -1, -1]
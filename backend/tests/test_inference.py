@@ -0,0 +1,30 @@
+import asyncio
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+
+from app.execution import until_disconnect
+from app.inference import InferenceScheduler
+
+
+class GoneRequest:
+    """A request whose client has already disconnected."""
+
+    async def is_disconnected(self) -> bool:
+        return True
+
+
+def test_disconnected_request_is_dropped_from_its_batch():
+    scheduler = InferenceScheduler(window_ms=100.0, max_batch=4096, threads=1)
+
+    async def run():
+        with pytest.raises(HTTPException) as exc:
+            await until_disconnect(GoneRequest(), scheduler.logits("model", np.zeros((3, 2))))
+        assert exc.value.status_code == 499
+        # let the batch window close
+        await asyncio.sleep(0.2)
+
+    asyncio.run(run())
+    assert scheduler.dropped == 1
+    assert scheduler.batches == 0
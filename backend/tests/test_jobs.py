@@ -0,0 +1,80 @@
+import pytest
+from fastapi import HTTPException
+
+from app.jobs import QueuedJob, TrainingJobManager
+
+
+@pytest.fixture
+def managers(monkeypatch):
+    """Two API workers' managers sharing one store, without dispatcher threads."""
+    monkeypatch.setattr(TrainingJobManager, "start", lambda self: None)
+    return TrainingJobManager(1), TrainingJobManager(1)
+
+
+def test_queued_job_visible_from_other_manager(managers):
+    submitter, other = managers
+    job = submitter.submit(["AAA", "BBB"], "2020-01-01", "2021-01-01", 1000)
+
+    seen = other.get(job.job_id)
+    assert isinstance(seen, QueuedJob)
+    assert seen.status == "queued"
+    assert seen.model_id == job.model_id
+
+
+def test_events_visible_from_other_manager(managers):
+    worker, other = managers
+    job = worker.submit(["AAA"], "2020-01-01", "2021-01-01", 1000)
+    worker.queue.claim(timeout=0.1)
+    job.status = "running"
+    worker._publish(job, {"job_id": job.job_id, "type": "progress", "timesteps": 500})
+    job.status = "done"
+    worker._publish(job, {"job_id": job.job_id, "type": "done", **job.summary()})
+
+    seen = other.get(job.job_id)
+    assert seen.status == "done"
+    assert [e["type"] for e in seen.events] == ["progress", "done"]
+
+
+def test_cancel_queued_job_from_other_manager(managers):
+    submitter, other = managers
+    job = submitter.submit(["AAA"], "2020-01-01", "2021-01-01", 1000)
+
+    cancelled = other.cancel(job.job_id)
+    assert cancelled.status == "cancelled"
+    assert submitter.queue.depth() == 0
+    assert submitter.get(job.job_id).events[-1]["type"] == "cancelled"
+
+
+def test_cancel_claimed_job_is_forwarded(managers):
+    submitter, other = managers
+    job = submitter.submit(["AAA"], "2020-01-01", "2021-01-01", 1000)
+    submitter.queue.claim(timeout=0.1)
+
+    other.cancel(job.job_id)
+    assert submitter.queue.cancel_requested(job.job_id)
+
+
+def test_unknown_job_is_404(managers):
+    with pytest.raises(HTTPException) as exc:
+        managers[0].get("missing")
+    assert exc.value.status_code == 404
+
+
+def test_finished_jobs_are_pruned(managers):
+    worker = managers[0]
+    worker._cancel_flags = {}
+    job = worker.submit(["AAA"], "2020-01-01", "2021-01-01", 1000)
+    worker.queue.claim(timeout=0.1)
+    job.status = "done"
+    job.finished_at = 0.0
+    worker._jobs[job.job_id] = job
+    worker._cancel_flags[job.job_id] = True
+    worker._publish(job, {"job_id": job.job_id, "type": "done", **job.summary()})
+
+    worker._prune()
+    assert job.job_id not in worker._jobs
+    assert job.job_id not in worker._cancel_flags
+    # still served from the job queue
+    assert worker.get(job.job_id).status == "done"
+    assert worker.stats()["jobs"] == []
+    assert worker._submitted == []
@@ -0,0 +1,48 @@
+from datetime import date
+
+import pandas as pd
+
+from app.prices import PriceSource, PriceStore, _empty_bars, _normalize_bars, to_days
+
+
+class FlakySource(PriceSource):
+    """Business-day bars before ``until``, or nothing at all while ``failing``."""
+
+    def __init__(self, failing=True, until=date(2100, 1, 1)):
+        self.failing = failing
+        self.until = until
+        self.calls = []
+
+    def fetch(self, symbols, start, end):
+        self.calls.append((start, end))
+        if self.failing:
+            return {s: _empty_bars() for s in symbols}
+        days = pd.bdate_range(start, min(end, self.until), inclusive="left")
+        frame = pd.DataFrame({"Close": range(1, len(days) + 1)}, index=days)
+        return {s: _normalize_bars(frame) for s in symbols}
+
+
+def test_empty_fetch_over_weekdays_is_retried(tmp_path):
+    source = FlakySource()
+    store = PriceStore(str(tmp_path), source)
+    store.ensure(["AAA"], date(2021, 3, 1), date(2021, 3, 4))
+    assert store.coverage("AAA") == []
+
+    source.failing = False
+    store.ensure(["AAA"], date(2021, 3, 1), date(2021, 3, 4))
+    assert len(source.calls) == 2
+    assert len(store.load(["AAA"], date(2021, 3, 1), date(2021, 3, 4))) == 3
+
+
+def test_empty_weekend_is_covered(tmp_path):
+    store = PriceStore(str(tmp_path), FlakySource())
+    store.ensure(["AAA"], date(2021, 3, 6), date(2021, 3, 8))
+    assert store.missing("AAA", date(2021, 3, 6), date(2021, 3, 8)) == []
+
+
+def test_coverage_stops_at_trailing_weekdays_without_bars(tmp_path):
+    # bars through Friday the 5th; Monday the 8th is asked for again later
+    store = PriceStore(str(tmp_path), FlakySource(failing=False, until=date(2021, 3, 6)))
+    store.ensure(["AAA"], date(2021, 3, 1), date(2021, 3, 9))
+    monday = to_days(date(2021, 3, 8))
+    assert store.missing("AAA", date(2021, 3, 1), date(2021, 3, 9)) == [(monday, monday + 1)]
@@ -0,0 +1,42 @@
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from app import returns
+from app.returns import Returns, fetch_returns
+
+
+def _counting_prepare(monkeypatch):
+    calls = []
+
+    def prepare(symbols, start_date, end_date, field):
+        calls.append(end_date)
+        dates = pd.date_range(start_date, periods=3)
+        return Returns(dates, list(symbols), np.full((3, len(symbols)), len(calls)))
+
+    monkeypatch.setattr(returns, "_prepare", prepare)
+    monkeypatch.setattr(returns, "returns_cache", returns.ReturnsCache(1 << 20))
+    return calls
+
+
+def test_past_window_is_cached(monkeypatch):
+    calls = _counting_prepare(monkeypatch)
+    end = date.today() - timedelta(days=1)
+    fetch_returns(["AAA"], end - timedelta(days=30), end)
+    fetch_returns(["AAA"], end - timedelta(days=30), end)
+    assert len(calls) == 1
+    assert returns.returns_cache.stats()["entries"] == 1
+
+
+def test_window_reaching_today_expires(monkeypatch):
+    calls = _counting_prepare(monkeypatch)
+    monkeypatch.setattr(returns.settings, "RETURNS_LIVE_TTL", 0.05)
+    end = date.today()
+    first = fetch_returns(["AAA"], end - timedelta(days=30), end)
+    assert fetch_returns(["AAA"], end - timedelta(days=30), end).values[0, 0] == first.values[0, 0]
+    assert returns.returns_cache.stats()["entries"] == 0
+    time.sleep(0.1)
+    fetch_returns(["AAA"], end - timedelta(days=30), end)
+    assert len(calls) == 2
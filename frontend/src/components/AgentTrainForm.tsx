@@ -10,14 +10,14 @@ export default function AgentTrainForm() {
   const [endDate, setEndDate] = useState('2022-12-31');
   const [timesteps, setTimesteps] = useState(5000);
   const [modelId, setModelId] = useState<string | null>(null);
-  const [metrics, setMetrics] = useState<Metric[] | null>(null);
+  const [metrics, setMetrics] = useState<Metric[]>([]);
   const [error, setError] = useState<string | null>(null);
 
   const handleSubmit = async (e: React.FormEvent) => {
     e.preventDefault();
     setError(null);
     setModelId(null);
-    setMetrics(null);
+    setMetrics([]);
 
     const symList = symbols.split(',').map(s => s.trim()).filter(Boolean);
     try {
@@ -27,8 +27,20 @@ export default function AgentTrainForm() {
         end_date: endDate,
         total_timesteps: timesteps
       });
-      setModelId(res.data.model_id);
-      setMetrics(res.data.metrics);
+      // the model exists once the job's `done` event arrives
+      const events = new EventSource(`http://localhost:8000/agent/train/${res.data.job_id}/events`);
+      events.onmessage = (msg) => {
+        const ev = JSON.parse(msg.data);
+        if (ev.type === 'progress' && ev.episode_reward !== null) {
+          setMetrics(prev => [...prev, { step: ev.timesteps, reward: ev.episode_reward }]);
+        } else if (ev.type === 'done') {
+          setModelId(ev.model_id);
+          events.close();
+        } else if (ev.type === 'failed' || ev.type === 'cancelled') {
+          setError(ev.error ?? `Training ${ev.type}`);
+          events.close();
+        }
+      };
     } catch (err: any) {
       const d = err.response?.data;
       const msg = typeof d === 'object'
@@ -47,7 +59,7 @@ export default function AgentTrainForm() {
         {error && <p className="text-red-500">{error}</p>}
       </form>
       {modelId && <p className="mt-2">Model ID: <code>{modelId}</code></p>}
-      {metrics && <TrainingMetricsChart data={metrics} />}
+      {metrics.length > 0 && <TrainingMetricsChart data={metrics} />}
     </div>
   );
 }
\ No newline at end of file
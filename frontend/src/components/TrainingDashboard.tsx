@@ -25,14 +25,21 @@ export default function TrainingDashboard() {
         end_date: endDate,
         total_timesteps: timesteps
       });
-      setModelId(res.data.model_id);
-
-      // placeholder metrics
-      const dummy = Array.from({ length: 10 }, (_, i) => ({
-        step: Math.round((i + 1) * (timesteps / 10)),
-        reward: Math.random() * 2
-      }));
-      setMetrics(dummy);
+      const jobId = res.data.job_id;
+      // live progress from the training job (Server-Sent Events)
+      const events = new EventSource(`http://localhost:8000/agent/train/${jobId}/events`);
+      events.onmessage = (msg) => {
+        const ev = JSON.parse(msg.data);
+        if (ev.type === 'progress' && ev.episode_reward !== null) {
+          setMetrics(prev => [...prev, { step: ev.timesteps, reward: ev.episode_reward }]);
+        } else if (ev.type === 'done') {
+          setModelId(ev.model_id);
+          events.close();
+        } else if (ev.type === 'failed' || ev.type === 'cancelled') {
+          setError(ev.error ?? `Training ${ev.type}`);
+          events.close();
+        }
+      };
     } catch (err: any) {
       const d = err.response?.data;
       const msg = typeof d === 'object' ? d.detail ?? JSON.stringify(d) : d ?? err.message;